@@ -0,0 +1,47 @@
+"""
+Compares two benchmark suite results, such as those of two commits,
+exiting with an error if any benchmark slowed down beyond the threshold.
+
+Usage: python benchmarks/compare.py BASE.json NEW.json [--threshold 10]
+"""
+import argparse
+import json
+import pathlib
+import sys
+
+
+def load_timings(path: pathlib.Path) -> dict[str, float]:
+    """Returns the mean time in seconds of each benchmark in the results."""
+    results = json.loads(path.read_text())["results"]
+    return {name: timing["seconds"] for name, timing in results.items()}
+
+
+def main() -> None:
+    """Prints the change in time of each benchmark in both results."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("base", type=pathlib.Path)
+    parser.add_argument("new", type=pathlib.Path)
+    parser.add_argument(
+        "--threshold", type=float, default=10,
+        help="slowdown (percent) counted as a regression")
+    args = parser.parse_args()
+    base = load_timings(args.base)
+    new = load_timings(args.new)
+    regressions = []
+    for name in sorted(base.keys() & new.keys()):
+        change = (new[name] / base[name] - 1) * 100 if base[name] else 0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<40} {base[name] * 1000:10.3f} ms -> "
+            f"{new[name] * 1000:10.3f} ms {change:+7.1f}%{flag}")
+    for name in sorted(base.keys() ^ new.keys()):
+        print(f"{name:<40} only in {'base' if name in base else 'new'}")
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s) over {args.threshold}%.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmarks exporting a large, image-heavy synthetic article
+to DOCX and PDF, measuring the time taken and peak memory (Unix).
+Exports are streamed, so the peak Python memory should not grow with
+the article - exiting with an error if it exceeds the memory ceiling.
+
+Usage: python benchmarks/export.py [--paragraphs 2000] [--images 100]
+    [--distinct-images 10] [--memory-ceiling 16]
+"""
+import argparse
+import datetime as dt
+import io
+import pathlib
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from PIL import Image as PilImage
+
+from article import Article, Image, Text
+from export import export_docx, export_pdf
+
+
+# Peak Python memory allowed per export (MiB), beyond the article -
+# an image being compressed and the page being laid out.
+MEMORY_CEILING = 16
+
+def make_image(rng: random.Random, width: int, height: int) -> bytes:
+    """Returns a noisy JPEG, which compresses poorly like a photo."""
+    pil_image = PilImage.frombytes(
+        "RGB", (width, height), rng.randbytes(width * height * 3))
+    with io.BytesIO() as image_bytes:
+        pil_image.save(image_bytes, "JPEG", quality=90)
+        return image_bytes.getvalue()
+
+
+def make_article(
+    paragraphs: int, images: int, distinct_images: int, image_width: int
+) -> Article:
+    """
+    Returns a long article with images spread throughout, repeating
+    the given number of distinct images.
+    """
+    rng = random.Random(0)
+    image_data = [
+        make_image(rng, image_width, image_width * 2 // 3)
+        for _ in range(max(min(images, distinct_images), 1))]
+    elements = []
+    image_count = 0
+    for position in range(paragraphs):
+        if position % 20 == 0:
+            elements.append(Text(f"Subheading {position}", True))
+        elements.append(Text(
+            f"Paragraph {position} of a very long live blog. " * 8, False))
+        if images and position % max(paragraphs // images, 1) == 0:
+            elements.append(Image(
+                image_data[image_count % len(image_data)],
+                f"Caption {position}", "Credits"))
+            image_count += 1
+    return Article(
+        "A huge live blog", dt.datetime(2024, 1, 1, 12),
+        dt.datetime(2024, 1, 1, 12), ["Benchmark"], "Author",
+        "Description of the live blog.", elements)
+
+
+def main() -> None:
+    """Exports the article in each format, reporting time and memory."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--distinct-images", type=int, default=10)
+    parser.add_argument("--image-width", type=int, default=3000)
+    parser.add_argument("--font-size", type=int, default=12)
+    parser.add_argument(
+        "--memory-ceiling", type=float, default=MEMORY_CEILING,
+        help="peak Python memory allowed per export (MiB)")
+    args = parser.parse_args()
+    article = make_article(
+        args.paragraphs, args.images, args.distinct_images, args.image_width)
+    over_ceiling = []
+    with tempfile.TemporaryDirectory() as folder:
+        for export_function, extension in (
+            (export_docx, ".docx"), (export_pdf, ".pdf")
+        ):
+            path = pathlib.Path(folder) / f"article{extension}"
+            tracemalloc.start()
+            start = time.perf_counter()
+            export_function(article, path, args.font_size)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{extension:<6} {seconds:8.2f} s, "
+                f"peak Python memory {peak / 1024 ** 2:8.1f} MiB, "
+                f"file {path.stat().st_size / 1024 ** 2:8.1f} MiB")
+            if peak > args.memory_ceiling * 1024 ** 2:
+                over_ceiling.append(extension)
+        # Includes memory allocated by PIL, which tracemalloc cannot see.
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"peak resident memory {peak_rss / 1024:.1f} MiB")
+    if over_ceiling:
+        sys.exit(
+            f"Peak Python memory over {args.memory_ceiling} MiB exporting "
+            f"{', '.join(over_ceiling)}.")
+
+
+if __name__ == "__main__":
+    main()
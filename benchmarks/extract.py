@@ -0,0 +1,137 @@
+"""
+Compares the article extraction engine against the original
+descendant walk on article HTML pages (the generated pages if none
+are given), checking the articles extracted are identical, images
+included, under each tree builder.
+
+Usage: python benchmarks/extract.py [PAGE.html ...]
+    [--parsers html.parser lxml]
+"""
+import argparse
+import importlib.util
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+from bs4 import BeautifulSoup
+
+from article import Image, Text, make_soup, parse_article
+from fixtures import load_pages
+
+LEGACY_PARSER = "html.parser"
+# Tree builders checked by default - those installed.
+PARSERS = tuple(
+    parser for parser in ("html.parser", "lxml")
+    if parser == "html.parser" or importlib.util.find_spec(parser))
+IMAGE_BASE_URL = "https://example.com"
+
+
+def legacy_load_elements(soup: BeautifulSoup) -> list[Text | Image]:
+    """
+    Original extraction of the elements, images included (by URL, as
+    the original downloaded each image in place).
+    """
+    elements = []
+    image = None
+    for child in soup.find("article").find_all(recursive=True):
+        text = child.text.strip()
+        if (
+            child.name == "p" and child.get("itemprop") != "description"
+            and child.get("data-test") != "cmp-teaser__pretitle"
+        ):
+            if image is not None:
+                elements.append(image)
+                image = None
+            elements.append(Text(text, False))
+        if (
+            child.name == "h2"
+            and "u-heading-size-medium" in child.get("class", "")
+        ):
+            if image is not None:
+                elements.append(image)
+                image = None
+            elements.append(Text(text, True))
+        if child.name == "picture":
+            image = Image(
+                None, url=f"{IMAGE_BASE_URL}/{child.find('img')['src']}")
+        if child.get("itemprop") == "caption":
+            image.caption = text
+        if child.get("itemprop") == "copyrightHolder":
+            image.credits = text.removeprefix("Credit:").strip()
+    if image is not None:
+        elements.append(image)
+    return elements
+
+
+def element_key(element: Text | Image) -> tuple:
+    """Returns what is compared of an element - images by URL."""
+    if isinstance(element, Text):
+        return (element.contents, bool(element.is_subheading))
+    return (element.url, element.caption, element.credits)
+
+
+def same_elements(markup: bytes, parser: str) -> bool:
+    """
+    Whether the elements extracted from the page using the tree builder
+    are those of the original extraction using the standard one.
+    """
+    article = parse_article(make_soup(markup, parser), True, IMAGE_BASE_URL)
+    legacy = legacy_load_elements(BeautifulSoup(markup, LEGACY_PARSER))
+    return (
+        list(map(element_key, article.elements))
+        == list(map(element_key, legacy)))
+
+
+def best_time(function, repeats: int) -> float:
+    """Returns the fastest of several timed calls in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    """Benchmarks each page, checking the outputs are identical."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", type=pathlib.Path)
+    parser.add_argument("--parsers", nargs="+", default=PARSERS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    pages = (
+        {page.name: page.read_bytes() for page in args.pages} if args.pages
+        else load_pages())
+    for name, markup in pages.items():
+        legacy_soup = BeautifulSoup(markup, LEGACY_PARSER)
+        legacy_build = best_time(
+            lambda: BeautifulSoup(markup, LEGACY_PARSER), args.repeats)
+        legacy_walk = best_time(
+            lambda: legacy_load_elements(legacy_soup), args.repeats)
+        print(
+            f"{name}: {len(markup) / 1024:.0f} KiB, "
+            f"{len(legacy_load_elements(legacy_soup))} elements\n"
+            f"  original    {legacy_build * 1000:9.2f} ms tree build, "
+            f"{legacy_walk * 1000:9.2f} ms extraction")
+        for tree_builder in args.parsers:
+            if not same_elements(markup, tree_builder):
+                raise RuntimeError(
+                    f"{name}: output under {tree_builder} differs "
+                    "from the original.")
+            soup = make_soup(markup, tree_builder)
+            build = best_time(
+                lambda: make_soup(markup, tree_builder), args.repeats)
+            walk = best_time(
+                lambda: parse_article(soup, True, IMAGE_BASE_URL),
+                args.repeats)
+            print(
+                f"  {tree_builder:<11} {build * 1000:9.2f} ms tree build, "
+                f"{walk * 1000:9.2f} ms extraction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Article page and image fixtures for the benchmarks, in sizes from a short
+article to a huge live blog. Pages follow the markup of Telegraph article
+pages and are generated deterministically, so results are comparable
+between runs. Real pages saved from the site can be used instead.
+"""
+import datetime as dt
+import hashlib
+import html
+import io
+import json
+import pathlib
+import random
+from dataclasses import dataclass
+
+from PIL import Image as PilImage
+
+
+@dataclass
+class PageSize:
+    """Numbers of elements in a generated page."""
+    paragraphs: int
+    subheadings: int
+    images: int
+
+
+PAGE_SIZES = {
+    "small": PageSize(8, 1, 1),
+    "medium": PageSize(40, 5, 6),
+    "large": PageSize(200, 20, 25),
+    "live-blog": PageSize(2500, 250, 150),
+}
+# Numbers of navigation links and recommended articles around the article.
+NAVIGATION_LINKS = 120
+RECOMMENDATIONS = 200
+# Sizes (pixels) of generated images, picked in turn.
+IMAGE_SIZES = ((640, 360), (1280, 720), (2048, 1365), (3000, 2000))
+WORDS = (
+    "the government said on tuesday that a new policy would be announced "
+    "after ministers met to discuss rising costs across the country while "
+    "critics warned of delays and the opposition called for an inquiry"
+).split()
+
+
+def paragraph(rng: random.Random, words: int) -> str:
+    """Returns a sentence-like run of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def page_chrome(rng: random.Random) -> tuple[str, str]:
+    """
+    Returns the navigation markup before the article, and the
+    recommendations and footer after it, as on the site.
+    """
+    navigation = "".join(
+        f'<li><a href="/section-{link}/">{paragraph(rng, 2)}</a></li>'
+        for link in range(NAVIGATION_LINKS))
+    recommendations = "".join(
+        '<div class="card"><p data-test="cmp-teaser__pretitle">Recommended'
+        f'</p><a href="/news/recommended-{number}/"><h3>{paragraph(rng, 10)}'
+        f'</h3></a><img src="/content/dam/teaser-{number}.jpg"></div>'
+        for number in range(RECOMMENDATIONS))
+    footer = "".join(
+        f'<a href="/footer-{link}/">{paragraph(rng, 3)}</a>'
+        for link in range(NAVIGATION_LINKS))
+    return (
+        f"<header><nav><ul>{navigation}</ul></nav></header>",
+        f"<aside>{recommendations}</aside><footer>{footer}</footer>")
+
+
+def make_page(name: str, size: PageSize) -> bytes:
+    """Returns the HTML of a generated article page."""
+    rng = random.Random(name)
+    schema = {
+        "headline": f"Benchmark article: {name}",
+        "datePublished": dt.datetime(2024, 1, 1, 12).strftime(
+            "%Y-%m-%dT%H:%M"),
+        "keywords": "Politics,Economy,Benchmark",
+        "author": [{"name": "Benchmark  Author"}],
+    }
+    body = []
+    subheading_every = max(size.paragraphs // max(size.subheadings, 1), 1)
+    image_every = max(size.paragraphs // max(size.images, 1), 1)
+    images = 0
+    for position in range(size.paragraphs):
+        if position % subheading_every == 0 and size.subheadings:
+            body.append(
+                '<h2 class="u-heading-size-medium">'
+                f"{html.escape(paragraph(rng, 6))}</h2>")
+        # Nest paragraphs as the site does, which slows naive extraction.
+        body.append(
+            '<div class="article-body-text"><div class="component">'
+            f"<p>{html.escape(paragraph(rng, rng.randint(20, 80)))}</p>"
+            "</div></div>")
+        if position % image_every == 0 and images < size.images:
+            body.append(
+                '<figure><picture><img src="'
+                f'content/dam/benchmark/{name}/{images}.jpg"></picture>'
+                f'<figcaption><span itemprop="caption">Caption {images}</span>'
+                '<span itemprop="copyrightHolder">Credit: Benchmark</span>'
+                "</figcaption></figure>")
+            images += 1
+    header, footer = page_chrome(rng)
+    return (
+        "<!DOCTYPE html><html><head>"
+        '<meta property="og:description" content="A benchmark article.">'
+        '<script data-js="main-json-schema" type="application/ld+json">'
+        f"{json.dumps(schema)}</script></head><body>{header}<article>"
+        '<p itemprop="description">A benchmark article.</p>'
+        f"{''.join(body)}</article>{footer}</body></html>").encode()
+
+
+def make_image(path: str) -> bytes:
+    """Returns a JPEG image, its size and contents derived from the path."""
+    seed = hashlib.sha256(path.encode()).digest()
+    width, height = IMAGE_SIZES[seed[0] % len(IMAGE_SIZES)]
+    # Noise over a gradient, so the image is not trivially compressible.
+    pil_image = PilImage.linear_gradient("L").resize((width, height))
+    noise = PilImage.effect_noise((width, height), 32)
+    pil_image = PilImage.merge(
+        "RGB", (pil_image, noise, pil_image.rotate(seed[1] % 360)))
+    with io.BytesIO() as image_bytes:
+        pil_image.save(image_bytes, "JPEG", quality=85)
+        return image_bytes.getvalue()
+
+
+def load_pages(folder: pathlib.Path = None) -> dict[str, bytes]:
+    """
+    Returns the pages by name - those saved in the folder if given,
+    otherwise the generated pages of each size.
+    """
+    if folder is not None:
+        return {
+            path.stem: path.read_bytes()
+            for path in sorted(folder.glob("*.html"))}
+    return {name: make_page(name, size) for name, size in PAGE_SIZES.items()}
@@ -0,0 +1,119 @@
+"""
+Local HTTP stand-in for the Telegraph endpoints, so the benchmarks
+run offline. Article pages are served by name, and any other path
+is served as an image generated from the path (then kept in memory).
+Responses carry an ETag and Last-Modified date, and conditional
+requests for unchanged responses are answered 304 (Not Modified).
+"""
+import hashlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import make_image
+
+# All responses were last modified at the same time.
+LAST_MODIFIED = "Mon, 01 Jan 2024 12:00:00 GMT"
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves article pages and images on a free local port, each response
+    delayed by the given seconds to stand in for network latency.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pages: dict[str, bytes], delay: float = 0) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.pages = pages
+        self.delay = delay
+        # Numbers of responses in full, and of 304 responses.
+        self.full_responses = 0
+        self.not_modified_responses = 0
+        self.responses_lock = threading.Lock()
+        self.images: dict[str, bytes] = {}
+        self.images_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, in place of the site domain."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page_url(self, name: str) -> str:
+        return f"{self.url}/news/{name}/"
+
+    def image(self, path: str) -> bytes:
+        """Returns the image at the path, generating it upon first use."""
+        with self.images_lock:
+            if path not in self.images:
+                self.images[path] = make_image(path)
+            return self.images[path]
+
+    def count_response(self, not_modified: bool) -> None:
+        with self.responses_lock:
+            if not_modified:
+                self.not_modified_responses += 1
+            else:
+                self.full_responses += 1
+
+    def handle_error(self, request, client_address) -> None:
+        """Ignores clients closing the connection part way, as streams do."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def __enter__(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Handles GET requests for pages and images."""
+
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+    # Send headers and body without waiting, as a real server would.
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0].strip("/")
+        parts = path.split("/")
+        if len(parts) == 2 and parts[0] == "news":
+            body = self.server.pages.get(parts[1])
+            content_type = "text/html; charset=utf-8"
+        else:
+            body = self.server.image(path)
+            content_type = "image/jpeg"
+        if body is None:
+            self.send_error(404)
+            return
+        time.sleep(self.server.delay)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if_none_match = self.headers.get("If-None-Match")
+        if (
+            if_none_match == etag if if_none_match is not None
+            else self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        ):
+            self.server.count_response(True)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.server.count_response(False)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        """Requests are not logged, to keep the output readable."""
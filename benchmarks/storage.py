@@ -0,0 +1,95 @@
+"""
+Benchmarks saving, loading and deleting articles
+in a temporary database of many saved articles.
+
+Usage: python benchmarks/storage.py [--articles 10000]
+"""
+import argparse
+import datetime as dt
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+import data
+from article import Article, Image, Text
+
+
+def make_article(
+    number: int, texts: int, images: int, image_size: int
+) -> Article:
+    """Returns a synthetic article with the given number of elements."""
+    rng = random.Random(number)
+    # Some images are shared between articles, such as author headshots.
+    shared_rng = random.Random(rng.randrange(50))
+    elements = []
+    for position in range(texts):
+        elements.append(Text(
+            f"Paragraph {position} of article {number}. " * 10,
+            position % 5 == 0))
+        if position % max(texts // max(images, 1), 1) == 0 and images:
+            image_rng = shared_rng if position == 0 else rng
+            elements.append(Image(
+                image_rng.randbytes(image_size),
+                f"Caption {position}", "Credits"))
+            images -= 1
+    return Article(
+        f"Article {number}", dt.datetime(2024, 1, 1, 12),
+        dt.datetime(2024, 6, 1, 12),
+        sorted({f"keyword {rng.randrange(500)}" for _ in range(8)}),
+        f"Author {rng.randrange(200)}", f"Description {number}", elements)
+
+
+def report(name: str, seconds: float, count: int = 1) -> None:
+    """Prints the total and mean time taken."""
+    print(
+        f"{name:<24} {seconds * 1000:10.1f} ms total "
+        f"{seconds / count * 1000:8.3f} ms each")
+
+
+def main() -> None:
+    """Runs the benchmark against a temporary database."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument("--image-size", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        data.DATABASE = pathlib.Path(folder) / "articles.db"
+        articles = [
+            make_article(number, args.texts, args.images, args.image_size)
+            for number in range(args.articles)]
+        start = time.perf_counter()
+        ids = [data.insert_article(article) for article in articles]
+        report("insert_article", time.perf_counter() - start, len(ids))
+        referenced, stored = data.image_storage()
+        print(
+            f"images: {referenced / 1024 ** 2:.1f} MiB referenced, "
+            f"{stored / 1024 ** 2:.1f} MiB stored, "
+            f"{(referenced - stored) / 1024 ** 2:.1f} MiB saved")
+        start = time.perf_counter()
+        data.load_article_summaries()
+        report("load_article_summaries", time.perf_counter() - start)
+        sample = random.Random(0).sample(ids, min(args.samples, len(ids)))
+        start = time.perf_counter()
+        for article_id in sample:
+            data.load_article_by_id(article_id)
+        report("load_article_by_id", time.perf_counter() - start, len(sample))
+        start = time.perf_counter()
+        data.load_articles()
+        report("load_articles", time.perf_counter() - start)
+        start = time.perf_counter()
+        for article_id in sample:
+            data.delete_article_by_id(article_id)
+        report(
+            "delete_article_by_id", time.perf_counter() - start, len(sample))
+        data.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Runs the benchmark suite offline, saving the results as JSON so they can
+be compared between commits (see compare.py). Covers cold start, article
+parsing, image fetching from a local stand-in server, storage at several
+database sizes, and construction of the article view (the GUI benchmarks
+being skipped without a display).
+
+Usage: python benchmarks/suite.py [--sizes 1000 10000 100000]
+    [--pages FOLDER] [--output RESULTS.json]
+"""
+import argparse
+import datetime as dt
+import json
+import pathlib
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+from typing import Callable
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+
+import data
+from article import Article, load_article_from_soup, make_soup, parse_article
+from cache import ResponseCache
+from fixtures import load_pages
+from network import (
+    create_session, download_images, fetch_page, fetch_page_sections)
+from server import StandInServer
+from storage import make_article
+
+RESULTS_FOLDER = pathlib.Path(__file__).parent / "results"
+SOURCE_FOLDER = pathlib.Path(__file__).parent.parent / "src"
+# Cold start scripts, run in a new process each time, printing the seconds
+# taken to import the GUI module, and to first draw the window. The
+# database path is set before the GUI module uses it.
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+FIRST_DRAW_SCRIPT = """
+import pathlib
+import time
+start = time.perf_counter()
+import data
+data.DATABASE = pathlib.Path({database!r})
+import main
+root = main.TelegraphPaywallBypass()
+root.update()
+print(time.perf_counter() - start)
+root.destroy()
+"""
+
+
+class Results:
+    """Timings in seconds by benchmark name, and skipped benchmarks."""
+
+    def __init__(self) -> None:
+        self.timings: dict[str, dict] = {}
+        self.skipped: dict[str, str] = {}
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        """Records the mean time of one of the count operations timed."""
+        self.timings[name] = {"seconds": seconds / count, "count": count}
+        print(
+            f"{name:<40} {seconds / count * 1000:10.3f} ms"
+            + (f" (mean of {count})" if count > 1 else ""))
+
+    def skip(self, name: str, reason: str) -> None:
+        self.skipped[name] = reason
+        print(f"{name:<40} skipped: {reason}")
+
+
+def best_time(function: Callable[[], object], repeats: int) -> float:
+    """Returns the fastest of several timed calls in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def time_script(script: str) -> float:
+    """Runs a cold start script in a new process, returning its time."""
+    process = subprocess.run(
+        (sys.executable, "-c", script),
+        capture_output=True, text=True, check=True, cwd=SOURCE_FOLDER)
+    return float(process.stdout.split()[-1])
+
+
+def bench_startup(results: Results, repeats: int) -> None:
+    """
+    Times importing the GUI module in a new process, and (given a
+    display) drawing the first window against an empty database.
+    """
+    results.add(
+        "startup/import",
+        min(time_script(IMPORT_SCRIPT) for _ in range(repeats)))
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        results.skip("startup/first_draw", f"no display ({e})")
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        script = FIRST_DRAW_SCRIPT.format(
+            database=str(pathlib.Path(folder) / "articles.db"))
+        results.add("startup/first_draw", min(
+            time_script(script) for _ in range(repeats)))
+
+
+def bench_parse(
+    results: Results, pages: dict[str, bytes], repeats: int
+) -> None:
+    """Times building the tree and extracting the article of each page."""
+    for name, markup in pages.items():
+        soup = make_soup(markup)
+        results.add(
+            f"parse/{name}/tree",
+            best_time(lambda: make_soup(markup), repeats))
+        results.add(
+            f"parse/{name}/extract",
+            best_time(lambda: load_article_from_soup(soup, False), repeats))
+
+
+def bench_fetch(
+    results: Results, pages: dict[str, bytes], repeats: int
+) -> dict[str, Article]:
+    """
+    Times fetching each page (in full, revalidated with the server when
+    cached, then streaming only the article sections, checking the
+    article parsed is the same) and downloading its images from the
+    stand-in server. Returns the articles of each page, with their
+    images.
+    """
+    articles = {}
+    with (
+        StandInServer(pages) as server, create_session() as session,
+        tempfile.TemporaryDirectory() as cache_folder
+    ):
+        # Cached responses are stale at once, so always revalidated.
+        cache = ResponseCache(pathlib.Path(cache_folder), ttl=0)
+        for name in pages:
+            url = server.page_url(name)
+            results.add(
+                f"fetch/{name}/page",
+                best_time(lambda: fetch_page(session, url), repeats))
+            fetch_page(session, url, cache)
+            revalidated = cache.stats.revalidated
+            results.add(
+                f"fetch/{name}/revalidated",
+                best_time(lambda: fetch_page(session, url, cache), repeats))
+            if cache.stats.revalidated - revalidated < repeats:
+                raise RuntimeError(f"{name}: page not revalidated.")
+            results.add(
+                f"fetch/{name}/sections",
+                best_time(lambda: fetch_page_sections(session, url), repeats))
+            soup = make_soup(fetch_page(session, url))
+            sections = fetch_page_sections(session, url)
+            results.add(
+                f"fetch/{name}/sections_tree",
+                best_time(lambda: make_soup(sections), repeats))
+            sections_soup = make_soup(sections)
+            if not same_article(
+                parse_article(soup, True, server.url),
+                parse_article(sections_soup, True, server.url)
+            ):
+                raise RuntimeError(f"{name}: streamed article differs.")
+            # Generate the images beforehand, so only fetching is timed.
+            for image in parse_article(soup, True, server.url).images:
+                server.image(image.url.removeprefix(server.url).strip("/"))
+            times = []
+            for _ in range(repeats):
+                article = parse_article(soup, True, server.url)
+                start = time.perf_counter()
+                download_images(article.images, session)
+                times.append(time.perf_counter() - start)
+            results.add(f"fetch/{name}/images", min(times))
+            articles[name] = article
+    return articles
+
+
+def same_article(article: Article, other: Article) -> bool:
+    """Whether the articles are the same, other than when fetched."""
+    other.date_time_fetched = article.date_time_fetched
+    # Images without data are compared by URL instead.
+    return article == other and [image.url for image in article.images] == [
+        image.url for image in other.images]
+
+
+def bench_storage(
+    results: Results, sizes: list[int], samples: int,
+    texts: int, images: int, image_size: int
+) -> None:
+    """
+    Times inserting, loading and deleting articles in a temporary
+    database filled to each size. Articles are generated as they are
+    inserted, so only the insertion is timed.
+    """
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            data.DATABASE = pathlib.Path(folder) / "articles.db"
+            ids = []
+            insert_time = 0
+            for number in range(size):
+                article = make_article(number, texts, images, image_size)
+                start = time.perf_counter()
+                ids.append(data.insert_article(article))
+                insert_time += time.perf_counter() - start
+            results.add(f"storage/{size}/insert_article", insert_time, size)
+            start = time.perf_counter()
+            data.load_articles()
+            results.add(
+                f"storage/{size}/load_articles", time.perf_counter() - start)
+            sample = random.Random(0).sample(ids, min(samples, len(ids)))
+            start = time.perf_counter()
+            for article_id in sample:
+                data.delete_article_by_id(article_id)
+            results.add(
+                f"storage/{size}/delete_article_by_id",
+                time.perf_counter() - start, len(sample))
+            data.close_connections()
+
+
+def bench_frame(
+    results: Results, articles: dict[str, Article], repeats: int
+) -> None:
+    """
+    Times constructing the article view of each article in a withdrawn
+    window, with no decoded images cached.
+    """
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        for name in articles:
+            results.skip(f"frame/{name}", f"no display ({e})")
+        return
+    # Imported here as the GUI module requires a display.
+    import main
+
+    root.withdraw()
+    try:
+        for name, article in articles.items():
+            times = []
+            for _ in range(repeats):
+                main.PHOTO_IMAGE_CACHE.clear()
+                canvas = tk.Canvas(root, width=1200, height=700)
+                start = time.perf_counter()
+                main.ArticleFrame(canvas, article, True)
+                times.append(time.perf_counter() - start)
+                canvas.destroy()
+            results.add(f"frame/{name}", min(times))
+    finally:
+        root.destroy()
+
+
+def git_commit() -> str | None:
+    """Returns the current commit hash, if in a git repository."""
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "HEAD"), capture_output=True, text=True,
+            check=True, cwd=pathlib.Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """Runs the selected benchmarks and saves the results."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    benchmarks = ("startup", "parse", "fetch", "storage", "frame")
+    parser.add_argument(
+        "--only", nargs="+", choices=benchmarks, default=benchmarks)
+    parser.add_argument(
+        "--pages", type=pathlib.Path,
+        help="folder of saved article pages, instead of generated pages")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument("--image-size", type=int, default=2000)
+    parser.add_argument("--output", type=pathlib.Path)
+    args = parser.parse_args()
+    commit = git_commit()
+    output = args.output or RESULTS_FOLDER / f"{commit or 'results'}.json"
+    pages = load_pages(args.pages)
+    results = Results()
+    if "startup" in args.only:
+        bench_startup(results, args.repeats)
+    if "parse" in args.only:
+        bench_parse(results, pages, args.repeats)
+    if "fetch" in args.only or "frame" in args.only:
+        articles = bench_fetch(results, pages, args.repeats)
+    if "storage" in args.only:
+        bench_storage(
+            results, args.sizes, args.samples,
+            args.texts, args.images, args.image_size)
+    if "frame" in args.only:
+        bench_frame(results, articles, args.repeats)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "date": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results.timings,
+        "skipped": results.skipped,
+    }, indent=4))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,115 @@ Contains the Article class comprehensively
 representing a Telegraph article.
 """
 import datetime as dt
+import hashlib
 import json
 from contextlib import suppress
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
-import requests as rq
-from bs4 import BeautifulSoup
+from metrics import count, span
+from utils import HTML_PARSER, IMAGE_BASE_URL
 
-from utils import DOMAIN, HEADERS, REQUEST_TIMEOUT
+# The HTML parser and networking libraries are slow to import,
+# so are only imported once an article is first parsed or fetched.
+if TYPE_CHECKING:
+    import requests as rq
+    from bs4 import BeautifulSoup
 
 
-@dataclass
+@dataclass(slots=True)
 class Text:
     """Sub-Heading or paragraph."""
     contents: str
     is_subheading: bool
 
 
-@dataclass
+@dataclass(slots=True, init=False, eq=False)
 class Image:
-    """Represents an image in the article, including metadata."""
-    data: bytes
-    caption: str = None
-    credits: str = None
+    """
+    Represents an image in the article, including metadata.
+    Saved images only hold the hashes of their data in the image store,
+    the data being loaded each time it is needed.
+    """
+    caption: str
+    credits: str
+    url: str
+    # Size of the original image in pixels, if known.
+    width: int
+    height: int
+    data_hash: str
+    display_hash: str
+    _data: bytes = field(repr=False)
+    # Smaller copy fitting the article width, if the image is wider.
+    _display_data: bytes = field(repr=False)
 
+    def __init__(
+        self, data: bytes, caption: str = None, credits: str = None,
+        url: str = None, display_data: bytes = None, width: int = None,
+        height: int = None, data_hash: str = None, display_hash: str = None
+    ) -> None:
+        self._data = data
+        self.caption = caption
+        self.credits = credits
+        self.url = url
+        self._display_data = display_data
+        self.width = width
+        self.height = height
+        self.data_hash = data_hash
+        self.display_hash = display_hash
 
-@dataclass
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Image):
+            return NotImplemented
+        if self.stored and other.stored:
+            # Compare by hash, avoiding loading the data of either image.
+            return (
+                (self.data_hash, self.caption, self.credits)
+                == (other.data_hash, other.caption, other.credits))
+        return (
+            (self.data, self.caption, self.credits)
+            == (other.data, other.caption, other.credits))
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None and self.data_hash is not None:
+            return load_stored_image(self.data_hash)
+        return self._data
+
+    @data.setter
+    def data(self, data: bytes) -> None:
+        self._data = data
+
+    @property
+    def display_data(self) -> bytes | None:
+        if self._display_data is None and self.display_hash is not None:
+            return load_stored_image(self.display_hash)
+        return self._display_data
+
+    @display_data.setter
+    def display_data(self, display_data: bytes | None) -> None:
+        self._display_data = display_data
+
+    @property
+    def stored(self) -> bool:
+        """Whether the image data is in the image store."""
+        return self.data_hash is not None
+
+    @property
+    def pending(self) -> bool:
+        """Whether the image is yet to be downloaded."""
+        return self._data is None and self.data_hash is None
+
+
+def load_stored_image(hash_: str) -> bytes:
+    """Loads image data from the image store by hash."""
+    # Imported here as the database module depends on this module.
+    from data import load_image_data
+
+    return load_image_data(hash_)
+
+
+@dataclass(slots=True)
 class Article:
     """Represents a Telegraph article."""
     heading: str
@@ -39,10 +122,107 @@ class Article:
     description: str
     elements: list[Text | Image]
     id: int = None 
+    # Normalised URL (see utils.normalise_url) the article was loaded from.
+    url: str = None
+
+    @property
+    def images(self) -> list[Image]:
+        """All images in the article, in document order."""
+        return [
+            element for element in self.elements
+            if isinstance(element, Image)]
+
+    def content_hash(self) -> str:
+        """
+        Returns a hash of the article contents (excluding when it was
+        fetched), so a saved copy can be told to be current. Images are
+        identified by the hash of their data, or their URL if none.
+        """
+        elements = []
+        for element in self.elements:
+            if isinstance(element, Text):
+                elements.append(
+                    (bool(element.is_subheading), element.contents))
+                continue
+            if element.stored:
+                identity = element.data_hash
+            elif element.data is not None:
+                identity = hashlib.sha256(element.data).hexdigest()
+            else:
+                identity = element.url
+            elements.append((element.caption, element.credits, identity))
+        contents = json.dumps((
+            self.heading, self.description, self.author_name,
+            int(self.date_time_published.timestamp()), sorted(self.keywords),
+            elements))
+        return hashlib.sha256(contents.encode()).hexdigest()
 
 
-def load_article_from_soup(soup: BeautifulSoup, fetch_images: bool) -> Article:
+@dataclass(slots=True)
+class ArticleSummary:
+    """Lightweight article details, without the article contents."""
+    id: int
+    heading: str
+    author_name: str
+    date_time_published: dt.datetime
+    date_time_fetched: dt.datetime
+
+
+def make_soup(
+    markup: str | bytes, parser: str = HTML_PARSER
+) -> "BeautifulSoup":
+    """Parses HTML using the given tree builder (by default, the one set)."""
+    from bs4 import BeautifulSoup
+
+    count("parse.bytes", len(markup))
+    with span("parse.tree", size=len(markup)):
+        return BeautifulSoup(markup, parser)
+
+
+def page_url(soup: "BeautifulSoup") -> str | None:
+    """
+    Returns the URL a saved article page gives for itself (canonical
+    link or og:url), if any.
+    """
+    link = soup.find("link", {"rel": "canonical", "href": True})
+    if link is not None:
+        return link["href"]
+    meta = soup.find("meta", {"property": "og:url", "content": True})
+    return None if meta is None else meta["content"]
+
+
+def load_article_from_soup(
+    soup: "BeautifulSoup", fetch_images: bool, session: "rq.Session" = None
+) -> Article:
     """Loads an article from the HTML contents."""
+    from network import download_images
+
+    article = parse_article(soup, fetch_images)
+    if fetch_images:
+        download_images(article.images, session)
+    return article
+
+
+def parse_article(
+    soup: "BeautifulSoup", include_images: bool,
+    image_base_url: str = IMAGE_BASE_URL
+) -> Article:
+    """
+    Parses an article from the HTML contents. Images are
+    included without their data, which must then be downloaded.
+    """
+    with span("parse.extract"):
+        article = extract_article(soup, include_images, image_base_url)
+    count("parse.elements", len(article.elements))
+    return article
+
+
+def extract_article(
+    soup: "BeautifulSoup", include_images: bool, image_base_url: str
+) -> Article:
+    """Extracts the article from the parsed HTML (see parse_article)."""
+    from bs4 import Tag
+
     json_data = json.loads(
         soup.find("script", {"data-js": "main-json-schema"}).text)
     heading = json_data["headline"]
@@ -65,10 +245,15 @@ def load_article_from_soup(soup: BeautifulSoup, fetch_images: bool) -> Article:
     elements = []
     article_element = soup.find("article")
     image = None
-    for child in article_element.find_all(recursive=True):
-        text = child.text.strip()
+    # Single pass over the descendant tags in document order. Text is only
+    # built for the tags that are kept, since building it for every tag
+    # repeats the work for each ancestor (quadratic in nesting depth).
+    for child in article_element.descendants:
+        if not isinstance(child, Tag):
+            continue
+        name = child.name
         if (
-            child.name == "p" and child.get("itemprop") != "description"
+            name == "p" and child.get("itemprop") != "description"
             # Ignore 'Recommended' text.
             and child.get("data-test") != "cmp-teaser__pretitle"
         ):
@@ -76,34 +261,28 @@ def load_article_from_soup(soup: BeautifulSoup, fetch_images: bool) -> Article:
             if image is not None:
                 elements.append(image)
                 image = None
-            elements.append(Text(text, False))
-        if (
-            child.name == "h2"
-            and "u-heading-size-medium" in child.get("class", "")
-        ):
+            elements.append(Text(child.get_text().strip(), False))
+        if name == "h2" and "u-heading-size-medium" in child.get("class", ""):
             # Subheading.
             if image is not None:
                 elements.append(image)
                 image = None
-            elements.append(Text(text, True))
-        if not fetch_images:
+            elements.append(Text(child.get_text().strip(), True))
+        if not include_images:
             # IMAGES OFF - DO NOT CONTINUE FURTHER.
             continue
-        if child.name == "picture":
-            # Image (use <img> inside the <picture>)
-            response = rq.get(
-                f"https://{DOMAIN}/{child.find('img')['src']}",
-                headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if response.status_code >= 400:
-                raise RuntimeError(
-                    f"Image fetch status code: {response.status_code}")
-            image = Image(response.content)                
-        if child.get("itemprop") == "caption":
+        if name == "picture":
+            # Image (use <img> inside the <picture>), downloaded later.
+            image = Image(
+                None, url=f"{image_base_url}/{child.find('img')['src']}")
+        itemprop = child.get("itemprop")
+        if itemprop == "caption":
             # Image caption (must follow image).
-            image.caption = text
-        if child.get("itemprop") == "copyrightHolder":
+            image.caption = child.get_text().strip()
+        if itemprop == "copyrightHolder":
             # Image credits (must follow image).
-            image.credits = text.removeprefix("Credit:").strip()
+            image.credits = (
+                child.get_text().strip().removeprefix("Credit:").strip())
     if image is not None:
         elements.append(image)
     return Article(
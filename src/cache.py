@@ -0,0 +1,191 @@
+"""
+Persistent HTTP response cache - response bodies are stored on disk
+and stale responses are revalidated with conditional requests.
+"""
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import requests as rq
+
+from metrics import count
+from utils import CACHE_FOLDER, CACHE_MAX_SIZE, CACHE_TTL
+
+
+@dataclass
+class CacheStats:
+    """
+    Counts of how responses were served, also added to the metrics
+    counters of the same names (prefixed "cache.").
+    """
+    # Served from disk without any request.
+    hits: int = 0
+    # Served from disk after a 304 (Not Modified) response.
+    revalidated: int = 0
+    # Downloaded in full.
+    misses: int = 0
+    bytes_served: int = 0
+    bytes_downloaded: int = 0
+
+
+class ResponseCache:
+    """
+    Cache of GET response bodies by key, evicting the least recently
+    used responses once the total size exceeds the maximum size.
+    Responses older than the TTL are revalidated using their
+    ETag/Last-Modified headers. Safe to use from multiple threads.
+    """
+
+    def __init__(
+        self, folder: pathlib.Path = CACHE_FOLDER,
+        max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL
+    ) -> None:
+        self.folder = folder
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._index = sqlite3.connect(
+            self.folder / "index.db", check_same_thread=False)
+        self._index.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses(
+                key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+                stored_at REAL, used_at REAL, size INTEGER
+            )""")
+        self._index.execute(
+            "CREATE INDEX IF NOT EXISTS responses_used_at "
+            "ON responses(used_at)")
+        self._index.commit()
+
+    def path(self, key: str) -> pathlib.Path:
+        """Returns the path the body of a response is stored at."""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.folder / digest[:2] / digest
+
+    def fetch(
+        self, session: rq.Session, url: str, timeout: float, key: str = None,
+        read: Callable[[rq.Response], bytes] = None
+    ) -> tuple[int, bytes]:
+        """
+        Returns the status code and body of a GET request to the URL,
+        served from the cache where possible. The key defaults to the URL.
+        If given, the read function returns the body to use and cache
+        from a streamed response, which need not be read in full.
+        Error responses (status code 400+) are not cached.
+        """
+        key = key or url
+        with self._lock:
+            record = self._index.execute(
+                "SELECT etag, last_modified, stored_at FROM responses "
+                "WHERE key = ?", (key,)).fetchone()
+        headers = {}
+        if record is not None:
+            etag, last_modified, stored_at = record
+            if time.time() - stored_at < self.ttl:
+                body = self._read(key)
+                if body is not None:
+                    self._touch(key, stored_at)
+                    self._count("hits", len(body))
+                    return 200, body
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+        stream = read is not None
+        response = session.get(
+            url, headers=headers, timeout=timeout, stream=stream)
+        if response.status_code == 304 and record is not None:
+            response.close()
+            body = self._read(key)
+            if body is not None:
+                self._touch(key, time.time())
+                self._count("revalidated", len(body))
+                return 200, body
+            # Evicted in the meantime - download in full.
+            response = session.get(url, timeout=timeout, stream=stream)
+        if stream:
+            with response:
+                body = read(response)
+        else:
+            body = response.content
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.bytes_downloaded += len(body)
+        count("cache.misses")
+        count("cache.bytes_downloaded", len(body))
+        if response.status_code < 400:
+            self._store(
+                key, body, response.headers.get("ETag"),
+                response.headers.get("Last-Modified"))
+        return response.status_code, body
+
+    def clear(self) -> None:
+        """Removes all cached responses."""
+        with self._lock:
+            keys = self._index.execute("SELECT key FROM responses").fetchall()
+            self._remove([key for key, in keys])
+
+    def _count(self, name: str, size: int) -> None:
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+            self.stats.bytes_served += size
+        count(f"cache.{name}")
+        count("cache.bytes_served", size)
+
+    def _read(self, key: str) -> bytes | None:
+        """Returns a stored response body, or None if missing."""
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _touch(self, key: str, stored_at: float) -> None:
+        with self._lock:
+            self._index.execute(
+                "UPDATE responses SET stored_at = ?, used_at = ? "
+                "WHERE key = ?", (stored_at, time.time(), key))
+            self._index.commit()
+
+    def _store(
+        self, key: str, body: bytes, etag: str | None,
+        last_modified: str | None
+    ) -> None:
+        """Stores a response body, then evicts responses over the size."""
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write then rename so readers never see a partial body.
+        temporary_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary_path.write_bytes(body)
+        os.replace(temporary_path, path)
+        now = time.time()
+        with self._lock:
+            self._index.execute(
+                "INSERT OR REPLACE INTO responses VALUES(?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, now, now, len(body)))
+            total_size = self._index.execute(
+                "SELECT SUM(size) FROM responses").fetchone()[0]
+            evicted = []
+            for old_key, size in self._index.execute(
+                "SELECT key, size FROM responses WHERE key != ? "
+                "ORDER BY used_at", (key,)
+            ):
+                if total_size <= self.max_size:
+                    break
+                evicted.append(old_key)
+                total_size -= size
+            self._remove(evicted)
+
+    def _remove(self, keys: list[str]) -> None:
+        """Removes responses - the lock must be held."""
+        for key in keys:
+            self.path(key).unlink(missing_ok=True)
+        self._index.executemany(
+            "DELETE FROM responses WHERE key = ?", ((key,) for key in keys))
+        self._index.commit()
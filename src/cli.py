@@ -0,0 +1,249 @@
+"""
+Headless command line interface - imports locally saved article HTML
+files into the database, compacts the database and reports the space
+used, without the GUI.
+
+Usage: python src/cli.py import FOLDER [--workers N] [--batch-size N]
+       python src/cli.py compact [--image-quality Q] [--vacuum]
+       python src/cli.py storage [--top N]
+"""
+import argparse
+import os
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from article import Article, load_article_from_soup, make_soup, page_url
+from metrics import metrics
+from utils import normalise_url
+
+
+DEFAULT_BATCH_SIZE = 100
+# Number of articles loaded to measure load latency when compacting.
+DEFAULT_LATENCY_SAMPLES = 50
+# Number of the largest articles listed by the storage report.
+DEFAULT_TOP_ARTICLES = 20
+HTML_SUFFIXES = (".html", ".htm")
+
+
+def parse_file(
+    path: str, fetch_images: bool
+) -> tuple[str, Article | None, str | None]:
+    """
+    Worker process - parses an article HTML file, keyed by the URL the
+    page gives if any (as articles loaded from the site are). Returns
+    the path, and the article or the error message upon failure.
+    """
+    try:
+        soup = make_soup(pathlib.Path(path).read_bytes())
+        article = load_article_from_soup(soup, fetch_images)
+        url = page_url(soup)
+        if url is not None:
+            article.url = normalise_url(url)
+        return path, article, None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def find_html_files(folder: pathlib.Path) -> list[pathlib.Path]:
+    """Returns all HTML files in the folder and its subfolders, sorted."""
+    return sorted(
+        path.resolve() for path in folder.rglob("*")
+        if path.suffix.lower() in HTML_SUFFIXES and path.is_file())
+
+
+def import_folder(
+    folder: pathlib.Path, workers: int, batch_size: int, fetch_images: bool
+) -> int:
+    """
+    Imports all HTML files in the folder not already imported (unchanged),
+    parsing across a process pool and saving in batched transactions.
+    Files which fail are reported and retried next time.
+    Returns the number of files which failed.
+    """
+    # Only the main process uses the database.
+    from data import import_articles, load_imported_files
+
+    imported_files = load_imported_files()
+    paths = [
+        path for path in find_html_files(folder)
+        if imported_files.get(str(path)) != path.stat().st_mtime]
+    print(f"{len(paths)} files to import.")
+    imported = failed = 0
+    batch = []
+    start = time.perf_counter()
+
+    def save_batch() -> None:
+        nonlocal imported
+        import_articles(batch)
+        imported += len(batch)
+        batch.clear()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{imported + failed}/{len(paths)} files, {failed} failed, "
+            f"{imported / elapsed:.1f} articles/s")
+
+    with ProcessPoolExecutor(workers) as executor:
+        results = executor.map(
+            parse_file, map(str, paths), (fetch_images,) * len(paths),
+            chunksize=max(len(paths) // (workers * 16), 1))
+        for path, article, error in results:
+            if article is None:
+                failed += 1
+                print(f"Failed to import {path}: {error}", file=sys.stderr)
+                continue
+            batch.append((path, pathlib.Path(path).stat().st_mtime, article))
+            if len(batch) >= batch_size:
+                save_batch()
+        if batch:
+            save_batch()
+    elapsed = time.perf_counter() - start
+    print(
+        f"Imported {imported} articles in {elapsed:.1f}s "
+        f"({imported / elapsed if elapsed else 0:.1f} articles/s), "
+        f"{failed} failed.")
+    return failed
+
+
+def load_latency(samples: int) -> float:
+    """
+    Returns the mean seconds taken to load articles, over a sample
+    of saved articles (the same sample each time), or 0 if none.
+    """
+    from data import load_article_by_id, load_article_summaries
+
+    article_ids = sorted(
+        summary.id for summary in load_article_summaries())
+    sample = random.Random(0).sample(
+        article_ids, min(samples, len(article_ids)))
+    start = time.perf_counter()
+    for article_id in sample:
+        load_article_by_id(article_id)
+    return (time.perf_counter() - start) / len(sample) if sample else 0
+
+
+def compact(
+    image_quality: int | None, batch_size: int, vacuum: bool, samples: int
+) -> None:
+    """
+    Compacts the database - applying any pending migrations (which
+    compress existing article text), optionally re-encoding images at
+    a quality cap and rebuilding the file - reporting the size in use
+    and load latency at each step.
+    """
+    import data
+
+    def report(step: str) -> None:
+        size, free = data.database_size()
+        print(
+            f"{step}: {(size - free) / 1024 ** 2:.1f} MiB in use "
+            f"({size / 1024 ** 2:.1f} MiB file), "
+            f"{load_latency(samples) * 1000:.2f} ms per article load.")
+
+    if data.DATABASE.is_file():
+        print(
+            "Before: "
+            f"{data.DATABASE.stat().st_size / 1024 ** 2:.1f} MiB file.")
+    # The first connection applies any pending migrations.
+    report("Migrated")
+    if image_quality is not None:
+        saved = data.recompress_images(
+            image_quality, batch_size,
+            lambda done, total: print(f"{done}/{total} images checked."))
+        print(f"Re-encoding saved {saved / 1024 ** 2:.1f} MiB of images.")
+    if vacuum:
+        data.vacuum()
+    report("After")
+
+
+def storage(top: int) -> None:
+    """
+    Reports the space used by the database, by each table (where
+    supported by the SQLite library) and by the largest articles.
+    """
+    import data
+
+    size, free = data.database_size()
+    print(
+        f"Database: {size / 1024 ** 2:.1f} MiB file, "
+        f"{free / 1024 ** 2:.1f} MiB free.")
+    for table, table_size in data.table_storage().items():
+        print(f"{table:<24} {table_size / 1024 ** 2:10.1f} MiB")
+    print(f"{'ID':>8} {'Text KiB':>10} {'Images KiB':>12}  Heading")
+    for summary, text_size, image_size in data.article_storage(top):
+        print(
+            f"{summary.id:>8} {text_size / 1024:10.1f} "
+            f"{image_size / 1024:12.1f}  {summary.heading}")
+
+
+def quality(value: str) -> int:
+    """Parses an image quality, from 1 to 95."""
+    number = int(value)
+    if not 1 <= number <= 95:
+        raise argparse.ArgumentTypeError("Quality must be from 1 to 95.")
+    return number
+
+
+def main() -> None:
+    """Parses the command line arguments and runs the command."""
+    parser = argparse.ArgumentParser(
+        description="The Telegraph Paywall Bypass (headless).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import", help="Import a folder of saved article HTML files.")
+    import_parser.add_argument("folder", type=pathlib.Path)
+    import_parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Number of parsing processes.")
+    import_parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help="Number of articles saved per transaction.")
+    import_parser.add_argument(
+        "--images", action="store_true", help="Download article images.")
+    import_parser.add_argument(
+        "--image-quality", type=quality,
+        help="Re-encode JPEG/WebP images at this quality where smaller.")
+    compact_parser = commands.add_parser(
+        "compact", help="Compress the database and report the savings.")
+    compact_parser.add_argument(
+        "--image-quality", type=quality,
+        help="Re-encode stored JPEG/WebP images at this quality "
+            "where smaller.")
+    compact_parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help="Number of images re-encoded per transaction.")
+    compact_parser.add_argument(
+        "--vacuum", action="store_true",
+        help="Rebuild the database file to return free space.")
+    compact_parser.add_argument(
+        "--samples", type=int, default=DEFAULT_LATENCY_SAMPLES,
+        help="Number of articles loaded to measure load latency.")
+    storage_parser = commands.add_parser(
+        "storage", help="Report the space used by tables and articles.")
+    storage_parser.add_argument(
+        "--top", type=int, default=DEFAULT_TOP_ARTICLES,
+        help="Number of the largest articles listed.")
+    parser.add_argument(
+        "--metrics-log", type=pathlib.Path,
+        help="Append timing spans to this file as JSON lines.")
+    args = parser.parse_args()
+    if args.metrics_log is not None:
+        metrics.enable_log(args.metrics_log)
+    if args.command == "import":
+        if args.image_quality is not None:
+            import data
+
+            data.IMAGE_QUALITY = args.image_quality
+        failed = import_folder(
+            args.folder, args.workers, args.batch_size, args.images)
+        sys.exit(1 if failed else 0)
+    if args.command == "compact":
+        compact(args.image_quality, args.batch_size, args.vacuum, args.samples)
+    if args.command == "storage":
+        storage(args.top)
+
+
+if __name__ == "__main__":
+    main()
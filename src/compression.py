@@ -0,0 +1,68 @@
+"""
+Compression of stored article text - raw DEFLATE primed with a preset
+dictionary of words common in news articles, so that even the short
+paragraphs of an article compress well.
+"""
+import zlib
+
+
+# Format of compressed text: a format byte, then the compressed data.
+# The dictionary of a format must never change, as text compressed with
+# it could no longer be read - add a new format instead.
+FORMAT_DICTIONARY_V1 = 1
+# Texts shorter than this (characters) are stored uncompressed.
+MIN_COMPRESSED_LENGTH = 64
+COMPRESSION_LEVEL = 9
+# Raw DEFLATE - no zlib header or checksum, the format byte identifying it.
+WBITS = -15
+# Most common words are placed last, as closer matches encode shorter.
+DICTIONARY_V1 = (
+    "Telegraph Britain British England London Westminster Downing Street "
+    "Prime Minister Chancellor Labour Conservative Tory Tories Reform "
+    "Liberal Democrats Parliament Commons Lords MPs MP minister ministers "
+    "government council police court judge trial officers investigation "
+    "according spokesman spokeswoman statement announced reported "
+    "reportedly suggested confirmed revealed warned claimed insisted "
+    "percent per cent million billion thousand pounds £ dollars $ "
+    "Monday Tuesday Wednesday Thursday Friday Saturday Sunday "
+    "January February March April May June July August September "
+    "October November December yesterday today tomorrow week month year "
+    "years months weeks days people public country world national "
+    "international economy economic business company companies market "
+    "prices inflation interest rates tax taxes costs NHS health hospital "
+    "patients doctors schools education children families women men "
+    "Ukraine Russia America United States China Europe European Union "
+    "war military security election elections vote voters campaign "
+    "policy plans plan decision support however although because while "
+    "during after before since about against between through without "
+    "could would should might must will can may also only just even "
+    "still already more most many much some other such than then there "
+    "their they them these those this that what which who when where "
+    "how have has had been being were was are is it its his her him she "
+    "he we our us you your not no but or as at by from on in to of and "
+    "a an the. The said, said that the ").encode()
+DICTIONARIES = {FORMAT_DICTIONARY_V1: DICTIONARY_V1}
+
+
+def compress_text(text: str) -> str | bytes:
+    """
+    Returns the text compressed, unless too short to benefit, in which
+    case the text itself is returned.
+    """
+    if len(text) < MIN_COMPRESSED_LENGTH:
+        return text
+    compressor = zlib.compressobj(
+        COMPRESSION_LEVEL, zlib.DEFLATED, WBITS, zdict=DICTIONARY_V1)
+    data = compressor.compress(text.encode()) + compressor.flush()
+    return bytes((FORMAT_DICTIONARY_V1,)) + data
+
+
+def decompress_text(stored: str | bytes) -> str:
+    """Returns the text of stored text, compressed or not."""
+    if isinstance(stored, str):
+        return stored
+    format_, data = stored[0], stored[1:]
+    if format_ not in DICTIONARIES:
+        raise RuntimeError(f"Unknown text compression format: {format_}")
+    decompressor = zlib.decompressobj(WBITS, zdict=DICTIONARIES[format_])
+    return (decompressor.decompress(data) + decompressor.flush()).decode()
@@ -1,184 +1,1321 @@
 """Database handling - saving article data and fetching it."""
 import datetime as dt
-import pathlib
+import hashlib
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
 
-from article import Article, Text, Image
+from article import Article, ArticleSummary, Text, Image
+from compression import MIN_COMPRESSED_LENGTH, compress_text, decompress_text
+from metrics import count, span
+from utils import DATA_FOLDER, IMAGE_SAVE_QUALITY
 
 
 # Paths
-DATA_FOLDER = pathlib.Path(__file__).parent.parent / "data"
-DATA_FOLDER.mkdir(exist_ok=True)
 DATABASE = DATA_FOLDER / "articles.db"
 # Table names
 ARTICLE_TABLE = "articles"
 TEXT_TABLE = "texts"
 IMAGE_TABLE = "images"
+IMAGE_BLOB_TABLE = "image_blobs"
 ARTICLE_KEYWORD_TABLE = "articles_keywords"
 KEYWORD_TABLE = "keywords"
+SEARCH_TABLE = "articles_search"
+IMPORT_TABLE = "imported_files"
+# Connection settings
+BUSY_TIMEOUT = 10
+STATEMENT_CACHE_SIZE = 256
+CACHE_SIZE_KIB = 16 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+# Number of records converted per transaction by migrations and upkeep.
+MIGRATION_BATCH_SIZE = 500
+# Number of free pages returned to the system per maintenance step, and
+# the number of free pages left for reuse rather than returned.
+VACUUM_STEP_PAGES = 256
+VACUUM_MIN_FREE_PAGES = 1024
+# Number of articles listed by storage used.
+STORAGE_LIMIT = 100
+# Quality images are re-encoded at when saved (see images.recompress),
+# or None to save images as downloaded.
+IMAGE_QUALITY = IMAGE_SAVE_QUALITY
+
+# Columns saved articles can be sorted by, by sort key. Ties are broken
+# by article ID, so each row has a unique position in the order.
+SORT_COLUMNS = {
+    "id": "article_id",
+    "heading": "heading",
+    "author": "author_name",
+    "published": "published_timestamp",
+    "fetched": "fetched_timestamp",
+}
+# Maximum number of search results, and words in each result snippet.
+SEARCH_LIMIT = 100
+SNIPPET_WORDS = 12
+
+# Columns of the main article record, as loaded.
+ARTICLE_COLUMNS = (
+    "article_id, heading, description, author_name, "
+    "published_timestamp, fetched_timestamp, url")
+
+# Changes listeners are notified of, with the article ID.
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+
+# Long-lived connections of each thread, by database path.
+_local = threading.local()
+# Functions called upon articles being saved or deleted.
+_listeners: list[Callable[[str, int], None]] = []
+# Databases whose schema has been checked by this process.
+_checked_databases = set()
+_schema_lock = threading.Lock()
+
+
+def add_listener(listener: Callable[[str, int], None]) -> None:
+    """
+    Registers a function to be called with the change (INSERTED/UPDATED/
+    DELETED) and article ID once each change is committed. The function
+    is called in the thread making the change.
+    """
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[str, int], None]) -> None:
+    _listeners.remove(listener)
+
+
+def notify(change: str, article_id: int) -> None:
+    """Notifies all listeners of a committed change."""
+    for listener in tuple(_listeners):
+        listener(change, article_id)
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns the connection of the current thread to the database,
+    opening and tuning it upon first use. Each thread has its own
+    connection so background workers can safely use the database.
+    The schema is checked upon the first connection of the process.
+    Transactions are begun explicitly (see Database), so schema changes
+    are part of the transaction rather than each committed on their own.
+    """
+    connections = _local.__dict__.setdefault("connections", {})
+    connection = connections.get(DATABASE)
+    if connection is None:
+        DATABASE.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            DATABASE, timeout=BUSY_TIMEOUT, isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE)
+        # Write-ahead logging lets readers and a writer work at once,
+        # only syncing upon checkpoints rather than every commit.
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA cache_size = {-CACHE_SIZE_KIB}")
+        connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        # Ensure foreign keys are enabled for integrity.
+        connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            check_schema(connection)
+        except Exception:
+            connection.close()
+            raise
+        connections[DATABASE] = connection
+    return connection
+
+
+def check_schema(connection: sqlite3.Connection) -> None:
+    """
+    Creates the tables and applies any migrations, once per database per
+    process. Databases stamped with the latest schema version (the user
+    version) are otherwise left as they are, without any schema changes.
+    """
+    with _schema_lock:
+        if DATABASE in _checked_databases:
+            return
+        cursor = connection.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with transaction(connection):
+                create_tables(cursor)
+            migrate(cursor)
+        use_incremental_vacuum(cursor)
+        _checked_databases.add(DATABASE)
+
+
+def close_connections() -> None:
+    """Closes all connections of the current thread."""
+    connections = _local.__dict__.get("connections", {})
+    for connection in connections.values():
+        connection.close()
+    connections.clear()
+
+
+@contextmanager
+def transaction(connection: sqlite3.Connection) -> Iterator[None]:
+    """
+    Runs the block in one transaction, committed if no error occurred,
+    otherwise rolled back. A block within a transaction already begun
+    is part of that transaction.
+    """
+    if connection.in_transaction:
+        yield
+        return
+    connection.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        connection.rollback()
+        raise
+    connection.commit()
 
 
 class Database:
-    """Sqlite3 database wrapper."""
+    """
+    Sqlite3 database wrapper, using the long-lived connection
+    of the current thread. Each context is one transaction.
+    """
 
     def __enter__(self) -> sqlite3.Cursor:
         """Start of database processing context manager."""
-        self.connection = sqlite3.connect(DATABASE)
-        cursor = self.connection.cursor()
-        # Ensure foreign keys are enabled for integrity.
-        cursor.execute("PRAGMA foreign_keys = ON")
-        return cursor
+        connection = get_connection()
+        self.transaction = transaction(connection)
+        self.transaction.__enter__()
+        return connection.cursor()
     
-    def __exit__(self, exception: Exception | None, *_) -> None:
+    def __exit__(self, *exception_info) -> None:
         """Context manager exited - commit if no error occurred."""
-        if exception is None:
-            self.connection.commit()
-        self.connection.close()
-        self.connection = None
+        self.transaction.__exit__(*exception_info)
+        self.transaction = None
 
 
-def create_tables() -> None:
+def create_tables(cursor: sqlite3.Cursor) -> None:
     """Creates all tables in case they do not exist."""
-    with Database() as cursor:
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {ARTICLE_TABLE}(
-                article_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                heading TEXT, description TEXT, author_name TEXT,
-                published_timestamp INTEGER, fetched_timestamp INTEGER
-            )""")
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {TEXT_TABLE}(
-                text_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER, is_subheading INTEGER,
-                contents TEXT, position INTEGER,
-                FOREIGN KEY (article_id) REFERENCES {ARTICLE_TABLE}(article_id)
-            )""")
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {IMAGE_TABLE}(
-                image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER, data BLOB, caption TEXT,
-                credits TEXT, position INTEGER,
-                FOREIGN KEY (article_id) REFERENCES {ARTICLE_TABLE}(article_id)
-            )""")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {ARTICLE_TABLE}(
+            article_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            heading TEXT, description TEXT, author_name TEXT,
+            published_timestamp INTEGER, fetched_timestamp INTEGER
+        )""")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {TEXT_TABLE}(
+            text_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER, is_subheading INTEGER,
+            contents TEXT, position INTEGER,
+            FOREIGN KEY (article_id) REFERENCES {ARTICLE_TABLE}(article_id)
+        )""")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {IMAGE_TABLE}(
+            image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER, data BLOB, caption TEXT,
+            credits TEXT, position INTEGER,
+            FOREIGN KEY (article_id) REFERENCES {ARTICLE_TABLE}(article_id)
+        )""")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {KEYWORD_TABLE}(
+            keyword_id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT
+        )""")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {ARTICLE_KEYWORD_TABLE}(
+            article_id INTEGER, keyword_id INTEGER,
+            PRIMARY KEY (article_id, keyword_id)
+        )""")
+
+
+def add_column(cursor: sqlite3.Cursor, table: str, definition: str) -> None:
+    """Adds a column to a table, unless the table already has it."""
+    name = definition.split()[0]
+    if cursor.execute(
+        "SELECT 1 FROM pragma_table_info(?) WHERE name = ?", (table, name)
+    ).fetchone() is None:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+def add_indexes(cursor: sqlite3.Cursor) -> None:
+    """
+    Indexes the article ID columns used for per-article lookups,
+    and makes keywords unique, merging any existing duplicates.
+    """
+    create_article_indexes(cursor)
+    # Point links to duplicate keywords at the first such keyword.
+    cursor.execute(
+        f"""
+        UPDATE OR IGNORE {ARTICLE_KEYWORD_TABLE} SET keyword_id = (
+            SELECT MIN(duplicate.keyword_id) FROM {KEYWORD_TABLE} AS duplicate
+            JOIN {KEYWORD_TABLE} AS original USING (keyword)
+            WHERE original.keyword_id = {ARTICLE_KEYWORD_TABLE}.keyword_id
+        )""")
+    cursor.execute(
+        f"""
+        DELETE FROM {KEYWORD_TABLE} WHERE keyword_id NOT IN (
+            SELECT MIN(keyword_id) FROM {KEYWORD_TABLE} GROUP BY keyword
+        )""")
+    # Links left behind had both the duplicate and first keyword.
+    cursor.execute(
+        f"""
+        DELETE FROM {ARTICLE_KEYWORD_TABLE} WHERE keyword_id NOT IN (
+            SELECT keyword_id FROM {KEYWORD_TABLE}
+        )""")
+    cursor.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {KEYWORD_TABLE}_keyword "
+        f"ON {KEYWORD_TABLE}(keyword)")
+
+
+def create_article_indexes(cursor: sqlite3.Cursor) -> None:
+    """Indexes the article ID columns of the article contents tables."""
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {TEXT_TABLE}_article_id "
+        f"ON {TEXT_TABLE}(article_id, position)")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {IMAGE_TABLE}_article_id "
+        f"ON {IMAGE_TABLE}(article_id, position)")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {ARTICLE_KEYWORD_TABLE}_keyword_id "
+        f"ON {ARTICLE_KEYWORD_TABLE}(keyword_id)")
+
+
+def add_image_store(cursor: sqlite3.Cursor) -> None:
+    """
+    Moves image data into a store of unique images keyed by hash,
+    counting the references of each, so repeated images are stored once.
+    """
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {IMAGE_BLOB_TABLE}(
+            hash TEXT PRIMARY KEY, data BLOB, size INTEGER, ref_count INTEGER
+        )""")
+    add_column(cursor, IMAGE_TABLE, "hash TEXT")
+    image_ids = cursor.execute(
+        f"SELECT image_id FROM {IMAGE_TABLE} WHERE data IS NOT NULL"
+    ).fetchall()
+    # One image at a time, to avoid holding all image data in memory.
+    for (image_id,) in image_ids:
+        data = cursor.execute(
+            f"SELECT data FROM {IMAGE_TABLE} WHERE image_id = ?",
+            (image_id,)).fetchone()[0]
+        hash_ = store_image(cursor, data)
         cursor.execute(
+            f"UPDATE {IMAGE_TABLE} SET data = NULL, hash = ? "
+            "WHERE image_id = ?", (hash_, image_id))
+
+
+def add_display_variants(cursor: sqlite3.Cursor) -> None:
+    """
+    Allows images to reference a display variant in the image store.
+    Existing images have no variant and are resized upon display.
+    """
+    add_column(cursor, IMAGE_TABLE, "display_hash TEXT")
+
+
+def add_search_index(cursor: sqlite3.Cursor) -> None:
+    """
+    Adds a full-text search index of the heading, description,
+    body text and keywords of each article, by article ID.
+    """
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(heading, description, body, keywords)")
+    cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    cursor.execute(
+        f"""
+        INSERT INTO {SEARCH_TABLE}(rowid, heading, description, body, keywords)
+        SELECT article_id, heading, description, (
+            SELECT group_concat(contents, char(10)) FROM (
+                SELECT contents FROM {TEXT_TABLE}
+                WHERE {TEXT_TABLE}.article_id = {ARTICLE_TABLE}.article_id
+                ORDER BY position
+            )
+        ), (
+            SELECT group_concat(keyword, ' ') FROM {ARTICLE_KEYWORD_TABLE}
+            JOIN {KEYWORD_TABLE} USING (keyword_id)
+            WHERE {ARTICLE_KEYWORD_TABLE}.article_id
+                = {ARTICLE_TABLE}.article_id
+        ) FROM {ARTICLE_TABLE}""")
+
+
+def add_import_log(cursor: sqlite3.Cursor) -> None:
+    """Records the files articles were imported from, for resuming."""
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {IMPORT_TABLE}(
+            path TEXT PRIMARY KEY, modified_time REAL, article_id INTEGER
+        )""")
+
+
+def add_image_sizes(cursor: sqlite3.Cursor) -> None:
+    """
+    Records the size in pixels of each image, so images can be laid out
+    without loading their data. Sizes of existing images are read from
+    their headers, one image at a time.
+    """
+    from images import image_size
+
+    add_column(cursor, IMAGE_TABLE, "width INTEGER")
+    add_column(cursor, IMAGE_TABLE, "height INTEGER")
+    hashes = cursor.execute(
+        f"SELECT DISTINCT hash FROM {IMAGE_TABLE} WHERE hash IS NOT NULL"
+    ).fetchall()
+    for (hash_,) in hashes:
+        data = cursor.execute(
+            f"SELECT data FROM {IMAGE_BLOB_TABLE} WHERE hash = ?",
+            (hash_,)).fetchone()[0]
+        size = image_size(data)
+        if size is not None:
+            cursor.execute(
+                f"UPDATE {IMAGE_TABLE} SET width = ?, height = ? "
+                "WHERE hash = ?", (*size, hash_))
+
+
+def compress_texts(cursor: sqlite3.Cursor) -> Iterator[None]:
+    """
+    Compresses the text of existing articles (see compression), in
+    batches. Compressed text is stored as a blob, so text not yet
+    compressed is told apart by its type, should the migration resume.
+    """
+    last_text_id = 0
+    while True:
+        records = cursor.execute(
             f"""
-            CREATE TABLE IF NOT EXISTS {KEYWORD_TABLE}(
-                keyword_id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT
-            )""")
-        cursor.execute(
+            SELECT text_id, contents FROM {TEXT_TABLE}
+            WHERE text_id > ? AND typeof(contents) = 'text'
+                AND length(contents) >= ?
+            ORDER BY text_id LIMIT ?""",
+            (last_text_id, MIN_COMPRESSED_LENGTH, MIGRATION_BATCH_SIZE)
+        ).fetchall()
+        if not records:
+            return
+        cursor.executemany(
+            f"UPDATE {TEXT_TABLE} SET contents = ? WHERE text_id = ?",
+            ((compress_text(contents), text_id)
+                for text_id, contents in records))
+        last_text_id = records[-1][0]
+        yield
+
+
+def add_sort_indexes(cursor: sqlite3.Cursor) -> None:
+    """
+    Indexes each column saved articles can be sorted by (with the
+    article ID breaking ties), so pages of articles in any order are
+    read straight from an index.
+    """
+    for column in SORT_COLUMNS.values():
+        if column != "article_id":
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {ARTICLE_TABLE}_{column} "
+                f"ON {ARTICLE_TABLE}({column}, article_id)")
+
+
+def add_article_urls(cursor: sqlite3.Cursor) -> None:
+    """
+    Records the URL of each article, unique so each article is saved
+    once, and the hash of its contents (see Article.content_hash).
+    Existing articles have neither, so are never matched.
+    """
+    add_column(cursor, ARTICLE_TABLE, "url TEXT")
+    add_column(cursor, ARTICLE_TABLE, "content_hash TEXT")
+    cursor.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {ARTICLE_TABLE}_url "
+        f"ON {ARTICLE_TABLE}(url)")
+
+
+def add_cascading_deletes(cursor: sqlite3.Cursor) -> None:
+    """
+    Rebuilds the tables of article contents with foreign keys deleting
+    them with their article, adding triggers which release the images
+    and delete the search record of deleted articles, and delete
+    keywords no longer used. Records left behind by past deletions are
+    deleted and image reference counts recounted. The database is then
+    rebuilt with incremental auto-vacuum (see use_incremental_vacuum).
+    """
+    rebuild_table(
+        cursor, TEXT_TABLE,
+        f"""
+        text_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id INTEGER REFERENCES {ARTICLE_TABLE}(article_id)
+            ON DELETE CASCADE,
+        is_subheading INTEGER, contents TEXT, position INTEGER""",
+        "text_id, article_id, is_subheading, contents, position")
+    rebuild_table(
+        cursor, IMAGE_TABLE,
+        f"""
+        image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id INTEGER REFERENCES {ARTICLE_TABLE}(article_id)
+            ON DELETE CASCADE,
+        caption TEXT, credits TEXT, position INTEGER,
+        hash TEXT, display_hash TEXT, width INTEGER, height INTEGER""",
+        "image_id, article_id, caption, credits, position, hash, "
+        "display_hash, width, height")
+    rebuild_table(
+        cursor, ARTICLE_KEYWORD_TABLE,
+        f"""
+        article_id INTEGER REFERENCES {ARTICLE_TABLE}(article_id)
+            ON DELETE CASCADE,
+        keyword_id INTEGER REFERENCES {KEYWORD_TABLE}(keyword_id),
+        PRIMARY KEY (article_id, keyword_id)""",
+        "article_id, keyword_id")
+    # Indexes are dropped with their tables.
+    create_article_indexes(cursor)
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {IMAGE_TABLE}_release
+        AFTER DELETE ON {IMAGE_TABLE} BEGIN
+            UPDATE {IMAGE_BLOB_TABLE} SET ref_count = ref_count - 1
+            WHERE hash = OLD.hash;
+            UPDATE {IMAGE_BLOB_TABLE} SET ref_count = ref_count - 1
+            WHERE hash = OLD.display_hash;
+            DELETE FROM {IMAGE_BLOB_TABLE}
+            WHERE hash IN (OLD.hash, OLD.display_hash) AND ref_count <= 0;
+        END""")
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete
+        AFTER DELETE ON {ARTICLE_TABLE} BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.article_id;
+        END""")
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {KEYWORD_TABLE}_cleanup
+        AFTER DELETE ON {ARTICLE_KEYWORD_TABLE} BEGIN
+            DELETE FROM {KEYWORD_TABLE} WHERE keyword_id = OLD.keyword_id
+                AND NOT EXISTS (
+                    SELECT 1 FROM {ARTICLE_KEYWORD_TABLE}
+                    WHERE keyword_id = OLD.keyword_id
+                );
+        END""")
+    cursor.execute(
+        f"""
+        DELETE FROM {KEYWORD_TABLE} WHERE keyword_id NOT IN (
+            SELECT keyword_id FROM {ARTICLE_KEYWORD_TABLE}
+        )""")
+    cursor.execute(
+        f"""
+        DELETE FROM {SEARCH_TABLE} WHERE rowid NOT IN (
+            SELECT article_id FROM {ARTICLE_TABLE}
+        )""")
+    recount_image_references(cursor)
+
+
+def use_incremental_vacuum(cursor: sqlite3.Cursor) -> None:
+    """
+    Rebuilds the database with incremental auto-vacuum if not yet so,
+    so free pages can be returned to the system in small steps (see
+    reclaim_free_pages). The auto-vacuum mode of a database with tables
+    only changes upon a vacuum, which cannot be run in a transaction.
+    """
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
+
+
+def rebuild_table(
+    cursor: sqlite3.Cursor, table: str, definition: str, columns: str
+) -> None:
+    """
+    Rebuilds a table with a new definition, copying the given columns
+    of the records of existing articles.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {table}_new")
+    cursor.execute(f"CREATE TABLE {table}_new({definition})")
+    cursor.execute(
+        f"""
+        INSERT INTO {table}_new({columns}) SELECT {columns} FROM {table}
+        WHERE article_id IN (SELECT article_id FROM {ARTICLE_TABLE})""")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def recount_image_references(cursor: sqlite3.Cursor) -> None:
+    """
+    Sets the reference count of each image in the image store to the
+    number of references by images, deleting those not referenced.
+    """
+    references = dict(cursor.execute(
+        f"""
+        SELECT hash, COUNT(*) FROM (
+            SELECT hash FROM {IMAGE_TABLE}
+            UNION ALL
+            SELECT display_hash FROM {IMAGE_TABLE}
+        ) WHERE hash IS NOT NULL GROUP BY hash""").fetchall())
+    stored = cursor.execute(
+        f"SELECT hash, ref_count FROM {IMAGE_BLOB_TABLE}").fetchall()
+    cursor.executemany(
+        f"UPDATE {IMAGE_BLOB_TABLE} SET ref_count = ? WHERE hash = ?",
+        ((references.get(hash_, 0), hash_) for hash_, ref_count in stored
+            if references.get(hash_, 0) != ref_count))
+    cursor.execute(f"DELETE FROM {IMAGE_BLOB_TABLE} WHERE ref_count <= 0")
+
+
+# Schema changes applied to existing databases, in order. The number of
+# migrations applied is stored as the database user version.
+MIGRATIONS = (
+    add_indexes, add_image_store, add_display_variants, add_search_index,
+    add_import_log, add_image_sizes, compress_texts, add_sort_indexes,
+    add_article_urls, add_cascading_deletes)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(cursor: sqlite3.Cursor) -> None:
+    """
+    Applies all migrations not yet applied to the database, each in a
+    transaction which also stamps its version, so a failed migration
+    is rolled back as a whole and run again upon the next start.
+    Migrations converting existing records are generators, yielding
+    after each batch so the batch is committed, keeping transactions
+    small. These resume from the first record not yet converted.
+    Each step is also safe to run again should the database have been
+    partly migrated by an earlier version of this function.
+    """
+    connection = cursor.connection
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        connection.execute("BEGIN")
+        try:
+            batches = migration(cursor)
+            if batches is not None:
+                for _ in batches:
+                    connection.commit()
+                    connection.execute("BEGIN")
+            cursor.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+
+
+def store_image(cursor: sqlite3.Cursor, data: bytes) -> str:
+    """
+    Adds a reference to the given image data in the image store,
+    storing the data if not already stored. Returns the image hash.
+    """
+    hash_ = hashlib.sha256(data).hexdigest()
+    cursor.execute(
+        f"INSERT INTO {IMAGE_BLOB_TABLE} VALUES(?, ?, ?, 1) "
+        "ON CONFLICT(hash) DO UPDATE SET ref_count = ref_count + 1",
+        (hash_, data, len(data)))
+    return hash_
+
+
+def replace_image(cursor: sqlite3.Cursor, hash_: str, data: bytes) -> str:
+    """
+    Replaces an image in the image store with the given data, such as
+    the image re-encoded, moving its references to the new image.
+    Returns the hash of the new image.
+    """
+    new_hash = hashlib.sha256(data).hexdigest()
+    (ref_count,) = cursor.execute(
+        f"SELECT ref_count FROM {IMAGE_BLOB_TABLE} WHERE hash = ?",
+        (hash_,)).fetchone()
+    cursor.execute(
+        f"INSERT INTO {IMAGE_BLOB_TABLE} VALUES(?, ?, ?, ?) "
+        "ON CONFLICT(hash) DO UPDATE SET "
+        "ref_count = ref_count + excluded.ref_count",
+        (new_hash, data, len(data), ref_count))
+    cursor.execute(
+        f"DELETE FROM {IMAGE_BLOB_TABLE} WHERE hash = ?", (hash_,))
+    cursor.execute(
+        f"UPDATE {IMAGE_TABLE} SET hash = ? WHERE hash = ?",
+        (new_hash, hash_))
+    cursor.execute(
+        f"UPDATE {IMAGE_TABLE} SET display_hash = ? WHERE display_hash = ?",
+        (new_hash, hash_))
+    return new_hash
+
+
+def save_quality(data: bytes) -> bytes:
+    """
+    Returns image data to be saved - re-encoded at the image quality
+    setting if set and that saves space, otherwise as it is.
+    """
+    if IMAGE_QUALITY is None:
+        return data
+    from images import recompress
+
+    return recompress(data, IMAGE_QUALITY) or data
+
+
+def recompress_images(
+    quality: int, batch_size: int = MIGRATION_BATCH_SIZE,
+    progress: Callable[[int, int], None] = None
+) -> int:
+    """
+    Re-encodes the stored images of all articles at the given quality,
+    where that saves space, in batches of one transaction each.
+    The progress function is called with the images done and the total
+    after each batch. Returns the number of bytes saved.
+    """
+    from images import recompress
+
+    with Database() as cursor:
+        hashes = [
+            hash_ for (hash_,) in cursor.execute(
+                f"SELECT DISTINCT hash FROM {IMAGE_TABLE} "
+                "WHERE hash IS NOT NULL")]
+    saved = 0
+    for start in range(0, len(hashes), batch_size):
+        with Database() as cursor:
+            for hash_ in hashes[start:start + batch_size]:
+                record = cursor.execute(
+                    f"SELECT data FROM {IMAGE_BLOB_TABLE} WHERE hash = ?",
+                    (hash_,)).fetchone()
+                # The image may have been deleted since.
+                if record is None:
+                    continue
+                data = recompress(record[0], quality)
+                if data is not None:
+                    replace_image(cursor, hash_, data)
+                    saved += len(record[0]) - len(data)
+        if progress is not None:
+            progress(min(start + batch_size, len(hashes)), len(hashes))
+    return saved
+
+
+def database_size() -> tuple[int, int]:
+    """
+    Returns the size in bytes of the database, and the size of its
+    free pages, which are reused before the file grows.
+    """
+    with Database() as cursor:
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_count * page_size, free_pages * page_size
+
+
+def vacuum() -> None:
+    """Rebuilds the database file, returning free pages to the system."""
+    connection = get_connection()
+    connection.commit()
+    connection.execute("VACUUM")
+
+
+def reference_image(cursor: sqlite3.Cursor, hash_: str) -> str:
+    """
+    Adds a reference to an image already in the image store,
+    without needing its data. Returns the image hash.
+    """
+    cursor.execute(
+        f"UPDATE {IMAGE_BLOB_TABLE} SET ref_count = ref_count + 1 "
+        "WHERE hash = ?", (hash_,))
+    if cursor.rowcount != 1:
+        raise RuntimeError("Image not found.")
+    return hash_
+
+
+def load_image_data(hash_: str) -> bytes:
+    """Returns image data from the image store by hash."""
+    with span("store.load_image"), Database() as cursor:
+        record = cursor.execute(
+            f"SELECT data FROM {IMAGE_BLOB_TABLE} WHERE hash = ?",
+            (hash_,)).fetchone()
+    if record is None:
+        raise RuntimeError("Image not found.")
+    count("store.image_bytes_read", len(record[0]))
+    return record[0]
+
+
+def image_storage() -> tuple[int, int]:
+    """
+    Returns the total size in bytes of all images referenced by articles,
+    and the size actually stored once duplicates are shared.
+    """
+    with Database() as cursor:
+        return cursor.execute(
             f"""
-            CREATE TABLE IF NOT EXISTS {ARTICLE_KEYWORD_TABLE}(
-                article_id INTEGER, keyword_id INTEGER,
-                PRIMARY KEY (article_id, keyword_id)
-            )""")
+            SELECT
+                COALESCE(SUM(size * ref_count), 0), COALESCE(SUM(size), 0)
+            FROM {IMAGE_BLOB_TABLE}""").fetchone()
 
 
 def insert_article(article: Article) -> int:
-    """Inserts an article into the database, returning the article ID."""
-    published_timestamp = int(article.date_time_published.timestamp())
-    fetched_timestamp = int(article.date_time_fetched.timestamp())
-    with Database() as cursor:
-        cursor.execute(
-            f"INSERT INTO {ARTICLE_TABLE} VALUES(NULL, ?, ?, ?, ?, ?)",
-            (article.heading, article.description, article.author_name,
-                published_timestamp, fetched_timestamp))
-        article_id = cursor.lastrowid
-        for pos, element in enumerate(article.elements):
-            if isinstance(element, Text):
-                cursor.execute(
-                    f"INSERT INTO {TEXT_TABLE} VALUES(NULL, ?, ?, ?, ?)",
-                    (article_id, element.is_subheading, element.contents, pos))
-            else:
-                cursor.execute(
-                    f"INSERT INTO {IMAGE_TABLE} VALUES(NULL, ?, ?, ?, ?, ?)",
-                    (article_id, element.data, element.caption,
-                        element.credits, pos))
-        for keyword in article.keywords:
-            keyword_id = cursor.execute(
-                f"SELECT keyword_id FROM {KEYWORD_TABLE} "
-                    "WHERE keyword = ?", (keyword,)).fetchone()
-            if keyword_id is None:
-                cursor.execute(
-                    f"INSERT INTO {KEYWORD_TABLE} VALUES(NULL, ?)", (keyword,))
-                keyword_id = cursor.lastrowid
-            else:
-                keyword_id = keyword_id[0]
-            cursor.execute(
-                f"INSERT INTO {ARTICLE_KEYWORD_TABLE} VALUES(?, ?)",
-                (article_id, keyword_id))
+    """
+    Saves an article, returning the article ID. Articles with a URL
+    replace any saved copy (see upsert_article).
+    """
+    with span("store.insert"), Database() as cursor:
+        article_id, change = upsert_article(cursor, article)
+    if change is not None:
+        notify(change, article_id)
+    return article_id
+
+
+def upsert_article(
+    cursor: sqlite3.Cursor, article: Article, saved_id: int = None
+) -> tuple[int, str | None]:
+    """
+    Saves an article within the current transaction, keyed by its URL
+    if any, otherwise replacing the saved copy with the given ID (if it
+    still exists, and is not of another URL). A saved copy with the same
+    contents is left as it is, otherwise only its records which changed
+    are rewritten. Returns the article ID and the change made
+    (INSERTED/UPDATED, or None).
+    """
+    content_hash = article.content_hash()
+    record = None
+    if article.url is not None:
+        record = cursor.execute(
+            f"SELECT article_id, content_hash FROM {ARTICLE_TABLE} "
+            "WHERE url = ?", (article.url,)).fetchone()
+    if record is None and saved_id is not None:
+        record = cursor.execute(
+            f"SELECT article_id, content_hash FROM {ARTICLE_TABLE} "
+            "WHERE article_id = ? AND (url IS NULL OR ? IS NULL)",
+            (saved_id, article.url)).fetchone()
+    if record is None:
+        return write_article(cursor, article, content_hash), INSERTED
+    article_id, saved_hash = record
+    if saved_hash == content_hash:
+        return article_id, None
+    update_article(cursor, article_id, article, content_hash)
+    return article_id, UPDATED
+
+
+def write_article(
+    cursor: sqlite3.Cursor, article: Article, content_hash: str = None
+) -> int:
+    """
+    Writes all records of an article within the current transaction,
+    returning the article ID. Listeners are not notified.
+    """
+    cursor.execute(
+        f"""
+        INSERT INTO {ARTICLE_TABLE}(
+            heading, description, author_name, published_timestamp,
+            fetched_timestamp, url, content_hash
+        ) VALUES(?, ?, ?, ?, ?, ?, ?)""",
+        (*article_details(article), article.url,
+            content_hash or article.content_hash()))
+    article_id = cursor.lastrowid
+    write_elements(cursor, article_id, enumerate(article.elements))
+    link_keywords(cursor, article_id, article.keywords)
+    cursor.execute(
+        f"INSERT INTO {SEARCH_TABLE}"
+        "(rowid, heading, description, body, keywords) "
+        "VALUES(?, ?, ?, ?, ?)", (article_id, *search_record(article)))
+    # Article and search records, then those of each element and keyword.
+    count(
+        "store.rows_written",
+        2 + len(article.elements) + 2 * len(article.keywords))
     return article_id
-            
 
-def load_article_from_record(record: tuple, cursor: sqlite3.Cursor) -> Article:
-    """Fully loads an article given the full main article record."""
+
+def update_article(
+    cursor: sqlite3.Cursor, article_id: int, article: Article,
+    content_hash: str
+) -> None:
+    """
+    Rewrites a saved article within the current transaction, only
+    rewriting the elements (by position) and keywords which changed.
+    """
+    cursor.execute(
+        f"""
+        UPDATE {ARTICLE_TABLE} SET
+            heading = ?, description = ?, author_name = ?,
+            published_timestamp = ?, fetched_timestamp = ?, content_hash = ?,
+            url = COALESCE(?, url)
+        WHERE article_id = ?""",
+        (*article_details(article), content_hash, article.url, article_id))
+    saved_texts = {
+        position: (text_id, (bool(is_subheading), contents))
+        for text_id, is_subheading, contents, position in cursor.execute(
+            "SELECT text_id, is_subheading, contents, position "
+            f"FROM {TEXT_TABLE} WHERE article_id = ?", (article_id,))}
+    saved_images = {
+        position: (image_id, (caption, credits_, hash_), display_hash)
+        for image_id, caption, credits_, hash_, display_hash, position
+            in cursor.execute(
+            "SELECT image_id, caption, credits, hash, display_hash, position "
+            f"FROM {IMAGE_TABLE} WHERE article_id = ?", (article_id,))}
+    changed = []
+    for position, element in enumerate(article.elements):
+        if isinstance(element, Text):
+            saved = saved_texts.get(position)
+            if saved is not None and (
+                saved[1][0] == element.is_subheading
+                and decompress_text(saved[1][1]) == element.contents
+            ):
+                del saved_texts[position]
+                continue
+        else:
+            saved = saved_images.get(position)
+            if saved is not None and saved[1] == (
+                element.caption, element.credits, image_identity(element)
+            ):
+                del saved_images[position]
+                continue
+        changed.append((position, element))
+    write_elements(cursor, article_id, changed)
+    # Saved elements left over were changed or removed. Deleted image
+    # records release their images (see add_cascading_deletes), after
+    # the new elements referenced any images they still share.
+    cursor.executemany(
+        f"DELETE FROM {TEXT_TABLE} WHERE text_id = ?",
+        ((text_id,) for text_id, _ in saved_texts.values()))
+    cursor.executemany(
+        f"DELETE FROM {IMAGE_TABLE} WHERE image_id = ?",
+        ((image_id,) for image_id, *_ in saved_images.values()))
+    saved_keywords = {
+        keyword for (keyword,) in cursor.execute(
+            f"SELECT keyword FROM {ARTICLE_KEYWORD_TABLE} "
+            f"JOIN {KEYWORD_TABLE} USING (keyword_id) WHERE article_id = ?",
+            (article_id,))}
+    cursor.executemany(
+        f"""
+        DELETE FROM {ARTICLE_KEYWORD_TABLE} WHERE article_id = ?
+            AND keyword_id = (
+                SELECT keyword_id FROM {KEYWORD_TABLE} WHERE keyword = ?
+            )""",
+        ((article_id, keyword)
+            for keyword in saved_keywords.difference(article.keywords)))
+    link_keywords(cursor, article_id, [
+        keyword for keyword in article.keywords
+        if keyword not in saved_keywords])
+    cursor.execute(
+        f"""
+        UPDATE {SEARCH_TABLE} SET
+            heading = ?, description = ?, body = ?, keywords = ?
+        WHERE rowid = ?""", (*search_record(article), article_id))
+    count(
+        "store.rows_written",
+        2 + len(changed) + len(saved_texts) + len(saved_images))
+
+
+def article_details(article: Article) -> tuple:
+    """Returns the details of the main article record, as stored."""
+    return (
+        article.heading, article.description, article.author_name,
+        int(article.date_time_published.timestamp()),
+        int(article.date_time_fetched.timestamp()))
+
+
+def search_record(article: Article) -> tuple[str, str, str, str]:
+    """Returns the heading, description, body and keywords indexed."""
+    return (
+        article.heading, article.description,
+        "\n".join(
+            element.contents for element in article.elements
+            if isinstance(element, Text)),
+        " ".join(article.keywords))
+
+
+def write_elements(
+    cursor: sqlite3.Cursor, article_id: int,
+    positioned_elements: Iterable[tuple[int, Text | Image]]
+) -> None:
+    """Writes the records of article elements, each with its position."""
+    texts = []
+    images = []
+    for position, element in positioned_elements:
+        if isinstance(element, Text):
+            texts.append((
+                article_id, element.is_subheading,
+                compress_text(element.contents), position))
+        else:
+            images.append((
+                article_id, element.caption, element.credits, position,
+                *image_hashes(cursor, element), element.width,
+                element.height))
+    cursor.executemany(
+        f"INSERT INTO {TEXT_TABLE} VALUES(NULL, ?, ?, ?, ?)", texts)
+    cursor.executemany(
+        f"INSERT INTO {IMAGE_TABLE} "
+        "(article_id, caption, credits, position, hash, display_hash, "
+        "width, height) VALUES(?, ?, ?, ?, ?, ?, ?, ?)", images)
+
+
+def link_keywords(
+    cursor: sqlite3.Cursor, article_id: int, keywords: list[str]
+) -> None:
+    """Adds any new keywords, then links the article to the keywords."""
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {KEYWORD_TABLE} VALUES(NULL, ?)",
+        ((keyword,) for keyword in keywords))
+    cursor.executemany(
+        f"INSERT INTO {ARTICLE_KEYWORD_TABLE} "
+        f"SELECT ?, keyword_id FROM {KEYWORD_TABLE} WHERE keyword = ?",
+        ((article_id, keyword) for keyword in keywords))
+
+
+def image_identity(image: Image) -> str | None:
+    """
+    Returns the hash the image data would be stored by, without
+    storing it, or None if the image has no data.
+    """
+    if image.stored:
+        return image.data_hash
+    if image.data is None:
+        return None
+    return hashlib.sha256(save_quality(image.data)).hexdigest()
+
+
+def image_hashes(
+    cursor: sqlite3.Cursor, image: Image
+) -> tuple[str, str | None]:
+    """
+    Adds references to the data and display variant of an image in the
+    image store, returning their hashes. Images already in the store
+    are referenced by hash, so their data is not loaded. New images are
+    saved at the image quality setting.
+    """
+    if image.stored:
+        return (
+            reference_image(cursor, image.data_hash),
+            None if image.display_hash is None
+                else reference_image(cursor, image.display_hash))
+    return (
+        store_image(cursor, save_quality(image.data)),
+        None if image.display_data is None
+            else store_image(cursor, image.display_data))
+
+
+def import_articles(imports: list[tuple[str, float, Article]]) -> list[int]:
+    """
+    Saves articles parsed from files in one transaction, recording each
+    file path and modification time so it is not imported again. Each
+    article replaces any saved copy (see upsert_article) - that of its
+    URL, otherwise the article its file was imported as before.
+    Returns the article IDs.
+    """
+    with span("store.import", articles=len(imports)), Database() as cursor:
+        article_ids = []
+        changes = []
+        for path, modified_time, article in imports:
+            record = cursor.execute(
+                f"SELECT article_id FROM {IMPORT_TABLE} WHERE path = ?",
+                (path,)).fetchone()
+            article_id, change = upsert_article(
+                cursor, article, None if record is None else record[0])
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {IMPORT_TABLE} VALUES(?, ?, ?)",
+                (path, modified_time, article_id))
+            article_ids.append(article_id)
+            if change is not None:
+                changes.append((change, article_id))
+    for change, article_id in changes:
+        notify(change, article_id)
+    return article_ids
+
+
+def load_imported_files() -> dict[str, float]:
+    """Returns the modification time of each imported file, by path."""
+    with Database() as cursor:
+        return dict(cursor.execute(
+            f"SELECT path, modified_time FROM {IMPORT_TABLE}").fetchall())
+
+
+def load_contents(
+    cursor: sqlite3.Cursor, article_id: int = None
+) -> tuple[dict[int, list[Text | Image]], dict[int, list[str]]]:
+    """
+    Loads the elements and keywords of the article with the given ID,
+    or of all articles if no ID is given, with one query per table.
+    Returns the elements and keywords, each by article ID.
+    """
+    condition = "" if article_id is None else "WHERE article_id = ?"
+    params = () if article_id is None else (article_id,)
+    positioned_elements = {}
+    for article_id_, is_subheading, contents, position in cursor.execute(
+        "SELECT article_id, is_subheading, contents, position "
+        f"FROM {TEXT_TABLE} {condition}", params
+    ):
+        positioned_elements.setdefault(article_id_, []).append(
+            (position, Text(decompress_text(contents), is_subheading)))
+    # Image data stays in the image store, only loaded once needed.
+    for (
+        article_id_, hash_, display_hash, caption, credits_, position,
+        width, height
+    ) in cursor.execute(
+        "SELECT article_id, hash, display_hash, caption, credits, position, "
+        f"width, height FROM {IMAGE_TABLE} {condition}", params
+    ):
+        positioned_elements.setdefault(article_id_, []).append((
+            position,
+            Image(
+                None, caption, credits_, width=width, height=height,
+                data_hash=hash_, display_hash=display_hash)))
+    count("store.rows_read", sum(map(len, positioned_elements.values())))
+    elements = {
+        article_id_: [
+            element for _, element in sorted(
+                positioned, key=lambda position_element: position_element[0])]
+        for article_id_, positioned in positioned_elements.items()}
+    keywords = {}
+    for article_id_, keyword in cursor.execute(
+        f"SELECT article_id, keyword FROM {ARTICLE_KEYWORD_TABLE} "
+        f"JOIN {KEYWORD_TABLE} USING (keyword_id) {condition} "
+        "ORDER BY keyword", params
+    ):
+        keywords.setdefault(article_id_, []).append(keyword)
+    return elements, keywords
+
+
+def load_article_from_record(
+    record: tuple, cursor: sqlite3.Cursor, contents: tuple = None
+) -> Article:
+    """
+    Fully loads an article given the full main article record.
+    The contents (as returned by load_contents) are loaded if not given.
+    """
     (
-        article_id, heading, description,
-        author_name, published_timestamp, fetched_timestamp) = record
+        article_id, heading, description, author_name,
+        published_timestamp, fetched_timestamp, url) = record
     date_time_published = dt.datetime.fromtimestamp(published_timestamp)
     date_time_fetched = dt.datetime.fromtimestamp(fetched_timestamp)
-    elements_dict = {}
-    # Load text elements.
-    text_records = cursor.execute(
-        "SELECT is_subheading, contents, position "
-        f"FROM {TEXT_TABLE} WHERE article_id = ?", (article_id,)).fetchall()
-    for record in text_records:
-        is_subheading, contents, position = record
-        elements_dict[position] = Text(contents, is_subheading)
-    # Load image elements.
-    image_records = cursor.execute(
-        "SELECT data, caption, credits, position "
-        f"FROM {IMAGE_TABLE} WHERE article_id = ?", (article_id,)).fetchall()
-    for record in image_records:
-        data, caption, credits_, position = record
-        elements_dict[position] = Image(data, caption, credits_)
-    elements = [
-        elements_dict[position] for position in range(len(elements_dict))]
-    article_keyword_records = cursor.execute(
-        f"SELECT keyword_id FROM {ARTICLE_KEYWORD_TABLE} WHERE article_id = ?",
-        (article_id,)).fetchall()
-    # Load keywords.
-    keywords = []
-    for record in article_keyword_records:
-        keyword = cursor.execute(
-            f"SELECT keyword FROM {KEYWORD_TABLE} WHERE keyword_id = ?",
-            (record[0],)).fetchone()[0]
-        keywords.append(keyword)
-    keywords.sort()
+    elements, keywords = contents or load_contents(cursor, article_id)
     return Article(
         heading, date_time_published, date_time_fetched,
-        keywords, author_name, description, elements, article_id)
+        keywords.get(article_id, []), author_name, description,
+        elements.get(article_id, []), article_id, url)
 
 
 def load_articles() -> list[Article]:
     """Returns all Articles stored inside the database."""
-    with Database() as cursor:
+    with span("store.load_all"), Database() as cursor:
         article_records = cursor.execute(
-            f"SELECT * FROM {ARTICLE_TABLE}").fetchall()
+            f"SELECT {ARTICLE_COLUMNS} FROM {ARTICLE_TABLE}").fetchall()
+        contents = load_contents(cursor)
         return [
-            load_article_from_record(record, cursor)
+            load_article_from_record(record, cursor, contents)
                 for record in article_records]
 
 
+def load_article_summaries() -> list[ArticleSummary]:
+    """
+    Returns summaries of all articles stored inside the database,
+    without loading any article contents.
+    """
+    with span("store.summaries"), Database() as cursor:
+        records = cursor.execute(
+            "SELECT article_id, heading, author_name, "
+            f"published_timestamp, fetched_timestamp FROM {ARTICLE_TABLE}"
+        ).fetchall()
+    count("store.rows_read", len(records))
+    return [summary_from_record(record) for record in records]
+
+
+def load_summary_page(
+    sort: str, descending: bool, after: tuple | None, limit: int
+) -> list[ArticleSummary]:
+    """
+    Returns a page of article summaries in order of the sort column
+    (see SORT_COLUMNS), starting after the row with the given sort key
+    (see summary_sort_key) if any. Pages are found by key rather than
+    offset, so each page is read from the index without counting
+    through the rows before it.
+    """
+    column = SORT_COLUMNS[sort]
+    direction = "DESC" if descending else "ASC"
+    condition = ""
+    params = (limit,)
+    if after is not None:
+        operator = "<" if descending else ">"
+        condition = f"WHERE ({column}, article_id) {operator} (?, ?)"
+        params = (*after, limit)
+    with span("store.summary_page"), Database() as cursor:
+        records = cursor.execute(
+            "SELECT article_id, heading, author_name, "
+            f"published_timestamp, fetched_timestamp FROM {ARTICLE_TABLE} "
+            f"{condition} ORDER BY {column} {direction}, "
+            f"article_id {direction} LIMIT ?", params).fetchall()
+    count("store.rows_read", len(records))
+    return [summary_from_record(record) for record in records]
+
+
+def summary_sort_key(summary: ArticleSummary, sort: str) -> tuple:
+    """
+    Returns the key of an article in the given sort order - its value
+    of the sort column, then its ID, as compared in the database.
+    """
+    value = {
+        "id": lambda: summary.id,
+        "heading": lambda: summary.heading,
+        "author": lambda: summary.author_name,
+        "published": lambda: int(summary.date_time_published.timestamp()),
+        "fetched": lambda: int(summary.date_time_fetched.timestamp()),
+    }[sort]()
+    return value, summary.id
+
+
+def load_article_summary(article_id: int) -> ArticleSummary:
+    """Returns the summary of an article, raising an error if not found."""
+    with Database() as cursor:
+        record = cursor.execute(
+            "SELECT article_id, heading, author_name, "
+            f"published_timestamp, fetched_timestamp FROM {ARTICLE_TABLE} "
+            "WHERE article_id = ?", (article_id,)).fetchone()
+    if record is None:
+        raise RuntimeError("Article not found.")
+    return summary_from_record(record)
+
+
+def summary_from_record(record: tuple) -> ArticleSummary:
+    """Returns the summary of an article given its summary record."""
+    (
+        article_id, heading, author_name,
+        published_timestamp, fetched_timestamp) = record
+    return ArticleSummary(
+        article_id, heading, author_name,
+        dt.datetime.fromtimestamp(published_timestamp),
+        dt.datetime.fromtimestamp(fetched_timestamp))
+
+
+def search_query(text: str) -> str | None:
+    """
+    Converts search input into a full-text query matching articles with
+    all the words, the last word being allowed to be incomplete.
+    Returns None if there are no words to search for.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_articles(
+    text: str, limit: int = SEARCH_LIMIT
+) -> list[tuple[ArticleSummary, str]]:
+    """
+    Searches the heading, description, body text and keywords of all
+    saved articles. Returns the summaries of matching articles, best
+    match first, each with a snippet of the matching text.
+    """
+    query = search_query(text)
+    if query is None:
+        return []
+    with span("store.search"), Database() as cursor:
+        records = cursor.execute(
+            f"""
+            SELECT {ARTICLE_TABLE}.article_id, {ARTICLE_TABLE}.heading,
+                author_name, published_timestamp, fetched_timestamp,
+                snippet({SEARCH_TABLE}, -1, '', '', '...', {SNIPPET_WORDS})
+            FROM {SEARCH_TABLE} JOIN {ARTICLE_TABLE}
+                ON {ARTICLE_TABLE}.article_id = {SEARCH_TABLE}.rowid
+            WHERE {SEARCH_TABLE} MATCH ? ORDER BY rank LIMIT ?""",
+            (query, limit)).fetchall()
+    return [
+        (summary_from_record(record[:-1]), " ".join(record[-1].split()))
+        for record in records]
+
+
+def load_article_by_id(article_id: int) -> Article:
+    """Fully loads an article by ID, raising an error if not found."""
+    with span("store.load"), Database() as cursor:
+        record = cursor.execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM {ARTICLE_TABLE} "
+            "WHERE article_id = ?", (article_id,)).fetchone()
+        if record is None:
+            raise RuntimeError("Article not found.")
+        return load_article_from_record(record, cursor)
+
+
+def load_article_by_url(url: str) -> Article | None:
+    """
+    Fully loads the saved article with the given (normalised) URL,
+    returning None if not saved.
+    """
+    with span("store.load"), Database() as cursor:
+        record = cursor.execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM {ARTICLE_TABLE} WHERE url = ?",
+            (url,)).fetchone()
+        if record is None:
+            return None
+        return load_article_from_record(record, cursor)
+
+
 def delete_article_by_id(article_id: int) -> None:
     """Deletes an article by ID, raising an error upon failure."""
-    with Database() as cursor:
-        # Remove main article record, all images, all text, all keywords.
-        cursor.execute(
-            f"DELETE FROM {IMAGE_TABLE} WHERE article_id = ?", (article_id,))
-        cursor.execute(
-            f"DELETE FROM {TEXT_TABLE} WHERE article_id = ?", (article_id,))
-        cursor.execute(
-            f"DELETE FROM {ARTICLE_KEYWORD_TABLE} WHERE article_id = ?",
-            (article_id,))
+    with span("store.delete"), Database() as cursor:
+        # All records of the article are deleted with the main record,
+        # as are its images and keywords if no longer used.
         cursor.execute(
             f"DELETE FROM {ARTICLE_TABLE} WHERE article_id = ?", (article_id,))
         if cursor.rowcount != 1:
             # Exactly 1 deletion expected, otherwise erronous.
             raise RuntimeError("Article already deleted.")
+    notify(DELETED, article_id)
+
+
+def article_storage(
+    limit: int = STORAGE_LIMIT
+) -> list[tuple[ArticleSummary, int, int]]:
+    """
+    Returns the summaries of the articles using the most storage, most
+    first, each with the bytes of its text and of its images. Images
+    shared by several articles are split evenly between them.
+    """
+    with span("store.article_storage"), Database() as cursor:
+        records = cursor.execute(
+            f"""
+            SELECT * FROM (
+                SELECT article_id, heading, author_name,
+                    published_timestamp, fetched_timestamp,
+                    length(CAST(heading AS BLOB))
+                    + length(CAST(description AS BLOB)) + (
+                        SELECT COALESCE(
+                            SUM(length(CAST(contents AS BLOB))), 0)
+                        FROM {TEXT_TABLE}
+                        WHERE {TEXT_TABLE}.article_id
+                            = {ARTICLE_TABLE}.article_id
+                    ) AS text_bytes, (
+                        SELECT COALESCE(SUM(size / ref_count), 0)
+                        FROM {IMAGE_TABLE} JOIN {IMAGE_BLOB_TABLE}
+                            ON {IMAGE_BLOB_TABLE}.hash
+                                IN ({IMAGE_TABLE}.hash, display_hash)
+                        WHERE {IMAGE_TABLE}.article_id
+                            = {ARTICLE_TABLE}.article_id
+                    ) AS image_bytes
+                FROM {ARTICLE_TABLE}
+            ) ORDER BY text_bytes + image_bytes DESC LIMIT ?""",
+            (limit,)).fetchall()
+    return [
+        (summary_from_record(record[:5]), *record[5:]) for record in records]
+
+
+def table_storage() -> dict[str, int]:
+    """
+    Returns the bytes used by each table including its indexes, most
+    first, or nothing if not supported by the SQLite library (which
+    must be built with the dbstat table).
+    """
+    with span("store.table_storage"), Database() as cursor:
+        try:
+            records = cursor.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        tables = dict(cursor.execute(
+            "SELECT name, tbl_name FROM sqlite_master").fetchall())
+    sizes = {}
+    for name, size in records:
+        table = tables.get(name, name)
+        # The search index is stored in several tables of its own.
+        if table.startswith(f"{SEARCH_TABLE}_"):
+            table = SEARCH_TABLE
+        sizes[table] = sizes.get(table, 0) + size
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+
+def free_pages() -> int:
+    """Returns the number of free pages of the database."""
+    return get_connection().execute("PRAGMA freelist_count").fetchone()[0]
 
 
-# Create tables upon startup if they do not exist.
-create_tables()
+def reclaim_free_pages(max_pages: int = VACUUM_STEP_PAGES) -> int:
+    """
+    Returns up to the given number (which must be positive, as zero
+    returns all) of free pages of the database to the system (see
+    add_cascading_deletes), in one short transaction so other
+    connections are barely held up. Returns the free pages left.
+    """
+    connection = get_connection()
+    connection.commit()
+    with span("store.reclaim"):
+        # Run as a script, as a single step only reclaims one page.
+        connection.executescript(f"PRAGMA incremental_vacuum({max_pages})")
+    return free_pages()
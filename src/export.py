@@ -0,0 +1,504 @@
+"""
+Exporting articles to DOCX and PDF documents, streamed to the file
+element by element. Each image is downscaled, compressed and written
+once reached, so only one image is held in memory at a time, along
+with the page being laid out (PDF). Memory use therefore does not grow
+with the length of the article or its number of images (see
+benchmarks/export.py, which checks the peak).
+"""
+import hashlib
+import io
+import pathlib
+import re
+import shutil
+import tempfile
+import zipfile
+import zlib
+from typing import Callable
+from xml.sax.saxutils import escape
+
+from article import Article, Image, Text
+
+
+DEFAULT_FONT_SIZE = 12
+# Relative sizes of the heading, subheadings, description and small text.
+HEADING_SCALE = 2
+SUBHEADING_SCALE = 1.4
+DESCRIPTION_SCALE = 1.15
+SMALL_SCALE = 0.85
+LINE_SPACING = 1.25
+# Page layout (points) - A4 with 2cm margins.
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 56.69
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+CONTENT_HEIGHT = PAGE_HEIGHT - 2 * MARGIN
+# Exported images are resampled to at most this resolution
+# at their printed size, and saved as JPEGs of this quality.
+IMAGE_DPI = 150
+IMAGE_QUALITY = 75
+POINTS_PER_INCH = 72
+# DOCX lengths - twentieths of a point (twips) for the page layout,
+# half points for font sizes and English Metric Units for pictures.
+TWIPS_PER_POINT = 20
+EMUS_PER_POINT = 12700
+# Characters not allowed in XML, removed from exported text.
+INVALID_XML_CHARACTERS = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+# Markup of the DOCX package parts, the fields in braces being filled
+# in with the font size, picture sizes and page layout.
+OOXML = "http://schemas.openxmlformats.org"
+WORDPROCESSING_ML = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml")
+RELATIONSHIP_TYPE = f"{OOXML}/officeDocument/2006/relationships"
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<Types xmlns="{OOXML}/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+    '<Override PartName="/word/document.xml" '
+    f'ContentType="{WORDPROCESSING_ML}.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    f'ContentType="{WORDPROCESSING_ML}.styles+xml"/>'
+    "</Types>")
+DOCX_PACKAGE_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<Relationships xmlns="{OOXML}/package/2006/relationships">'
+    f'<Relationship Id="rId1" Type="{RELATIONSHIP_TYPE}/officeDocument" '
+    'Target="word/document.xml"/>'
+    "</Relationships>")
+DOCX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles xmlns:w="{OOXML}/wordprocessingml/2006/main">'
+    "<w:docDefaults><w:rPrDefault><w:rPr>"
+    '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" '
+    'w:cs="Times New Roman"/><w:sz w:val="{font_size}"/>'
+    "</w:rPr></w:rPrDefault></w:docDefaults>"
+    "</w:styles>")
+DOCX_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:document xmlns:w="{OOXML}/wordprocessingml/2006/main" '
+    f'xmlns:r="{OOXML}/officeDocument/2006/relationships" '
+    f'xmlns:wp="{OOXML}/drawingml/2006/wordprocessingDrawing" '
+    f'xmlns:a="{OOXML}/drawingml/2006/main" '
+    f'xmlns:pic="{OOXML}/drawingml/2006/picture"><w:body>')
+DOCX_DOCUMENT_END = (
+    "<w:sectPr>"
+    '<w:pgSz w:w="{width}" w:h="{height}"/>'
+    '<w:pgMar w:top="{margin}" w:right="{margin}" w:bottom="{margin}" '
+    'w:left="{margin}" w:header="0" w:footer="0" w:gutter="0"/>'
+    "</w:sectPr></w:body></w:document>")
+DOCX_PICTURE = (
+    "<w:p><w:r><w:drawing><wp:inline>"
+    '<wp:extent cx="{width}" cy="{height}"/>'
+    '<wp:docPr id="{number}" name="Picture {number}"/>'
+    f'<a:graphic><a:graphicData uri="{OOXML}/drawingml/2006/picture">'
+    "<pic:pic><pic:nvPicPr>"
+    '<pic:cNvPr id="{number}" name="Picture {number}"/><pic:cNvPicPr/>'
+    '</pic:nvPicPr><pic:blipFill><a:blip r:embed="{relationship_id}"/>'
+    "<a:stretch><a:fillRect/></a:stretch></pic:blipFill>"
+    '<pic:spPr><a:xfrm><a:off x="0" y="0"/>'
+    '<a:ext cx="{width}" cy="{height}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+    "</pic:pic></a:graphicData></a:graphic>"
+    "</wp:inline></w:drawing></w:r></w:p>")
+# Standard PDF fonts text is set in, by bold and italic.
+PDF_FONTS = {
+    (False, False): "Times-Roman",
+    (True, False): "Times-Bold",
+    (False, True): "Times-Italic",
+    (True, True): "Times-BoldItalic",
+}
+
+
+def compress_image(
+    data: bytes, max_width: float, max_height: float
+) -> tuple[bytes, float, float, tuple[int, int]]:
+    """
+    Returns the image as a JPEG downscaled to at most IMAGE_DPI when
+    printed to fit the given size (points), its printed size, and its
+    size in pixels.
+    """
+    # Imported upon first use, keeping startup fast.
+    from PIL import Image as PilImage
+
+    with io.BytesIO(data) as image_bytes:
+        pil_image = PilImage.open(image_bytes)
+        scale = min(
+            max_width / pil_image.width, max_height / pil_image.height, 1)
+        width = pil_image.width * scale
+        height = pil_image.height * scale
+        pixel_scale = min(
+            width * IMAGE_DPI / POINTS_PER_INCH / pil_image.width, 1)
+        # Decode at a reduced size where supported (JPEG), then resample.
+        pil_image.draft("RGB", (
+            round(pil_image.width * pixel_scale),
+            round(pil_image.height * pixel_scale)))
+        pil_image = pil_image.convert("RGBA")
+        pil_image.thumbnail((
+            max(round(width * IMAGE_DPI / POINTS_PER_INCH), 1),
+            max(round(height * IMAGE_DPI / POINTS_PER_INCH), 1)))
+    # Flatten any transparency onto white, as JPEGs have none.
+    flattened = PilImage.new("RGB", pil_image.size, "white")
+    flattened.paste(pil_image, mask=pil_image.getchannel("A"))
+    with io.BytesIO() as jpeg_bytes:
+        flattened.save(jpeg_bytes, "JPEG", quality=IMAGE_QUALITY)
+        return (
+            jpeg_bytes.getvalue(), width, height, flattened.size)
+
+
+def image_info_text(image: Image) -> str:
+    """Returns the caption and credits of an image as displayed."""
+    info_text = ""
+    if image.caption is not None:
+        info_text += image.caption
+    if image.credits is not None:
+        info_text += f" © {image.credits}"
+    return info_text.strip()
+
+
+def check_images_downloaded(article: Article) -> None:
+    """Raises an error if any article image is yet to be downloaded."""
+    if any(image.pending for image in article.images):
+        raise RuntimeError(
+            "The article images have not all been downloaded.")
+
+
+def metadata_text(article: Article) -> str:
+    """Returns the author, date published and keywords of an article."""
+    return (
+        f"{article.author_name} | "
+        f"{article.date_time_published.strftime('%Y-%m-%dT%H:%M%z')}\n"
+        f"Topics: {' | '.join(article.keywords)}")
+
+
+class DocumentWriter:
+    """
+    Streams a document to a file, element by element. Used as a context
+    manager, finishing the document if no error occurred, otherwise
+    deleting the incomplete file.
+    """
+
+    def __init__(self, path: pathlib.Path, font_size: int) -> None:
+        self.path = pathlib.Path(path)
+        self.font_size = font_size
+
+    def __enter__(self) -> "DocumentWriter":
+        return self
+
+    def __exit__(self, exception: Exception | None, *_) -> None:
+        finished = False
+        try:
+            if exception is None:
+                self.finish()
+                finished = True
+        finally:
+            self.close()
+            if not finished:
+                self.path.unlink(missing_ok=True)
+
+    def add_text(
+        self, text: str, scale: float = 1, bold: bool = False,
+        italic: bool = False
+    ) -> None:
+        raise NotImplementedError
+
+    def add_image(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> None:
+        """Writes the end of the document."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Closes the files written."""
+        raise NotImplementedError
+
+
+class DocxWriter(DocumentWriter):
+    """
+    Streams a DOCX package. Images are written to the package as they
+    are added, and the document body to a temporary file, copied into
+    the package once complete.
+    """
+
+    def __init__(self, path: pathlib.Path, font_size: int) -> None:
+        super().__init__(path, font_size)
+        self.package = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+        self.body = tempfile.TemporaryFile()
+        # Numbers of the images written, by hash, so repeated images
+        # are written once, and the number of pictures placed.
+        self.images: dict[str, int] = {}
+        self.pictures = 0
+        self.package.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        self.package.writestr("_rels/.rels", DOCX_PACKAGE_RELATIONSHIPS)
+        self.package.writestr(
+            "word/styles.xml",
+            DOCX_STYLES.replace("{font_size}", str(round(font_size * 2))))
+        self.write(DOCX_DOCUMENT_START)
+
+    def write(self, markup: str) -> None:
+        self.body.write(markup.encode())
+
+    def add_text(
+        self, text: str, scale: float = 1, bold: bool = False,
+        italic: bool = False
+    ) -> None:
+        """Writes a paragraph of a single run, lines separated by breaks."""
+        properties = (
+            ("<w:b/>" if bold else "") + ("<w:i/>" if italic else "")
+            + f'<w:sz w:val="{round(self.font_size * scale * 2)}"/>')
+        lines = "<w:br/>".join(
+            '<w:t xml:space="preserve">'
+            f'{escape(INVALID_XML_CHARACTERS.sub("", line))}</w:t>'
+            for line in text.split("\n"))
+        self.write(
+            f"<w:p><w:r><w:rPr>{properties}</w:rPr>{lines}</w:r></w:p>")
+
+    def add_image(self, data: bytes) -> None:
+        """Writes an image in a paragraph of its own, fitting the page."""
+        data, width, height, _ = compress_image(
+            data, CONTENT_WIDTH, CONTENT_HEIGHT)
+        hash_ = hashlib.sha256(data).hexdigest()
+        number = self.images.get(hash_)
+        if number is None:
+            number = self.images[hash_] = len(self.images) + 1
+            # Already compressed, so stored as it is.
+            self.package.writestr(
+                f"word/media/image{number}.jpeg", data, zipfile.ZIP_STORED)
+        self.pictures += 1
+        self.write(DOCX_PICTURE.format(
+            width=round(width * EMUS_PER_POINT),
+            height=round(height * EMUS_PER_POINT),
+            number=self.pictures, relationship_id=f"rIdImage{number}"))
+
+    def finish(self) -> None:
+        self.write(DOCX_DOCUMENT_END.format(
+            width=round(PAGE_WIDTH * TWIPS_PER_POINT),
+            height=round(PAGE_HEIGHT * TWIPS_PER_POINT),
+            margin=round(MARGIN * TWIPS_PER_POINT)))
+        self.body.seek(0)
+        with self.package.open("word/document.xml", "w") as document:
+            shutil.copyfileobj(self.body, document)
+        relationships = "".join(
+            f'<Relationship Id="rIdImage{number}" '
+            f'Type="{RELATIONSHIP_TYPE}/image" '
+            f'Target="media/image{number}.jpeg"/>'
+            for number in self.images.values())
+        self.package.writestr(
+            "word/_rels/document.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{OOXML}/package/2006/relationships">'
+            f'<Relationship Id="rIdStyles" Type="{RELATIONSHIP_TYPE}/styles" '
+            f'Target="styles.xml"/>{relationships}</Relationships>')
+
+    def close(self) -> None:
+        self.package.close()
+        self.body.close()
+
+
+class PdfWriter(DocumentWriter):
+    """
+    Streams a PDF, writing wrapped text and images down its pages in the
+    standard Times fonts, measured with the font metrics of reportlab.
+    Each image is written once drawn and each page once full, so only
+    the page being laid out is held in memory. The page tree, catalog
+    and cross-reference table are written last.
+    """
+
+    def __init__(self, path: pathlib.Path, font_size: int) -> None:
+        try:
+            from reportlab.lib.utils import simpleSplit
+        except ImportError as e:
+            raise RuntimeError(
+                "reportlab must be installed to export PDF files "
+                "(pip install reportlab).") from e
+        super().__init__(path, font_size)
+        self.split = simpleSplit
+        self.file = open(self.path, "wb")
+        # Offset of each object written by number - 1, the catalog and
+        # page tree (1 and 2) being written last.
+        self.offsets: list[int | None] = [None, None]
+        self.page_ids: list[int] = []
+        # Objects of the images written, by hash, so repeated images are
+        # written once, and those drawn on the current page.
+        self.images: dict[str, int] = {}
+        self.page_images: set[int] = set()
+        self.operations: list[bytes] = []
+        self.y = PAGE_HEIGHT - MARGIN
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.fonts = {
+            font: self.write_object(
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} "
+                "/Encoding /WinAnsiEncoding >>")
+            for font in PDF_FONTS.values()}
+
+    def write_object(
+        self, dictionary: str, stream: bytes = None, number: int = None
+    ) -> int:
+        """
+        Writes an object, with the stream if given (whose length the
+        dictionary must give), as the next object unless numbered.
+        Returns the object number.
+        """
+        if number is None:
+            self.offsets.append(None)
+            number = len(self.offsets)
+        self.offsets[number - 1] = self.file.tell()
+        self.file.write(f"{number} 0 obj\n{dictionary}\n".encode())
+        if stream is not None:
+            self.file.write(b"stream\n")
+            self.file.write(stream)
+            self.file.write(b"\nendstream\n")
+        self.file.write(b"endobj\n")
+        return number
+
+    def new_page(self) -> None:
+        """Writes the current page, starting a new page."""
+        content = zlib.compress(b"\n".join(self.operations))
+        content_id = self.write_object(
+            f"<< /Filter /FlateDecode /Length {len(content)} >>", content)
+        fonts = " ".join(
+            f"/F{font_id} {font_id} 0 R" for font_id in self.fonts.values())
+        images = " ".join(
+            f"/Im{image_id} {image_id} 0 R"
+            for image_id in sorted(self.page_images))
+        self.page_ids.append(self.write_object(
+            "<< /Type /Page /Parent 2 0 R "
+            f"/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << {fonts} >> "
+            f"/XObject << {images} >> >> /Contents {content_id} 0 R >>"))
+        self.operations = []
+        self.page_images = set()
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def add_text(
+        self, text: str, scale: float = 1, bold: bool = False,
+        italic: bool = False
+    ) -> None:
+        """Writes a paragraph, starting new pages as needed."""
+        font = PDF_FONTS[bold, italic]
+        size = self.font_size * scale
+        line_height = size * LINE_SPACING
+        lines = []
+        for line in text.splitlines() or [""]:
+            lines.extend(self.split(line, font, size, CONTENT_WIDTH) or [""])
+        for line in lines:
+            if self.y - line_height < MARGIN:
+                self.new_page()
+            self.y -= line_height
+            # Baseline, leaving room below for descenders.
+            self.operations.append(
+                f"BT /F{self.fonts[font]} {size:.2f} Tf "
+                f"{MARGIN:.2f} {self.y + line_height - size:.2f} Td (".encode()
+                + pdf_string(line) + b") Tj ET")
+        # Paragraph spacing.
+        self.y -= self.font_size * (LINE_SPACING - 1) * 2
+
+    def add_image(self, data: bytes) -> None:
+        """Draws an image, scaled down to fit the page if needed."""
+        data, width, height, (pixel_width, pixel_height) = compress_image(
+            data, CONTENT_WIDTH, CONTENT_HEIGHT)
+        hash_ = hashlib.sha256(data).hexdigest()
+        image_id = self.images.get(hash_)
+        if image_id is None:
+            image_id = self.images[hash_] = self.write_object(
+                "<< /Type /XObject /Subtype /Image "
+                f"/Width {pixel_width} /Height {pixel_height} "
+                "/ColorSpace /DeviceRGB /BitsPerComponent 8 "
+                f"/Filter /DCTDecode /Length {len(data)} >>", data)
+        if self.y - height < MARGIN:
+            self.new_page()
+        self.y -= height
+        self.page_images.add(image_id)
+        self.operations.append(
+            f"q {width:.2f} 0 0 {height:.2f} {MARGIN:.2f} {self.y:.2f} cm "
+            f"/Im{image_id} Do Q".encode())
+        self.y -= self.font_size * (LINE_SPACING - 1) * 2
+
+    def finish(self) -> None:
+        # The last page is written unless left empty.
+        if self.operations or not self.page_ids:
+            self.new_page()
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self.write_object(
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>",
+            number=2)
+        self.write_object("<< /Type /Catalog /Pages 2 0 R >>", number=1)
+        cross_reference = self.file.tell()
+        self.file.write(
+            f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n"
+            .encode())
+        self.file.write(b"".join(
+            f"{offset:010} 00000 n \n".encode() for offset in self.offsets))
+        self.file.write(
+            f"trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{cross_reference}\n%%EOF\n".encode())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def pdf_string(text: str) -> bytes:
+    """
+    Returns text as the contents of a PDF string in the encoding of the
+    standard fonts, characters outside it being replaced.
+    """
+    return (
+        text.encode("cp1252", "replace").replace(b"\\", b"\\\\")
+        .replace(b"(", b"\\(").replace(b")", b"\\)"))
+
+
+def write_article(
+    writer: DocumentWriter, article: Article,
+    progress: Callable[[int, int], None] = None
+) -> None:
+    """
+    Writes an article, reporting progress as (elements written,
+    total elements).
+    """
+    writer.add_text(article.heading, HEADING_SCALE, True)
+    writer.add_text(article.description, DESCRIPTION_SCALE)
+    if article.date_time_published is not None:
+        writer.add_text(metadata_text(article), SMALL_SCALE)
+    for count, element in enumerate(article.elements, 1):
+        if isinstance(element, Text):
+            if element.is_subheading:
+                writer.add_text(element.contents, SUBHEADING_SCALE, True)
+            else:
+                writer.add_text(element.contents)
+        else:
+            writer.add_image(element.data)
+            info_text = image_info_text(element)
+            if info_text:
+                writer.add_text(info_text, SMALL_SCALE, italic=True)
+        if progress is not None:
+            progress(count, len(article.elements))
+
+
+def export_docx(
+    article: Article, path: pathlib.Path, font_size: int = DEFAULT_FONT_SIZE,
+    progress: Callable[[int, int], None] = None
+) -> None:
+    """
+    Exports an article to a DOCX file, reporting progress
+    as (elements written, total elements).
+    """
+    check_images_downloaded(article)
+    with DocxWriter(path, font_size) as writer:
+        write_article(writer, article, progress)
+
+
+def export_pdf(
+    article: Article, path: pathlib.Path, font_size: int = DEFAULT_FONT_SIZE,
+    progress: Callable[[int, int], None] = None
+) -> None:
+    """
+    Exports an article to a PDF file, reporting progress
+    as (elements written, total elements).
+    """
+    check_images_downloaded(article)
+    with PdfWriter(path, font_size) as writer:
+        write_article(writer, article, progress)
@@ -0,0 +1,110 @@
+"""
+Image processing - resizing images to fit the article width,
+and re-encoding images to save space.
+"""
+import io
+
+from PIL import Image as PilImage
+
+from utils import WRAPLENGTH
+
+
+# Formats display variants are saved in, keeping the original format
+# where possible, and the JPEG quality of variants.
+VARIANT_FORMATS = ("JPEG", "PNG", "WEBP")
+VARIANT_QUALITY = 85
+# Lossy formats images are re-encoded in to save space, and the fraction
+# of the size which must be saved for the re-encoded image to be kept.
+RECOMPRESS_FORMATS = ("JPEG", "WEBP")
+RECOMPRESS_MIN_SAVING = 0.1
+# Errors of images which cannot be decoded - corrupt, or so large they
+# may be decompression bombs.
+DECODE_ERRORS = (OSError, ValueError, PilImage.DecompressionBombError)
+
+
+def fit_width(pil_image: PilImage.Image, max_width: int) -> PilImage.Image:
+    """Returns the image scaled down to fit the width, if wider."""
+    if pil_image.width <= max_width:
+        return pil_image
+    height = max(round(pil_image.height * max_width / pil_image.width), 1)
+    return pil_image.resize((max_width, height), PilImage.LANCZOS)
+
+
+def decode_for_display(
+    data: bytes, max_width: int = WRAPLENGTH
+) -> PilImage.Image:
+    """Decodes an image, scaled down to fit the width if wider."""
+    with io.BytesIO(data) as image_bytes:
+        pil_image = PilImage.open(image_bytes)
+        pil_image.load()
+    return fit_width(pil_image, max_width)
+
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """
+    Returns the size of an image in pixels, only reading the image header.
+    None is returned if the image cannot be read.
+    """
+    try:
+        with io.BytesIO(data) as image_bytes:
+            return PilImage.open(image_bytes).size
+    except DECODE_ERRORS:
+        return None
+
+
+def fit_size(size: tuple[int, int], max_width: int) -> tuple[int, int]:
+    """Returns the size scaled down to fit the width, if wider."""
+    width, height = size
+    if width <= max_width:
+        return width, height
+    return max_width, max(round(height * max_width / width), 1)
+
+
+def make_display_variant(
+    data: bytes, max_width: int = WRAPLENGTH
+) -> bytes | None:
+    """
+    Returns the image re-encoded to fit the article width. None is returned
+    if the image already fits, or it cannot be decoded.
+    """
+    try:
+        with io.BytesIO(data) as image_bytes:
+            pil_image = PilImage.open(image_bytes)
+            if pil_image.width <= max_width:
+                return None
+            format_ = pil_image.format
+            resized = fit_width(pil_image, max_width)
+    except DECODE_ERRORS:
+        return None
+    if format_ not in VARIANT_FORMATS:
+        format_ = "PNG"
+    if format_ == "JPEG" and resized.mode not in ("RGB", "L"):
+        resized = resized.convert("RGB")
+    with io.BytesIO() as variant_bytes:
+        resized.save(variant_bytes, format_, quality=VARIANT_QUALITY)
+        return variant_bytes.getvalue()
+
+
+def recompress(data: bytes, quality: int) -> bytes | None:
+    """
+    Returns a lossy (JPEG/WebP) image re-encoded at the given quality,
+    if that saves enough space. None is returned otherwise, such as for
+    lossless images, or if the image cannot be decoded.
+    """
+    try:
+        with io.BytesIO(data) as image_bytes:
+            pil_image = PilImage.open(image_bytes)
+            format_ = pil_image.format
+            if format_ not in RECOMPRESS_FORMATS:
+                return None
+            pil_image.load()
+    except DECODE_ERRORS:
+        return None
+    if format_ == "JPEG" and pil_image.mode not in ("RGB", "L", "CMYK"):
+        pil_image = pil_image.convert("RGB")
+    with io.BytesIO() as recompressed_bytes:
+        pil_image.save(recompressed_bytes, format_, quality=quality)
+        recompressed = recompressed_bytes.getvalue()
+    if len(recompressed) > len(data) * (1 - RECOMPRESS_MIN_SAVING):
+        return None
+    return recompressed
@@ -0,0 +1,213 @@
+"""
+Background article loading - fetching, parsing and image downloading
+run on a worker thread, with progress posted back to a queue.
+"""
+import itertools
+import pathlib
+import queue
+import threading
+import time
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, field
+
+from typing import TYPE_CHECKING
+
+from article import Article, Image, Text, make_soup, parse_article
+from cache import ResponseCache
+from data import load_article_by_url
+from images import decode_for_display
+from metrics import profile, span
+from network import (
+    LoadCancelled, create_session, download_images, fetch_page,
+    fetch_page_sections)
+from utils import PROFILE_FOLDER, normalise_url
+
+if TYPE_CHECKING:
+    from PIL import Image as PilImage
+
+
+# Load stages, in order.
+QUEUED = "queued"
+FETCHING = "fetching"
+PARSING = "parsing"
+IMAGES = "images"
+# Progressive loads only - the article is parsed (with images yet to be
+# downloaded), then each image has arrived and been decoded for display.
+PARSED = "parsed"
+IMAGE_READY = "image ready"
+# Final stages - exactly one is posted per job.
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STAGES = (DONE, FAILED, CANCELLED)
+
+
+@dataclass
+class LoadJob:
+    """
+    An article URL to load, which can be cancelled at any time.
+    If profiled, the path of the profile is set once the job is run.
+    A saved copy of the article is used if any, unless refreshing.
+    Progressive loads post the article once parsed, then each image
+    as it arrives. The (performance counter) time the job started
+    running is set once run, and the seconds from then until the text
+    was shown once shown.
+    """
+    id: int
+    url: str
+    fetch_images: bool
+    profiled: bool = False
+    refresh: bool = False
+    progressive: bool = False
+    profile_path: pathlib.Path = None
+    started: float = None
+    first_text: float = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        """Raises LoadCancelled if the job has been cancelled."""
+        if self.cancelled:
+            raise LoadCancelled
+
+
+@dataclass
+class LoadEvent:
+    """
+    Progress of a job: the article upon PARSED and DONE, the image and
+    its decoded display image upon IMAGE_READY, the error upon FAILED.
+    """
+    job: LoadJob
+    stage: str
+    done: int = 0
+    total: int = 0
+    article: Article = None
+    error: Exception = None
+    image: Image = None
+    decoded: "PilImage.Image" = None
+
+    def __str__(self) -> str:
+        if self.stage in (IMAGES, IMAGE_READY):
+            return f"{self.stage} {self.done}/{self.total}"
+        return self.stage
+
+
+class ArticleLoader:
+    """
+    Loads queued articles one after another on a background thread.
+    Events are posted to the events queue, to be polled by the GUI.
+    Pages are downloaded in full, unless streaming is enabled, which
+    only downloads and parses the sections articles are parsed from
+    (see fetch_page_sections). Streaming is not yet any faster, as the
+    sections are scanned by a pure Python parser before being parsed.
+    """
+
+    def __init__(self, stream: bool = False) -> None:
+        self.stream = stream
+        self.events = queue.Queue()
+        self._jobs = queue.Queue()
+        self._ids = itertools.count(1)
+        self._session = create_session()
+        self.cache = ResponseCache()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, url: str, fetch_images: bool, profiled: bool = False,
+        refresh: bool = False, progressive: bool = False
+    ) -> LoadJob:
+        """
+        Queues an article URL to load, profiling the load if requested,
+        fetching the article even if saved if refreshing, and posting
+        the article before its images if progressive.
+        """
+        job = LoadJob(
+            next(self._ids), url, fetch_images, profiled, refresh,
+            progressive)
+        self._jobs.put(job)
+        self._post(job, QUEUED)
+        return job
+
+    def cancel(self, job: LoadJob) -> None:
+        """Cancels a queued or in-flight job."""
+        job.cancel_event.set()
+
+    def _post(self, job: LoadJob, stage: str, **kwargs) -> None:
+        self.events.put(LoadEvent(job, stage, **kwargs))
+
+    def _run(self) -> None:
+        """Worker thread - processes jobs forever."""
+        while True:
+            job = self._jobs.get()
+            job.started = time.perf_counter()
+            if job.profiled:
+                job.profile_path = (
+                    PROFILE_FOLDER / f"load-{int(time.time())}-{job.id}.prof")
+            try:
+                with (
+                    profile(job.profile_path) if job.profiled
+                    else nullcontext()
+                ), span("load.total"):
+                    article = self._load(job)
+            except LoadCancelled:
+                self._post(job, CANCELLED)
+            except Exception as e:
+                self._post(job, FAILED, error=e)
+            else:
+                self._post(job, DONE, article=article)
+
+    def _load(self, job: LoadJob) -> Article:
+        """
+        Fetches, parses and downloads the images of an article, unless
+        saved, in which case it is loaded from the database instead
+        (without its images, if images are not to be fetched).
+        """
+        job.check_cancelled()
+        url = normalise_url(job.url)
+        if not job.refresh:
+            article = load_article_by_url(url)
+            if article is not None:
+                if not job.fetch_images:
+                    article.elements = [
+                        element for element in article.elements
+                        if isinstance(element, Text)]
+                return article
+        self._post(job, FETCHING)
+        fetch = fetch_page_sections if self.stream else fetch_page
+        content = fetch(self._session, job.url, self.cache)
+        job.check_cancelled()
+        self._post(job, PARSING)
+        article = parse_article(make_soup(content), job.fetch_images)
+        article.url = url
+        job.check_cancelled()
+        images = article.images
+        if job.progressive:
+            self._post(job, PARSED, article=article)
+        self._post(job, IMAGES, total=len(images))
+        done = 0
+
+        def image_ready(image: Image) -> None:
+            # Decoded here, so the GUI thread need not decode it. Images
+            # which cannot be decoded are left to the GUI to report.
+            nonlocal done
+            done += 1
+            decoded = None
+            with span("load.decode"), suppress(OSError):
+                decoded = decode_for_display(
+                    image.display_data or image.data)
+            self._post(
+                job, IMAGE_READY, done=done, total=len(images),
+                article=article, image=image, decoded=decoded)
+
+        # Progressive loads report progress with each image instead.
+        download_images(
+            images, self._session,
+            progress=None if job.progressive else lambda done, total: (
+                self._post(job, IMAGES, done=done, total=total)),
+            cancel_event=job.cancel_event, cache=self.cache,
+            on_image=image_ready if job.progressive else None)
+        job.check_cancelled()
+        return article
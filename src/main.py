@@ -1,20 +1,49 @@
-import io
+import bisect
+import functools
+import hashlib
+import itertools
+import json
+import math
+import queue
+import re
+import sys
+import textwrap
+import threading
+import time
 import tkinter as tk
 from contextlib import suppress
-from ctypes import windll
+from tkinter import filedialog
+from tkinter import font as tkfont
 from tkinter import messagebox
+from tkinter import simpledialog
 from tkinter import ttk
+from typing import TYPE_CHECKING, Callable
 
-import requests as rq
-from bs4 import BeautifulSoup
-from PIL import Image as PilImage, ImageTk
+from article import Article, ArticleSummary, Text, Image
+from data import (
+    insert_article, load_article_by_id, load_summary_page,
+    load_article_summary, delete_article_by_id, close_connections,
+    search_articles, summary_sort_key, add_listener, database_size,
+    table_storage, article_storage, INSERTED, UPDATED, DELETED)
+from export import export_docx, export_pdf, DEFAULT_FONT_SIZE
+from maintenance import Maintenance
+from metrics import metrics, count, span
+from utils import (
+    tnr, normalise_url, RED, DOMAIN, ARTICLE_TEXT_PARAMS, WRAPLENGTH,
+    IMAGE_CACHE_BUDGET, ARTICLE_VIEW_BUDGET, LruCache)
 
-from article import Article, load_article_from_soup, Text, Image
-from data import insert_article, load_articles, delete_article_by_id
-from utils import tnr, RED, DOMAIN, REQUEST_TIMEOUT, ARTICLE_TEXT_PARAMS
+# Image processing and networking libraries are slow to import, so are
+# only imported upon first use, for the window to be shown sooner.
+if TYPE_CHECKING:
+    from PIL import Image as PilImage, ImageTk
 
+    from loader import ArticleLoader, LoadEvent, LoadJob
 
-windll.shcore.SetProcessDpiAwareness(True) # Enhanced GUI quality.
+
+if sys.platform == "win32":
+    from ctypes import windll
+
+    windll.shcore.SetProcessDpiAwareness(True) # Enhanced GUI quality.
 TITLE = "The Telegraph Paywall Bypass"
 ARTICLE_TABLE_HEADINGS_WIDTHS = {
     "ID": 75,
@@ -23,8 +52,69 @@ ARTICLE_TABLE_HEADINGS_WIDTHS = {
     "Published": 225,
     "Fetched": 225,
 }
+# Sort key (see data.SORT_COLUMNS) of each column, the initial sort column
+# and direction, and the markers of the sort column heading.
+ARTICLE_TABLE_SORT_KEYS = {
+    "ID": "id",
+    "Heading": "heading",
+    "Author": "author",
+    "Published": "published",
+    "Fetched": "fetched",
+}
+DEFAULT_SORT_HEADING = "Fetched"
+DEFAULT_SORT_DESCENDING = True
+SORT_MARKERS = {False: " \u25b2", True: " \u25bc"}
+# Columns shown whilst searching, the match snippet replacing the details.
+SEARCH_TABLE_HEADINGS = ("ID", "Heading", "Match")
 ARTICLE_TABLE_HEIGHT = 15
+# Saved articles are loaded in pages as the table is scrolled, the next
+# page being loaded once fewer rows than this remain below the view.
+ARTICLE_PAGE_SIZE = 100
+ARTICLE_PRELOAD_ROWS = 2 * ARTICLE_TABLE_HEIGHT
 TREEVIEW_ROW_HEIGHT = 25
+LOAD_POLL_INTERVAL_MS = 50
+# Interval between refreshes of the diagnostics (whilst visible).
+DIAGNOSTICS_REFRESH_MS = 1000
+DIAGNOSTICS_HEADINGS_WIDTHS = {
+    "Stage": 300,
+    "Count": 100,
+    "Last (ms)": 150,
+    "Mean (ms)": 150,
+    "P95 (ms)": 150,
+    "Max (ms)": 150,
+    "Total (ms)": 150,
+}
+STORAGE_HEADINGS_WIDTHS = {
+    "ID": 75,
+    "Heading": 700,
+    "Text (KiB)": 150,
+    "Images (KiB)": 150,
+    "Total (KiB)": 150,
+}
+# Range of font sizes articles can be exported with.
+MIN_EXPORT_FONT_SIZE = 6
+MAX_EXPORT_FONT_SIZE = 36
+# Delay after typing before searching, to avoid searching every keystroke.
+SEARCH_DELAY_MS = 150
+# Padding around each article element, and within labels (Tk default).
+ELEMENT_PADDING = 5
+LABEL_PADDING = 3
+# Elements are rendered within this many view heights of the view, and
+# destroyed once further than the greater distance.
+RENDER_MARGIN_VIEWS = 1
+KEEP_MARGIN_VIEWS = 3
+ESTIMATED_IMAGE_HEIGHT = 600
+FONT_SAMPLE_TEXT = (
+    "The quick brown fox jumps over the lazy dog, said the Telegraph. ")
+# Decoded images by data hash (as in the image store), sized by their
+# pixel memory (RGBA).
+PHOTO_IMAGE_CACHE = LruCache(
+    IMAGE_CACHE_BUDGET,
+    lambda photo_image: photo_image.width() * photo_image.height() * 4)
+# Rough memory (bytes) of each widget of an article view, besides images.
+WIDGET_MEMORY_ESTIMATE = 16 * 1024
+# Maximum number of characters of the heading shown as a reader tab title.
+TAB_TITLE_LENGTH = 30
 
 
 class TelegraphPaywallBypass(tk.Tk):
@@ -42,16 +132,59 @@ class TelegraphPaywallBypass(tk.Tk):
         self.notebook = ttk.Notebook(self)
         self.url_input_frame = UrlInputFrame(self.notebook)
         self.articles_frame = ArticlesFrame(self.notebook)
+        self.storage_frame = StorageFrame(self.notebook)
+        self.diagnostics_frame = DiagnosticsFrame(self.notebook)
         self.notebook.add(self.url_input_frame, text="URL Input")
         self.notebook.add(self.articles_frame, text="Saved Articles")
+        self.notebook.add(self.storage_frame, text="Storage")
+        self.notebook.add(self.diagnostics_frame, text="Diagnostics")
         self.title_label.pack()
         self.notebook.pack()
+        self._reader: ReaderToplevel = None
+        # Returns space freed by deleted articles to the system over time.
+        self.maintenance = Maintenance()
+
+    @property
+    def reader(self) -> "ReaderToplevel":
+        """The reader window, opened upon first use or once closed."""
+        if self._reader is None or not self._reader.winfo_exists():
+            self._reader = ReaderToplevel(self)
+        return self._reader
     
-    def render_article(self, article: Article) -> None:
-        """Renders an article on screen."""
-        ArticleToplevel(
-            self, article,
-            self.url_input_frame.settings_frame.display_metadata)
+    def render_article(
+        self, article: Article, display_metadata: bool = None
+    ) -> None:
+        """
+        Renders an article in the reader, displaying its metadata
+        if enabled (by default, as set in the settings).
+        """
+        if display_metadata is None:
+            display_metadata = (
+                self.url_input_frame.settings_frame.display_metadata)
+        self.reader.open(article, display_metadata)
+
+    def show_image(
+        self, article: Article, image: Image, decoded: "PilImage.Image"
+    ) -> None:
+        """
+        Shows an image of an article once downloaded and decoded, in
+        place of its placeholder if the article is open in the reader.
+        """
+        if decoded is not None:
+            # Cached, so the image is not decoded again upon rendering.
+            load_photo_image(image, decoded)
+        if self._reader is not None and self._reader.winfo_exists():
+            self._reader.refresh_image(article, image)
+
+    def close_saved(self, article_id: int) -> None:
+        """Closes the reader tab of a saved article, if open."""
+        if self._reader is not None and self._reader.winfo_exists():
+            self._reader.close_saved(article_id)
+
+    def reload_saved(self, article_id: int) -> None:
+        """Reloads the reader tabs of a saved article, if open."""
+        if self._reader is not None and self._reader.winfo_exists():
+            self._reader.reload_saved(article_id)
 
 
 class UrlInputFrame(tk.Frame):
@@ -71,23 +204,27 @@ class UrlInputFrame(tk.Frame):
         self.settings_frame = SettingsFrame(self)
         self.load_button = ttk.Button(
             self, text="Load", width=15, command=self.load, state="disabled")
+        self.status_label = tk.Label(self, font=tnr(11))
+        self.cancel_button = ttk.Button(
+            self, text="Cancel", width=15, command=self.cancel,
+            state="disabled")
         self.info_label.pack(padx=25, pady=25)
         self.entry.pack(padx=25)
         self.feedback_label.pack(padx=25)
         self.settings_frame.pack(padx=25, pady=25)
-        self.load_button.pack(padx=25, pady=25)
+        self.load_button.pack(padx=25, pady=(25, 5))
+        self.status_label.pack(padx=25)
+        self.cancel_button.pack(padx=25, pady=(5, 25))
+        # Started upon the first load.
+        self.loader: "ArticleLoader" = None
+        # Jobs submitted but not yet finished, in submission order.
+        self.jobs: list["LoadJob"] = []
+        self.status = ""
+        self.poll_loader()
     
     @property
     def url(self) -> str:
-        # Normalise URL, removing the protocol and www if specified.
-        url = self._url.get().strip().lower()
-        if url.startswith("http://"):
-            url = url.removeprefix("http://")
-        elif url.startswith("https://"):
-            url = url.removeprefix("https://")
-        if url.startswith("www."):
-            url = url.removeprefix("www.")
-        return url
+        return normalise_url(self._url.get())
 
     def validate_url(self) -> None:
         """Validate the URL in real time."""
@@ -104,49 +241,290 @@ class UrlInputFrame(tk.Frame):
         self.load_button.config(state="normal")
     
     def load(self) -> None:
-        """Loads the article at the input URL if possible."""
-        url = f"https://{self.url}"
-        try:
-            response = rq.get(url, timeout=REQUEST_TIMEOUT)
-            if response.status_code >= 400:
-                raise RuntimeError(f"Status code {response.status_code}")
-            soup = BeautifulSoup(response.content, "html.parser")
-            self.master.master.render_article(
-                load_article_from_soup(soup, self.settings_frame.display_images))
-        except Exception as e:
+        """Queues the article at the input URL to load in the background."""
+        if self.loader is None:
+            from loader import ArticleLoader
+
+            self.loader = ArticleLoader()
+        job = self.loader.submit(
+            f"https://{self.url}", self.settings_frame.display_images,
+            self.master.master.diagnostics_frame.take_profile_request(),
+            not self.settings_frame.use_saved,
+            self.settings_frame.text_first)
+        self.jobs.append(job)
+        self.cancel_button.config(state="normal")
+
+    def cancel(self) -> None:
+        """Cancels the article currently loading."""
+        if self.jobs:
+            self.loader.cancel(self.jobs[0])
+
+    def poll_loader(self) -> None:
+        """Handles load progress posted by the background loader."""
+        while self.loader is not None and not self.loader.events.empty():
+            self.handle_load_event(self.loader.events.get())
+        self.after(LOAD_POLL_INTERVAL_MS, self.poll_loader)
+
+    def handle_load_event(self, event: "LoadEvent") -> None:
+        """Reports progress of a job, rendering the article once loaded."""
+        from loader import DONE, FAILED, FINAL_STAGES, IMAGE_READY, PARSED
+
+        if event.stage in FINAL_STAGES:
+            self.jobs.remove(event.job)
+            if not self.jobs:
+                self.cancel_button.config(state="disabled")
+        job = event.job
+        if event.stage == PARSED or (
+            event.stage == DONE and job.first_text is None
+        ):
+            # Text is readable once the article is rendered (before the
+            # images are downloaded if progressive).
+            self.master.master.render_article(event.article)
+            job.first_text = time.perf_counter() - job.started
+            metrics.record("load.first_text", job.first_text)
+        elif event.stage == IMAGE_READY:
+            self.master.master.show_image(
+                event.article, event.image, event.decoded)
+        if event.stage in FINAL_STAGES or job is self.jobs[0]:
+            # Only the progress of the current job is shown.
+            self.status = f"{job.url.removeprefix('https://')}: {event}"
+            if job.first_text is not None:
+                self.status += f" (text in {job.first_text * 1000:.0f} ms)"
+        queued = len(self.jobs) - 1
+        status = self.status
+        if queued > 0:
+            status += f" ({queued} queued)"
+        self.status_label.config(text=status)
+        if event.stage in FINAL_STAGES and event.job.profile_path is not None:
+            messagebox.showinfo(
+                "Profile",
+                f"The load was profiled - see {event.job.profile_path} "
+                "and the report alongside it.")
+        if event.stage == FAILED:
             messagebox.showerror(
-                "Error", f"An error occurred whilst loading the article: {e}")
+                "Error",
+                f"An error occurred whilst loading the article: {event.error}")
 
 
-class ArticleToplevel(tk.Toplevel):
-    """Toplevel to display the fetched article contents."""
-    
+class ReaderToplevel(tk.Toplevel):
+    """
+    Reader window showing each opened article in a tab. Built article
+    views are kept in a memory-capped LRU cache, so switching back to a
+    recent article is instant. Evicted views are destroyed, and built
+    again once their tab is selected.
+    """
+
+    def __init__(self, master: TelegraphPaywallBypass) -> None:
+        super().__init__(master)
+        self.title(TITLE)
+        # Shown once an article is opened.
+        self.withdraw()
+        self.close_button = ttk.Button(
+            self, text="Close Tab", width=15, command=self.close_selected)
+        self.notebook = ttk.Notebook(self)
+        self.close_button.pack(padx=5, pady=5, anchor=tk.E)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind(
+            "<<NotebookTabChanged>>", lambda *_: self.on_tab_changed())
+        # Middle-clicking a tab closes it.
+        self.notebook.bind("<Button-2>", self.on_middle_click)
+        self.views = LruCache(
+            ARTICLE_VIEW_BUDGET, lambda view: view.memory(),
+            lambda tab, _: tab.evict())
+        self.selected: ArticleTab = None
+
+    @property
+    def tabs(self) -> list["ArticleTab"]:
+        return [self.nametowidget(name) for name in self.notebook.tabs()]
+
+    def open(self, article: Article, display_metadata: bool) -> None:
+        """Opens an article in a new tab, or selects its tab if open."""
+        for tab in self.tabs:
+            if tab.shows(article):
+                self.notebook.select(tab)
+                break
+        else:
+            tab = ArticleTab(self.notebook, article, display_metadata)
+            self.notebook.add(
+                tab, text=textwrap.shorten(
+                    article.heading, TAB_TITLE_LENGTH, placeholder="..."))
+            self.notebook.select(tab)
+        self.deiconify()
+        self.lift()
+
+    def refresh_image(self, article: Article, image: Image) -> None:
+        """Renders an image of an article again, if its view is built."""
+        for tab in self.tabs:
+            if tab.article is article and tab.view is not None:
+                tab.view.article_frame.refresh_element(image)
+
+    def select_saved(self, article_id: int) -> bool:
+        """Selects the tab of a saved article if open, returning if so."""
+        for tab in self.tabs:
+            if tab.article.id == article_id:
+                self.notebook.select(tab)
+                self.deiconify()
+                self.lift()
+                return True
+        return False
+
+    def on_tab_changed(self) -> None:
+        """Builds the view of the selected tab unless cached."""
+        if self.selected is not None and self.selected.view is not None:
+            # More of the view left may have been rendered, so remeasure.
+            self.views.put(self.selected, self.selected.view)
+        name = self.notebook.select()
+        if not name:
+            self.selected = None
+            return
+        tab = self.selected = self.nametowidget(name)
+        self.title(tab.article.heading)
+        if tab.view is None:
+            count("render.view_cache_misses")
+            tab.build()
+        else:
+            count("render.view_cache_hits")
+        self.views.put(tab, tab.view)
+
+    def on_middle_click(self, event: tk.Event) -> None:
+        with suppress(tk.TclError):
+            index = self.notebook.index(f"@{event.x},{event.y}")
+            self.close_tab(self.tabs[index])
+
+    def close_selected(self) -> None:
+        if self.selected is not None:
+            self.close_tab(self.selected)
+
+    def close_article(self, article: Article) -> None:
+        """Closes the tab of the article, if open."""
+        for tab in self.tabs:
+            if tab.article is article:
+                self.close_tab(tab)
+                return
+
+    def close_saved(self, article_id: int) -> None:
+        """Closes the tab of a saved article, if open."""
+        for tab in self.tabs:
+            if tab.article.id == article_id:
+                self.close_tab(tab)
+                return
+
+    def reload_saved(self, article_id: int) -> None:
+        """
+        Shows the latest copy of a saved article once updated in its
+        tabs, as the images of the copy shown may have been released
+        from the image store. Built views are built again.
+        """
+        for tab in self.tabs:
+            if tab.article.id != article_id:
+                continue
+            try:
+                article = load_article_by_id(article_id)
+            except RuntimeError:
+                # Deleted since.
+                self.close_tab(tab)
+                continue
+            tab.article = article
+            self.notebook.tab(tab, text=textwrap.shorten(
+                article.heading, TAB_TITLE_LENGTH, placeholder="..."))
+            if tab.view is not None:
+                self.views.pop(tab)
+                tab.evict()
+            if tab is self.selected:
+                self.title(article.heading)
+                tab.build()
+                self.views.put(tab, tab.view)
+
+    def close_tab(self, tab: "ArticleTab") -> None:
+        """Closes a tab, closing the window once no tabs are left."""
+        self.views.pop(tab)
+        if tab is self.selected:
+            self.selected = None
+        self.notebook.forget(tab)
+        tab.destroy()
+        if not self.notebook.tabs():
+            self.destroy()
+
+
+class ArticleTab(tk.Frame):
+    """
+    Tab of an article in the reader, holding the view of the article
+    whilst built (cached).
+    """
+
     def __init__(
-        self, master: TelegraphPaywallBypass,
-        article: Article, display_metadata: bool
+        self, master: ttk.Notebook, article: Article, display_metadata: bool
+    ) -> None:
+        super().__init__(master)
+        self.article = article
+        self.display_metadata = display_metadata
+        self.view: ArticleView = None
+
+    def shows(self, article: Article) -> bool:
+        """Whether the tab shows the article, or the same saved article."""
+        return article is self.article or (
+            article.id is not None and article.id == self.article.id)
+
+    def build(self) -> None:
+        with span("render.frame"):
+            self.view = ArticleView(self, self.article, self.display_metadata)
+        self.view.pack(fill=tk.BOTH, expand=True)
+
+    def evict(self) -> None:
+        """Destroys the view, to be built again once selected."""
+        count("render.view_evictions")
+        self.view.destroy()
+        self.view = None
+
+
+class ArticleView(tk.Frame):
+    """Scrollable view of the fetched article contents."""
+
+    def __init__(
+        self, master: ArticleTab, article: Article, display_metadata: bool
     ) -> None:
         super().__init__(master)
-        self.title(article.heading)
         self.canvas = tk.Canvas(self, width=1200, height=700)
         self.vertical_scrollbar = tk.Scrollbar(
             self, orient="vertical", command=self.canvas.yview)
-        self.canvas.config(yscrollcommand=self.vertical_scrollbar.set)
-        self.article_frame = ArticleFrame(self, article, display_metadata)
-        self.canvas.create_window(
-            0, 0, anchor=tk.NW, window=self.article_frame)
-        self.canvas.update()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
-        self.canvas.pack(side=tk.LEFT)
+        self.article_frame = ArticleFrame(
+            self.canvas, article, display_metadata)
+        self.canvas.config(yscrollcommand=self.on_scroll)
+        self.canvas.bind(
+            "<Configure>", lambda *_: self.article_frame.schedule_render())
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.vertical_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+    def on_scroll(self, first: str, last: str) -> None:
+        """Updates the scrollbar and the elements rendered upon scrolling."""
+        self.vertical_scrollbar.set(first, last)
+        self.article_frame.schedule_render()
+
+    def memory(self) -> int:
+        """
+        Estimated memory (bytes) of the view - the pixels of its
+        decoded images (RGBA) and its widgets.
+        """
+        widgets = self.article_frame.widgets.values()
+        pixels = sum(
+            widget.image.width() * widget.image.height()
+            for widget in widgets
+            if isinstance(widget, ImageFrame) and widget.image is not None)
+        return 4 * pixels + WIDGET_MEMORY_ESTIMATE * (len(widgets) + 1)
+
 
 class ArticleFrame(tk.Frame):
-    """Frame of the article, that can be scrolled as needed."""
+    """
+    Frame of the article heading, description, metadata and options.
+    The article elements are laid out below it on the canvas, only
+    creating widgets for elements near the visible region of the canvas.
+    """
 
     def __init__(
         self, master: tk.Canvas, article: Article, display_metdata: bool
     ) -> None:
         super().__init__(master)
+        self.canvas = master
         self.heading = tk.Label(
             self, font=tnr(25, True), text=article.heading,
             **ARTICLE_TEXT_PARAMS)
@@ -167,14 +545,158 @@ class ArticleFrame(tk.Frame):
                 **ARTICLE_TEXT_PARAMS)
             self.metadata.pack(padx=5, pady=5, anchor=tk.W)
         self.options_frame.pack(padx=5, pady=5, anchor=tk.W)
-        for element in article.elements:
-            if isinstance(element, Text):
-                font = tnr(20, True) if element.is_subheading else tnr(14)
-                tk.Label(
-                    self, font=font, text=element.contents,
-                    **ARTICLE_TEXT_PARAMS).pack(padx=5, pady=5, anchor=tk.W)
-            else:
-                ImageFrame(self, element).pack(padx=5, pady=5, anchor=tk.W)
+        self.canvas.create_window(0, 0, anchor=tk.NW, window=self)
+        self.update_idletasks()
+        self.elements = article.elements
+        # Estimated (or measured once rendered) element heights, and the
+        # y coordinate of the top of each element, then the article bottom.
+        self.heights = [
+            estimate_element_height(element) for element in self.elements]
+        self.tops = list(itertools.accumulate(
+            self.heights, initial=self.winfo_reqheight()))
+        # Rendered elements - widgets and canvas window items by index.
+        self.widgets: dict[int, tk.Widget] = {}
+        self.items: dict[int, int] = {}
+        self.render_scheduled = False
+        self.update_scrollregion()
+        self.render()
+
+    @property
+    def height(self) -> int:
+        """Total height of the article, including all elements."""
+        return self.tops[-1]
+
+    def update_scrollregion(self) -> None:
+        self.canvas.config(scrollregion=(
+            0, 0, max(self.winfo_reqwidth(), WRAPLENGTH), self.height))
+
+    def schedule_render(self) -> None:
+        """Renders the elements near the view once idle."""
+        if not self.render_scheduled:
+            self.render_scheduled = True
+            self.after_idle(self.render)
+
+    def render(self) -> None:
+        """
+        Creates the widgets of the elements near the visible region of
+        the canvas, destroying those of elements far out of view.
+        """
+        self.render_scheduled = False
+        view_height = self.canvas.winfo_height()
+        if view_height <= 1:
+            # Not yet displayed.
+            view_height = int(self.canvas.cget("height"))
+        top = self.canvas.canvasy(0)
+        bottom = top + view_height
+        render_margin = view_height * RENDER_MARGIN_VIEWS
+        keep_margin = view_height * KEEP_MARGIN_VIEWS
+        for index in list(self.widgets):
+            if (
+                self.tops[index] + self.heights[index] < top - keep_margin
+                or self.tops[index] > bottom + keep_margin
+            ):
+                self.canvas.delete(self.items.pop(index))
+                self.widgets.pop(index).destroy()
+        index = max(bisect.bisect_right(
+            self.tops, top - render_margin) - 1, 0)
+        while (
+            index < len(self.elements)
+            and self.tops[index] <= bottom + render_margin
+        ):
+            if index not in self.widgets:
+                with span("render.element"):
+                    self.render_element(index, top)
+                # Earlier corrections may move the view.
+                top = self.canvas.canvasy(0)
+                bottom = top + view_height
+            index += 1
+
+    def render_element(self, index: int, view_top: float) -> None:
+        """Creates the widget of an element, correcting its height."""
+        element = self.elements[index]
+        if isinstance(element, Text):
+            font = tnr(20, True) if element.is_subheading else tnr(14)
+            widget = tk.Label(
+                self.canvas, font=font, text=element.contents,
+                **ARTICLE_TEXT_PARAMS)
+        else:
+            widget = ImageFrame(self.canvas, element)
+        self.widgets[index] = widget
+        self.items[index] = self.canvas.create_window(
+            ELEMENT_PADDING, self.tops[index] + ELEMENT_PADDING,
+            anchor=tk.NW, window=widget)
+        widget.update_idletasks()
+        self.set_height(
+            index, widget.winfo_reqheight() + 2 * ELEMENT_PADDING, view_top)
+
+    def refresh_element(self, element: Text | Image) -> None:
+        """
+        Renders an element again if rendered, such as an image once
+        downloaded, otherwise estimating its height again.
+        """
+        for index, element_ in enumerate(self.elements):
+            if element_ is element:
+                break
+        else:
+            return
+        view_top = self.canvas.canvasy(0)
+        if index in self.widgets:
+            self.canvas.delete(self.items.pop(index))
+            self.widgets.pop(index).destroy()
+            self.render_element(index, view_top)
+        else:
+            self.set_height(index, estimate_element_height(element), view_top)
+        # Elements may have come into view.
+        self.schedule_render()
+
+    def set_height(self, index: int, height: int, view_top: float) -> None:
+        """Sets the height of an element, moving all later elements."""
+        change = height - self.heights[index]
+        if not change:
+            return
+        # Shift all later elements by the change in height.
+        self.heights[index] = height
+        for later_index in range(index + 1, len(self.tops)):
+            self.tops[later_index] += change
+        for later_index, item in self.items.items():
+            if later_index > index:
+                self.canvas.move(item, 0, change)
+        self.update_scrollregion()
+        if self.tops[index] < view_top:
+            # Above the view - keep the visible contents in place.
+            self.canvas.yview_moveto((view_top + change) / self.height)
+
+
+def estimate_element_height(element: Text | Image) -> int:
+    """Estimates the height of an element before it is rendered."""
+    if isinstance(element, Text):
+        font = tnr(20, True) if element.is_subheading else tnr(14)
+        line_height, character_width = font_metrics(font)
+        lines = sum(
+            max(math.ceil(len(line) * character_width / WRAPLENGTH), 1)
+            for line in element.contents.split("\n"))
+        return (
+            lines * line_height + 2 * (LABEL_PADDING + ELEMENT_PADDING))
+    from images import fit_size
+
+    # Uses the recorded size, so the image data need not be loaded.
+    height = (
+        ESTIMATED_IMAGE_HEIGHT if element.width is None
+        else fit_size((element.width, element.height), WRAPLENGTH)[1])
+    height += 2 * (LABEL_PADDING + ELEMENT_PADDING)
+    if element.caption is not None or element.credits is not None:
+        line_height, _ = font_metrics(tnr(11))
+        height += line_height + 2 * (LABEL_PADDING + ELEMENT_PADDING)
+    return height + 2 * ELEMENT_PADDING
+
+
+@functools.cache
+def font_metrics(font: tuple) -> tuple[int, float]:
+    """Returns the line height and mean character width of a font."""
+    font_ = tkfont.Font(font=font)
+    return (
+        font_.metrics("linespace"),
+        font_.measure(FONT_SAMPLE_TEXT) / len(FONT_SAMPLE_TEXT))
 
 
 class ArticleOptionsFrame(tk.Frame):
@@ -194,59 +716,187 @@ class ArticleOptionsFrame(tk.Frame):
             self, text="Export DOCX", width=15, command=self.export_docx)
         self.export_pdf_button = ttk.Button(
             self, text="Export PDF", width=15, command=self.export_pdf)
+        self.status_label = tk.Label(self, font=tnr(11))
         first_button = (
             self.save_button if article.id is None else self.delete_button)
         first_button.grid(row=0, column=0, padx=5, pady=5)
         self.export_docx_button.grid(row=0, column=1, padx=5, pady=5)
         self.export_pdf_button.grid(row=0, column=2, padx=5, pady=5)
+        self.status_label.grid(row=0, column=3, padx=5, pady=5)
     
     def save(self) -> None:
         """Saves the article to the database for future viewing."""
+        if any(image.pending for image in self.article.images):
+            messagebox.showerror(
+                "Error", "The article images have not all been downloaded.",
+                parent=self.winfo_toplevel())
+            return
         try:
             self.article.id = insert_article(self.article)
         except Exception as e:
             messagebox.showerror(
                 "Error", f"An error occurred whilst saving the article: {e}",
-                parent=self.master.master)
+                parent=self.winfo_toplevel())
             return
-        self.master.master.master.articles_frame.update_table()
         self.save_button.grid_forget()
         self.delete_button.grid(row=0, column=0, padx=5, pady=5)
         messagebox.showinfo(
             "Success", "Successfully saved the article.",
-            parent=self.master.master)
+            parent=self.winfo_toplevel())
     
     def delete(self) -> None:
-        """Erases the article from the database and closes the article."""
+        """Erases the article from the database and closes its tab."""
         try:
             delete_article_by_id(self.article.id)
         except Exception as e:
             messagebox.showerror(
                 "Error", f"An error occurred whilst deleting the article: {e}",
-                parent=self.master.master)
+                parent=self.winfo_toplevel())
         else:
             messagebox.showinfo(
                 "Success", "Successfully deleted the article.",
-                parent=self.master.master)
-        self.master.master.master.articles_frame.update_table()
-        self.master.master.destroy()
+                parent=self.winfo_toplevel())
+        self.winfo_toplevel().close_article(self.article)
     
     def export_docx(self) -> None:
         """Allows the user to export the article in DOCX form."""
+        self.export(export_docx, "DOCX", ".docx")
 
     def export_pdf(self) -> None:
         """Allows the user to export the article in PDF form."""
+        self.export(export_pdf, "PDF", ".pdf")
+
+    def export(
+        self, export_function: Callable, file_type: str, extension: str
+    ) -> None:
+        """
+        Asks for the file path and font size, then exports the article
+        on a background thread, displaying progress until done.
+        """
+        toplevel = self.winfo_toplevel()
+        if any(image.pending for image in self.article.images):
+            messagebox.showerror(
+                "Error", "The article images have not all been downloaded.",
+                parent=toplevel)
+            return
+        path = filedialog.asksaveasfilename(
+            parent=toplevel, defaultextension=extension,
+            filetypes=((file_type, f"*{extension}"),),
+            initialfile=re.sub(r'[\\/:*?"<>|]', "", self.article.heading))
+        if not path:
+            return
+        font_size = simpledialog.askinteger(
+            "Font Size", "Font size of the exported text:",
+            initialvalue=DEFAULT_FONT_SIZE, minvalue=MIN_EXPORT_FONT_SIZE,
+            maxvalue=MAX_EXPORT_FONT_SIZE, parent=toplevel)
+        if font_size is None:
+            return
+        for button in (self.export_docx_button, self.export_pdf_button):
+            button.config(state="disabled")
+        self.export_events = queue.Queue()
+        threading.Thread(
+            target=self.run_export,
+            args=(export_function, path, font_size), daemon=True).start()
+        self.poll_export()
+
+    def run_export(
+        self, export_function: Callable, path: str, font_size: int
+    ) -> None:
+        """Background thread - exports the article, posting progress."""
+        try:
+            export_function(
+                self.article, path, font_size,
+                lambda done, total: self.export_events.put((done, total)))
+        except Exception as e:
+            self.export_events.put(e)
+        else:
+            self.export_events.put(None)
+
+    def poll_export(self) -> None:
+        """Displays export progress, reporting the result once done."""
+        while not self.export_events.empty():
+            event = self.export_events.get()
+            if isinstance(event, tuple):
+                self.status_label.config(
+                    text=f"Exporting {event[0]}/{event[1]}")
+                continue
+            self.status_label.config(text="")
+            for button in (self.export_docx_button, self.export_pdf_button):
+                button.config(state="normal")
+            if event is None:
+                messagebox.showinfo(
+                    "Success", "Successfully exported the article.",
+                    parent=self.winfo_toplevel())
+            else:
+                messagebox.showerror(
+                    "Error",
+                    f"An error occurred whilst exporting the article: {event}",
+                    parent=self.winfo_toplevel())
+            return
+        self.after(LOAD_POLL_INTERVAL_MS, self.poll_export)
+
+
+def load_photo_image(
+    image: Image, decoded: "PilImage.Image" = None
+) -> "ImageTk.PhotoImage":
+    """
+    Returns the decoded image fitting the article width, reusing
+    recently decoded images rather than decoding them again.
+    Stored images are keyed by hash, only loading their data upon a miss.
+    Upon a miss, the image is only decoded if not already decoded (such
+    as off the GUI thread whilst loading).
+    """
+    from PIL import ImageTk
+
+    from images import decode_for_display
+
+    data = None
+    if image.stored:
+        key = image.display_hash or image.data_hash
+    else:
+        data = image.display_data or image.data
+        key = hashlib.sha256(data).hexdigest()
+    photo_image = PHOTO_IMAGE_CACHE.get(key)
+    if photo_image is None:
+        count("render.image_cache_misses")
+        if decoded is None:
+            if data is None:
+                data = image.display_data or image.data
+            with span("render.decode"):
+                decoded = decode_for_display(data)
+        photo_image = ImageTk.PhotoImage(decoded)
+        PHOTO_IMAGE_CACHE.put(key, photo_image)
+    else:
+        count("render.image_cache_hits")
+    return photo_image
 
 
 class ImageFrame(tk.Frame):
-    """Frame holding an image and its caption/credits."""
+    """
+    Frame holding an image and its caption/credits. Images yet to be
+    downloaded are shown as a placeholder of the estimated size.
+    """
 
-    def __init__(self, master: ArticleFrame, image: Image) -> None:
+    def __init__(self, master: tk.Canvas, image: Image) -> None:
         super().__init__(master)
-        with io.BytesIO(image.data) as image_bytes:
-            pil_image = PilImage.open(image_bytes)
-            self.image = ImageTk.PhotoImage(pil_image)
-        self.image_label = tk.Label(self, image=self.image)
+        if image.pending:
+            from images import fit_size
+
+            self.image = None
+            width, height = (
+                (WRAPLENGTH, ESTIMATED_IMAGE_HEIGHT) if image.width is None
+                else fit_size((image.width, image.height), WRAPLENGTH))
+            # Sized as the image label would be, including its padding.
+            self.image_label = tk.Frame(
+                self, width=width + 2 * LABEL_PADDING,
+                height=height + 2 * LABEL_PADDING, relief="groove", bd=1)
+            self.image_label.pack_propagate(False)
+            tk.Label(
+                self.image_label, font=tnr(11), text="Loading image..."
+            ).pack(expand=True)
+        else:
+            self.image = load_photo_image(image)
+            self.image_label = tk.Label(self, image=self.image)
         info_text = ""
         if image.caption is not None:
             info_text += image.caption
@@ -260,15 +910,23 @@ class ImageFrame(tk.Frame):
 
 
 class SettingsFrame(tk.Frame):
-    """Controls whether to display/fetch metadata and images."""
+    """
+    Controls whether to display/fetch metadata and images, whether to
+    use saved copies of articles, and whether to show article text
+    before the images are downloaded.
+    """
 
     def __init__(self, master: UrlInputFrame) -> None:
         super().__init__(master)
         self._metadata = tk.BooleanVar(value=True)
         self._images = tk.BooleanVar(value=True)
+        self._use_saved = tk.BooleanVar(value=True)
+        self._text_first = tk.BooleanVar(value=True)
         for (text, variable) in (
             ("Display metadata", self._metadata),
-            ("Display images", self._images)
+            ("Display images", self._images),
+            ("Use saved copies", self._use_saved),
+            ("Show text before images", self._text_first)
         ):
             checkbutton = tk.Checkbutton(
                 self, text=text, variable=variable, font=tnr(15))
@@ -282,6 +940,14 @@ class SettingsFrame(tk.Frame):
     def display_images(self) -> bool:
         return self._images.get()
 
+    @property
+    def use_saved(self) -> bool:
+        return self._use_saved.get()
+
+    @property
+    def text_first(self) -> bool:
+        return self._text_first.get()
+
 
 class ArticlesFrame(tk.Frame):
     """
@@ -291,65 +957,555 @@ class ArticlesFrame(tk.Frame):
 
     def __init__(self, master: ttk.Notebook) -> None:
         super().__init__(master)
+        self._search = tk.StringVar()
+        self._search.trace("w", lambda *_: self.schedule_search())
+        self.search_id = None
+        self.search_frame = tk.Frame(self)
+        self.search_label = tk.Label(
+            self.search_frame, font=tnr(15), text="Search:")
+        self.search_entry = ttk.Entry(
+            self.search_frame, width=75, font=tnr(12),
+            textvariable=self._search)
         self.table = ArticlesTable(self)
+        self.search_label.pack(side=tk.LEFT, padx=5)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_frame.pack(padx=25, pady=(25, 0), anchor=tk.W)
         self.table.pack(padx=25, pady=25)
-        self.table.display_articles(load_articles())
+        # Saved/deleted articles, possibly from other threads.
+        self.changes = queue.Queue()
+        add_listener(lambda *change: self.changes.put(change))
+        # The table is filled once the first page of summaries is loaded
+        # in the background, so the window is shown without waiting for it.
+        self.loaded = False
+        self.loaded_summaries = queue.Queue()
+        threading.Thread(
+            target=self.load_summaries,
+            args=(self.table.sort, self.table.descending), daemon=True
+        ).start()
+        self.poll_changes()
+
+    @property
+    def searching(self) -> bool:
+        return bool(self._search.get().strip())
+
+    def load_summaries(self, sort: str, descending: bool) -> None:
+        """
+        Background thread - loads the summaries of the first page
+        of saved articles in the given order.
+        """
+        try:
+            self.loaded_summaries.put((
+                (sort, descending),
+                load_summary_page(sort, descending, None, ARTICLE_PAGE_SIZE)))
+        except Exception as e:
+            self.loaded_summaries.put(e)
+
+    def poll_changes(self) -> None:
+        """
+        Fills the table once the saved articles are loaded, then
+        updates the table rows of saved and deleted articles.
+        """
+        if not self.loaded:
+            if not self.loaded_summaries.empty():
+                self.display_loaded_summaries(self.loaded_summaries.get())
+            # Changes are applied once the table is filled.
+            self.after(LOAD_POLL_INTERVAL_MS, self.poll_changes)
+            return
+        while not self.changes.empty():
+            change, article_id = self.changes.get()
+            if change == UPDATED:
+                self.winfo_toplevel().reload_saved(article_id)
+            if self.searching:
+                # Matches are ranked, so search again.
+                self.schedule_search()
+            elif change in (INSERTED, UPDATED):
+                # Updated articles may have moved in the sort order.
+                self.table.remove_article(article_id)
+                with suppress(RuntimeError):
+                    self.table.add_article(load_article_summary(article_id))
+            elif change == DELETED:
+                self.table.remove_article(article_id)
+        self.after(LOAD_POLL_INTERVAL_MS, self.poll_changes)
     
+    def display_loaded_summaries(
+        self, loaded: tuple[tuple[str, bool], list[ArticleSummary]] | Exception
+    ) -> None:
+        """
+        Fills the table with the loaded page of summaries (and its order),
+        unless searching.
+        """
+        self.loaded = True
+        if isinstance(loaded, Exception):
+            messagebox.showerror(
+                "Error",
+                f"An error occurred whilst loading saved articles: {loaded}")
+        elif not self.searching:
+            order, summaries = loaded
+            self.table.browse(summaries, order)
+
+    def schedule_search(self) -> None:
+        """Updates the table shortly after the search input stops changing."""
+        if self.search_id is not None:
+            self.after_cancel(self.search_id)
+        self.search_id = self.after(SEARCH_DELAY_MS, self.update_table)
+
     def update_table(self) -> None:
-        """Updates the tables upon article insertion/deletion."""
+        """
+        Refills the table upon the search input changing, only
+        displaying articles matching the search input if any.
+        """
+        self.search_id = None
         self.table.clear()
-        self.table.display_articles(load_articles())
+        if self.searching:
+            results = search_articles(self._search.get())
+            self.table.display_articles(
+                [summary for summary, _ in results],
+                [snippet for _, snippet in results])
+        else:
+            self.table.browse()
 
 
 class ArticlesTable(tk.Frame):
-    """Contains the articles table (treeview) and scrollbar."""
+    """
+    Contains the articles table (treeview) and scrollbar. Saved articles
+    are browsed in the order of the sort column (chosen by clicking the
+    column headings), loading pages of rows as the table is scrolled.
+    """
 
     def __init__(self, master: ArticlesFrame) -> None:
         super().__init__(master)
-        self.articles = None
         self.treeview = ttk.Treeview(
-            self, columns=tuple(ARTICLE_TABLE_HEADINGS_WIDTHS),
+            self, columns=(*ARTICLE_TABLE_HEADINGS_WIDTHS, "Match"),
+            displaycolumns=tuple(ARTICLE_TABLE_HEADINGS_WIDTHS),
             height=ARTICLE_TABLE_HEIGHT, show="headings")
         for heading, width in ARTICLE_TABLE_HEADINGS_WIDTHS.items():
-            self.treeview.heading(heading, text=heading)
+            self.treeview.heading(
+                heading, text=heading,
+                command=functools.partial(self.sort_by, heading))
             self.treeview.column(heading, width=width)
+        # The match column takes the place of the hidden detail columns.
+        self.treeview.heading("Match", text="Match")
+        self.treeview.column("Match", width=sum(
+            width for heading, width in ARTICLE_TABLE_HEADINGS_WIDTHS.items()
+            if heading not in SEARCH_TABLE_HEADINGS))
         self.scrollbar = tk.Scrollbar(
             self, orient="vertical", command=self.treeview.yview)
-        self.treeview.config(yscrollcommand=self.scrollbar.set)
+        self.treeview.config(yscrollcommand=self.on_scroll)
         self.treeview.bind("<<TreeviewSelect>>", lambda *_: self.view())
         self.treeview.grid(row=0, column=0)
         self.scrollbar.grid(row=0, column=1, sticky="ns")
-    
-    def display_articles(self, articles: list[Article]) -> None:
-        """Displays the given list of articles in the table."""
-        self.articles = articles
-        for article in self.articles:
-            date_time_published = (
-                article.date_time_published.strftime("%Y-%m-%dT%H:%M%z"))
-            date_time_fetched = (
-                article.date_time_fetched.strftime("%Y-%m-%dT%H:%M%z"))
-            table_record = (
-                article.id, article.heading, article.author_name,
-                date_time_published, date_time_fetched)
-            self.treeview.insert("", "end", values=table_record)
-    
+        self.sort_heading = DEFAULT_SORT_HEADING
+        self.descending = DEFAULT_SORT_DESCENDING
+        # Whether browsing (rather than displaying search results),
+        # the sort keys of the rows loaded in ascending order, and
+        # the sort key of each row by ID, and whether all rows are loaded.
+        self.browsing = False
+        self.keys: list[tuple] = []
+        self.row_keys: dict[str, tuple] = {}
+        self.exhausted = True
+        self.page_scheduled = False
+        self.update_headings()
+
+    @property
+    def sort(self) -> str:
+        return ARTICLE_TABLE_SORT_KEYS[self.sort_heading]
+
+    def update_headings(self) -> None:
+        """Marks the sort column heading with the sort direction."""
+        for heading in ARTICLE_TABLE_HEADINGS_WIDTHS:
+            marker = (
+                SORT_MARKERS[self.descending]
+                if heading == self.sort_heading else "")
+            self.treeview.heading(heading, text=heading + marker)
+
+    def sort_by(self, heading: str) -> None:
+        """
+        Sorts by the clicked column, reversing the order if already
+        sorted by it. Search results keep their ranking, the order
+        applying once browsing again.
+        """
+        if heading == self.sort_heading:
+            self.descending = not self.descending
+        else:
+            self.sort_heading = heading
+            self.descending = DEFAULT_SORT_DESCENDING
+        self.update_headings()
+        if self.browsing:
+            self.browse()
+
+    def browse(
+        self, first_page: list[ArticleSummary] = None,
+        order: tuple[str, bool] = None
+    ) -> None:
+        """
+        Displays saved articles in the sort order from the start, given
+        the first page if already loaded (in the given order).
+        """
+        self.clear()
+        self.browsing = True
+        self.exhausted = False
+        self.treeview.config(
+            displaycolumns=tuple(ARTICLE_TABLE_HEADINGS_WIDTHS))
+        if first_page is None or order != (self.sort, self.descending):
+            self.load_page()
+        else:
+            self.display_page(first_page)
+
+    def load_page(self) -> None:
+        """Loads and displays the page of rows after those displayed."""
+        self.page_scheduled = False
+        if not self.browsing or self.exhausted:
+            return
+        # The last row displayed is the greatest key if ascending.
+        after = None
+        if self.keys:
+            after = self.keys[0 if self.descending else -1]
+        try:
+            summaries = load_summary_page(
+                self.sort, self.descending, after, ARTICLE_PAGE_SIZE)
+        except Exception as e:
+            self.exhausted = True
+            messagebox.showerror(
+                "Error",
+                f"An error occurred whilst loading saved articles: {e}")
+            return
+        self.display_page(summaries)
+
+    def display_page(self, summaries: list[ArticleSummary]) -> None:
+        """Displays a page of summaries after the rows displayed."""
+        self.exhausted = len(summaries) < ARTICLE_PAGE_SIZE
+        for summary in summaries:
+            if not self.treeview.exists(str(summary.id)):
+                self.place_row(summary)
+
+    def on_scroll(self, first: str, last: str) -> None:
+        """
+        Updates the scrollbar, loading the next page once the view is
+        near the last row loaded (after the scroll is handled).
+        """
+        self.scrollbar.set(first, last)
+        rows_below = (1 - float(last)) * len(self.keys)
+        if (
+            self.browsing and not self.exhausted and not self.page_scheduled
+            and rows_below < ARTICLE_PRELOAD_ROWS
+        ):
+            self.page_scheduled = True
+            self.after_idle(self.load_page)
+
+    def display_articles(
+        self, articles: list[ArticleSummary], snippets: list[str]
+    ) -> None:
+        """
+        Displays the given list of article summaries (search results)
+        in the table, with the snippets of the search matches.
+        """
+        self.browsing = False
+        self.treeview.config(displaycolumns=SEARCH_TABLE_HEADINGS)
+        for article, snippet in zip(articles, snippets):
+            self.insert_row(article, "end", snippet)
+
+    def add_article(self, article: ArticleSummary) -> None:
+        """
+        Adds the row of an article whilst browsing, at its position in
+        the sort order. Articles after the rows loaded so far are left
+        to be loaded with their page, and articles already in the table
+        (saved whilst loading) are skipped.
+        """
+        iid = str(article.id)
+        if not self.browsing or self.treeview.exists(iid):
+            return
+        key = summary_sort_key(article, self.sort)
+        if self.keys and not self.exhausted and (
+            key < self.keys[0] if self.descending else key > self.keys[-1]
+        ):
+            return
+        self.place_row(article, key)
+
+    def place_row(self, article: ArticleSummary, key: tuple = None) -> None:
+        """Inserts the row of an article at its position in the order."""
+        if key is None:
+            key = summary_sort_key(article, self.sort)
+        position = bisect.bisect(self.keys, key)
+        self.keys.insert(position, key)
+        self.row_keys[str(article.id)] = key
+        if self.descending:
+            position = len(self.keys) - 1 - position
+        self.insert_row(article, position)
+
+    def insert_row(
+        self, article: ArticleSummary, index: int | str, snippet: str = None
+    ) -> None:
+        """Inserts a row for an article, keyed by article ID."""
+        date_time_published = (
+            article.date_time_published.strftime("%Y-%m-%dT%H:%M%z"))
+        date_time_fetched = (
+            article.date_time_fetched.strftime("%Y-%m-%dT%H:%M%z"))
+        table_record = (
+            article.id, article.heading, article.author_name,
+            date_time_published, date_time_fetched)
+        if snippet is not None:
+            table_record += (snippet,)
+        self.treeview.insert(
+            "", index, iid=str(article.id), values=table_record)
+
+    def remove_article(self, article_id: int) -> None:
+        """Removes the row of an article, if present."""
+        iid = str(article_id)
+        if self.treeview.exists(iid):
+            self.treeview.delete(iid)
+        key = self.row_keys.pop(iid, None)
+        if key is not None:
+            self.keys.pop(bisect.bisect_left(self.keys, key))
+
     def view(self) -> None:
-        """Opens the window for the selected article."""
+        """
+        Opens the selected article in the reader, selecting its tab
+        instead if already open.
+        """
         with suppress(IndexError):
-            index = self.treeview.index(self.treeview.selection()[0])
-            ArticleToplevel(
-                self.master.master.master, self.articles[index], True)
+            article_id = int(self.treeview.selection()[0])
+            root = self.winfo_toplevel()
+            if root.reader.select_saved(article_id):
+                return
+            try:
+                # Only the selected article is loaded in full.
+                article = load_article_by_id(article_id)
+            except Exception as e:
+                messagebox.showerror(
+                    "Error",
+                    f"An error occurred whilst loading the article: {e}")
+                return
+            root.render_article(article, True)
     
     def clear(self) -> None:
         """Clears the table."""
-        for row in self.treeview.get_children():
-            self.treeview.delete(row)
+        self.treeview.delete(*self.treeview.get_children())
+        self.keys.clear()
+        self.row_keys.clear()
+
+
+class StorageFrame(tk.Frame):
+    """
+    Displays the space used by the database, by each table and by the
+    largest saved articles, allowing these articles to be deleted and
+    free space to be returned to the system.
+    """
+
+    def __init__(self, master: ttk.Notebook) -> None:
+        super().__init__(master)
+        self.size_label = tk.Label(self, font=tnr(15))
+        self.tables_label = tk.Label(
+            self, font=tnr(11), **ARTICLE_TEXT_PARAMS)
+        self.treeview = ttk.Treeview(
+            self, columns=tuple(STORAGE_HEADINGS_WIDTHS),
+            height=ARTICLE_TABLE_HEIGHT, show="headings",
+            selectmode="browse")
+        for heading, width in STORAGE_HEADINGS_WIDTHS.items():
+            self.treeview.heading(heading, text=heading)
+            self.treeview.column(heading, width=width)
+        self.options_frame = tk.Frame(self)
+        self.refresh_button = ttk.Button(
+            self.options_frame, text="Refresh", width=15,
+            command=self.refresh)
+        self.delete_button = ttk.Button(
+            self.options_frame, text="Delete Selected", width=15,
+            command=self.delete)
+        self.reclaim_button = ttk.Button(
+            self.options_frame, text="Reclaim Free Space", width=20,
+            command=self.reclaim)
+        for column, widget in enumerate((
+            self.refresh_button, self.delete_button, self.reclaim_button
+        )):
+            widget.grid(row=0, column=column, padx=5, pady=5)
+        self.size_label.pack(padx=25, pady=(25, 5), anchor=tk.W)
+        self.tables_label.pack(padx=25, pady=5, anchor=tk.W)
+        self.treeview.pack(padx=25, pady=5)
+        self.options_frame.pack(padx=25, pady=(5, 25))
+        # Storage is measured in the background, as the largest articles
+        # are found by reading every article. It is measured upon first
+        # showing the frame, then upon request.
+        self.loading = False
+        self.loaded = False
+        self.loaded_storage = queue.Queue()
+        self.bind("<Map>", lambda *_: self.on_map())
+
+    def on_map(self) -> None:
+        if not self.loaded:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Measures the storage used in the background, then displays it."""
+        if self.loading:
+            return
+        self.loading = self.loaded = True
+        self.size_label.config(text="Measuring storage...")
+        threading.Thread(target=self.load_storage, daemon=True).start()
+        self.poll_storage()
+
+    def load_storage(self) -> None:
+        """Background thread - measures the storage used."""
+        try:
+            self.loaded_storage.put(
+                (database_size(), table_storage(), article_storage()))
+        except Exception as e:
+            self.loaded_storage.put(e)
+
+    def poll_storage(self) -> None:
+        if self.loaded_storage.empty():
+            self.after(LOAD_POLL_INTERVAL_MS, self.poll_storage)
+            return
+        self.loading = False
+        self.display_storage(self.loaded_storage.get())
+
+    def display_storage(
+        self, loaded: tuple[
+            tuple[int, int], dict[str, int],
+            list[tuple[ArticleSummary, int, int]]] | Exception
+    ) -> None:
+        """Displays the storage measured."""
+        if isinstance(loaded, Exception):
+            self.size_label.config(text="")
+            messagebox.showerror(
+                "Error",
+                f"An error occurred whilst measuring storage: {loaded}")
+            return
+        (size, free), tables, articles = loaded
+        self.size_label.config(text=(
+            f"Database: {size / 1024 ** 2:.1f} MiB, of which "
+            f"{free / 1024 ** 2:.1f} MiB free"))
+        # Not all SQLite libraries can measure the space used by tables.
+        self.tables_label.config(text=" | ".join(
+            f"{table}: {table_size / 1024 ** 2:.1f} MiB"
+            for table, table_size in tables.items()))
+        self.treeview.delete(*self.treeview.get_children())
+        for summary, text_size, image_size in articles:
+            self.treeview.insert(
+                "", "end", iid=str(summary.id), values=(
+                    summary.id, summary.heading, *(
+                        f"{article_size / 1024:,.1f}" for article_size in (
+                            text_size, image_size,
+                            text_size + image_size))))
+
+    def delete(self) -> None:
+        """Deletes the selected article, closing its tab if open."""
+        with suppress(IndexError):
+            article_id = int(self.treeview.selection()[0])
+            try:
+                delete_article_by_id(article_id)
+            except Exception as e:
+                messagebox.showerror(
+                    "Error",
+                    f"An error occurred whilst deleting the article: {e}")
+                return
+            self.treeview.delete(str(article_id))
+            self.winfo_toplevel().close_saved(article_id)
+
+    def reclaim(self) -> None:
+        """Returns all free space to the system in the background."""
+        self.winfo_toplevel().maintenance.wake(reclaim_all=True)
+        messagebox.showinfo(
+            "Reclaiming",
+            "Free space is being returned to the system in the background. "
+            "Refresh to see the new database size.")
+
+
+class DiagnosticsFrame(tk.Frame):
+    """
+    Displays the rolling timing statistics of each stage and the
+    counters, allowing them to be logged or saved as JSON, and the
+    next load to be profiled.
+    """
+
+    def __init__(self, master: ttk.Notebook) -> None:
+        super().__init__(master)
+        self.treeview = ttk.Treeview(
+            self, columns=tuple(DIAGNOSTICS_HEADINGS_WIDTHS),
+            height=ARTICLE_TABLE_HEIGHT, show="headings")
+        for heading, width in DIAGNOSTICS_HEADINGS_WIDTHS.items():
+            self.treeview.heading(heading, text=heading)
+            self.treeview.column(heading, width=width)
+        self.counters_label = tk.Label(
+            self, font=tnr(11), **ARTICLE_TEXT_PARAMS)
+        self.options_frame = tk.Frame(self)
+        self._profile = tk.BooleanVar(value=False)
+        self.profile_checkbutton = tk.Checkbutton(
+            self.options_frame, text="Profile next load",
+            variable=self._profile, font=tnr(15))
+        self.log_button = ttk.Button(
+            self.options_frame, text="Start JSON Log", width=15,
+            command=self.toggle_log)
+        self.save_button = ttk.Button(
+            self.options_frame, text="Save JSON", width=15,
+            command=self.save)
+        self.reset_button = ttk.Button(
+            self.options_frame, text="Reset", width=15,
+            command=self.reset)
+        for column, widget in enumerate((
+            self.profile_checkbutton, self.log_button,
+            self.save_button, self.reset_button
+        )):
+            widget.grid(row=0, column=column, padx=5, pady=5)
+        self.treeview.pack(padx=25, pady=(25, 5))
+        self.counters_label.pack(padx=25, pady=5, anchor=tk.W)
+        self.options_frame.pack(padx=25, pady=(5, 25))
+        self.refresh()
+
+    def take_profile_request(self) -> bool:
+        """Returns whether to profile the next load, clearing the request."""
+        profiled = self._profile.get()
+        self._profile.set(False)
+        return profiled
+
+    def refresh(self) -> None:
+        """Displays the latest statistics, whilst the frame is visible."""
+        if self.winfo_ismapped():
+            snapshot = metrics.snapshot()
+            self.treeview.delete(*self.treeview.get_children())
+            for name, stage in snapshot["stages"].items():
+                self.treeview.insert("", "end", values=(
+                    name, stage["count"], *(
+                        f"{stage[key]:.1f}" for key in (
+                            "last_ms", "mean_ms", "p95_ms", "max_ms",
+                            "total_ms"))))
+            self.counters_label.config(text=" | ".join(
+                f"{name}: {value:,}"
+                for name, value in snapshot["counters"].items()))
+        self.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def toggle_log(self) -> None:
+        """Starts logging each span to a JSON lines file, or stops."""
+        if metrics.logging:
+            metrics.disable_log()
+            self.log_button.config(text="Start JSON Log")
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.winfo_toplevel(), defaultextension=".jsonl",
+            filetypes=(("JSON Lines", "*.jsonl"),), initialfile="metrics")
+        if not path:
+            return
+        metrics.enable_log(path)
+        self.log_button.config(text="Stop JSON Log")
+
+    def save(self) -> None:
+        """Saves the current statistics and counters as JSON."""
+        path = filedialog.asksaveasfilename(
+            parent=self.winfo_toplevel(), defaultextension=".json",
+            filetypes=(("JSON", "*.json"),), initialfile="metrics")
+        if path:
+            with open(path, "w", encoding="utf8") as file:
+                json.dump(metrics.snapshot(), file, indent=4)
+
+    def reset(self) -> None:
+        metrics.reset()
+        self.treeview.delete(*self.treeview.get_children())
+        self.counters_label.config(text="")
 
 
 def main() -> None:
     """Main procedure of the program."""
     root = TelegraphPaywallBypass()
     root.mainloop()
+    close_connections()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+"""
+Background database upkeep - free pages left by deleted and rewritten
+articles are returned to the system a few at a time, so the database
+file shrinks without stalling the GUI with a full vacuum.
+"""
+import sqlite3
+import threading
+import time
+
+from data import (
+    DELETED, UPDATED, VACUUM_MIN_FREE_PAGES, add_listener, close_connections,
+    free_pages, reclaim_free_pages)
+from metrics import count
+from utils import MAINTENANCE_INTERVAL, VACUUM_STEP_DELAY
+
+
+class Maintenance:
+    """
+    Reclaims free pages on a background thread, periodically and soon
+    after articles are deleted or updated. Pages are reclaimed in small
+    steps with pauses between them, so saves and loads are barely held
+    up, leaving some free pages for reuse by articles saved later.
+    """
+
+    def __init__(self) -> None:
+        self._wake_event = threading.Event()
+        self._reclaim_all = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        add_listener(self._on_change)
+        self._thread.start()
+
+    def wake(self, reclaim_all: bool = False) -> None:
+        """
+        Checks for free pages now rather than at the next interval,
+        returning all of them to the system if requested.
+        """
+        self._reclaim_all = reclaim_all
+        self._wake_event.set()
+
+    def _on_change(self, change: str, _: int) -> None:
+        if change in (DELETED, UPDATED):
+            self.wake()
+
+    def _run(self) -> None:
+        """Worker thread - reclaims free pages forever."""
+        try:
+            while True:
+                self._wake_event.wait(MAINTENANCE_INTERVAL)
+                self._wake_event.clear()
+                minimum = 0 if self._reclaim_all else VACUUM_MIN_FREE_PAGES
+                self._reclaim_all = False
+                self._reclaim(minimum)
+        finally:
+            close_connections()
+
+    def _reclaim(self, minimum: int) -> None:
+        """Reclaims free pages in steps until at most the minimum left."""
+        try:
+            left = free_pages()
+            while left > minimum:
+                before = left
+                left = reclaim_free_pages()
+                count("store.pages_reclaimed", before - left)
+                if left >= before:
+                    # Databases without incremental vacuum reclaim nothing.
+                    break
+                # Leave the database to other threads for a moment.
+                time.sleep(VACUUM_STEP_DELAY)
+        except sqlite3.OperationalError:
+            # Busy for too long, such as during a long import - the
+            # remaining pages are reclaimed upon the next check.
+            pass
@@ -0,0 +1,159 @@
+"""
+Instrumentation - named timing spans and counters with rolling
+statistics per stage, optional JSON lines logging, and opt-in
+profiling (cProfile and tracemalloc) of a single operation.
+"""
+import io
+import json
+import pathlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+from utils import METRICS_WINDOW, PROFILE_TOP_ENTRIES
+
+
+class Stage:
+    """Rolling statistics of the most recent durations of a stage."""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        """Returns the statistics (in milliseconds) as a dictionary."""
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "last_ms": self.recent[-1] * 1000,
+            "mean_ms": sum(recent) / len(recent) * 1000,
+            "p95_ms": recent[min(
+                round(len(recent) * 0.95), len(recent) - 1)] * 1000,
+            "max_ms": recent[-1] * 1000,
+        }
+
+
+class Metrics:
+    """
+    Timing statistics and counters by name, safe to update from
+    any thread. Each span is also logged as a JSON line if enabled.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: dict[str, Stage] = {}
+        self._counters: dict[str, int] = {}
+        self._log = None
+
+    @contextmanager
+    def span(self, name: str, **fields) -> Iterator[None]:
+        """
+        Times the block as the named stage. Any fields (such as sizes)
+        are included in the log entry of the span.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    def record(self, name: str, seconds: float, **fields) -> None:
+        """Records a duration of the named stage."""
+        with self._lock:
+            self._stages.setdefault(name, Stage()).add(seconds)
+            if self._log is not None:
+                self._log.write(json.dumps({
+                    "time": time.time(), "span": name,
+                    "ms": seconds * 1000, **fields}) + "\n")
+                self._log.flush()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds to the named counter, such as bytes or rows."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> dict:
+        """Returns the statistics of each stage, and the counters."""
+        with self._lock:
+            return {
+                "stages": {
+                    name: stage.summary()
+                    for name, stage in sorted(self._stages.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def enable_log(self, path: pathlib.Path) -> None:
+        """Appends each span to the file as a JSON line from now on."""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, "a", encoding="utf8")
+
+    def disable_log(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    @property
+    def logging(self) -> bool:
+        return self._log is not None
+
+
+# Metrics of the whole program.
+metrics = Metrics()
+span = metrics.span
+count = metrics.count
+
+
+@contextmanager
+def profile(path: pathlib.Path) -> Iterator[None]:
+    """
+    Profiles the block, saving the cProfile statistics to the path and
+    a report of the top functions and memory allocations alongside it
+    (same name, .txt). Only the calling thread is profiled, but memory
+    allocations of all threads are traced.
+    """
+    # Imported upon first use, keeping startup fast.
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        memory = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        with io.StringIO() as report:
+            pstats.Stats(profiler, stream=report).sort_stats(
+                "cumulative").print_stats(PROFILE_TOP_ENTRIES)
+            report.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+            for statistic in memory.statistics("lineno")[:PROFILE_TOP_ENTRIES]:
+                report.write(f"{statistic}\n")
+            path.with_suffix(".txt").write_text(
+                report.getvalue(), encoding="utf8")
@@ -0,0 +1,201 @@
+"""Networking - shared HTTP sessions and concurrent image downloading."""
+import codecs
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
+from typing import TYPE_CHECKING, Callable
+
+import requests as rq
+from requests.adapters import HTTPAdapter
+
+from cache import ResponseCache
+from images import image_size, make_display_variant
+from metrics import count, span
+from sections import extract_sections
+from utils import (
+    HEADERS, IMAGE_FETCH_WORKERS, IMAGE_REQUEST_TIMEOUT, REQUEST_TIMEOUT,
+    STREAM_CHUNK_SIZE)
+
+if TYPE_CHECKING:
+    from article import Image
+
+
+class LoadCancelled(Exception):
+    """Raised when a load is cancelled part way through."""
+
+
+def create_session(pool_size: int = IMAGE_FETCH_WORKERS) -> rq.Session:
+    """
+    Returns a session whose connections are reused across requests,
+    allowing up to the given number of connections per host at once.
+    """
+    session = rq.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get(
+    session: rq.Session, url: str, timeout: float,
+    cache: ResponseCache = None, key: str = None,
+    read: Callable[[rq.Response], bytes] = None
+) -> tuple[int, bytes]:
+    """
+    Returns the status code and body of a GET request,
+    through the response cache if given. If given, the read function
+    returns the body from the streamed response (see ResponseCache.fetch).
+    """
+    if cache is not None:
+        return cache.fetch(session, url, timeout, key, read)
+    if read is None:
+        response = session.get(url, timeout=timeout)
+        return response.status_code, response.content
+    with session.get(url, timeout=timeout, stream=True) as response:
+        return response.status_code, read(response)
+
+
+def fetch_page(
+    session: rq.Session, url: str, cache: ResponseCache = None
+) -> bytes:
+    """Downloads an article page, raising an error upon failure."""
+    with span("fetch.page"):
+        status_code, content = get(session, url, REQUEST_TIMEOUT, cache)
+    if status_code >= 400:
+        raise RuntimeError(f"Status code {status_code}")
+    count("fetch.page_bytes", len(content))
+    return content
+
+
+def fetch_page_sections(
+    session: rq.Session, url: str, cache: ResponseCache = None
+) -> bytes:
+    """
+    Streams an article page, stopping the download once the sections
+    articles are parsed from are complete. Returns a minimal document
+    of those sections (which is cached in place of the page), or the
+    full page should any section be missing or incomplete, raising
+    an error upon failure.
+    """
+    with span("fetch.page"):
+        status_code, content = get(
+            session, url, REQUEST_TIMEOUT, cache, f"{url} sections",
+            read_sections)
+    if status_code >= 400:
+        raise RuntimeError(f"Status code {status_code}")
+    return content
+
+
+def read_sections(response: rq.Response) -> bytes:
+    """
+    Reads a streamed page until the article sections are complete.
+    Should any section be missing or incomplete, the whole page has
+    been read, and is returned as it is to be parsed in full.
+    """
+    if response.status_code >= 400:
+        return b""
+    decoder = codecs.getincrementaldecoder(
+        response_charset(response))(errors="replace")
+    page = []
+
+    def chunks():
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            count("fetch.page_bytes", len(chunk))
+            page.append(chunk)
+            yield decoder.decode(chunk)
+
+    sections = extract_sections(chunks())
+    if sections is None:
+        count("fetch.sections_fallbacks")
+        return b"".join(page)
+    return sections.encode()
+
+
+def response_charset(response: rq.Response) -> str:
+    """
+    Returns the character set given in the response headers, defaulting
+    to UTF-8 (rather than ISO-8859-1, as requests does for HTML).
+    """
+    match = re.search(
+        r"charset=[\"']?([\w.:-]+)", response.headers.get("Content-Type", ""))
+    if match is not None:
+        with suppress(LookupError):
+            return codecs.lookup(match.group(1)).name
+    return "utf-8"
+
+
+def fetch_image(
+    session: rq.Session, url: str, timeout: float,
+    cache: ResponseCache = None
+) -> bytes:
+    """Downloads a single image, raising an error upon failure."""
+    status_code, content = get(session, url, timeout, cache)
+    if status_code >= 400:
+        raise RuntimeError(f"Image fetch status code: {status_code}")
+    return content
+
+
+def fetch_image_and_variant(
+    session: rq.Session, url: str, timeout: float,
+    cache: ResponseCache = None
+) -> tuple[bytes, bytes | None, tuple[int, int] | None]:
+    """
+    Downloads an image and creates its display variant, if needed.
+    The size of the image in pixels is also returned, if readable.
+    """
+    data = fetch_image(session, url, timeout, cache)
+    count("fetch.image_bytes", len(data))
+    with span("fetch.image_variant"):
+        return data, make_display_variant(data), image_size(data)
+
+
+def download_images(
+    images: list["Image"], session: rq.Session = None,
+    max_workers: int = IMAGE_FETCH_WORKERS,
+    timeout: float = IMAGE_REQUEST_TIMEOUT,
+    progress: Callable[[int, int], None] = None,
+    cancel_event: threading.Event = None,
+    cache: ResponseCache = None,
+    on_image: Callable[["Image"], None] = None
+) -> None:
+    """
+    Downloads the data of each image by URL using a bounded thread pool,
+    setting it in place so the images remain in document order.
+    Display variants are also created by the pool, off the calling thread.
+    Progress is reported as (images downloaded, total images), after
+    passing each image to the image function (if any) as it arrives.
+    LoadCancelled is raised if the cancel event is set part way through.
+    """
+    if not images:
+        return
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    executor = ThreadPoolExecutor(min(max_workers, len(images)))
+    count("fetch.images", len(images))
+    try:
+        with span("fetch.images", images=len(images)):
+            futures = {
+                executor.submit(
+                    fetch_image_and_variant, session, image.url, timeout,
+                    cache
+                ): image
+                for image in images}
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LoadCancelled
+                image = futures[future]
+                image.data, image.display_data, size = future.result()
+                if size is not None:
+                    image.width, image.height = size
+                if on_image is not None:
+                    on_image(image)
+                if progress is not None:
+                    progress(done, len(futures))
+    finally:
+        # Upon failure, cancel the downloads yet to start.
+        executor.shutdown(cancel_futures=True)
+        if own_session:
+            session.close()
@@ -0,0 +1,146 @@
+"""
+Streaming extraction of the page sections articles are parsed from -
+the JSON-LD schema script, the description meta tag and the article
+element - so the rest of the page need not be downloaded or parsed.
+"""
+from html.parser import HTMLParser
+from typing import Iterable
+
+
+class SectionsComplete(Exception):
+    """Raised by the scanner to stop scanning once all sections are found."""
+
+
+class SectionScanner(HTMLParser):
+    """
+    Incremental scanner keeping the markup of the first of each
+    section, fed text as it arrives. The markup is reproduced as
+    it appears in the page, so parsing it gives the same article.
+    Scanning stops once all sections are found, so text fed after
+    the end of the last section is ignored.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.script: str = None
+        self.meta: str = None
+        self.article: str = None
+        # Markup of the script and article being captured, if any.
+        # The script may be within the article, so both are captured.
+        self._script_parts: list[str] = None
+        self._article_parts: list[str] = None
+        self._article_depth = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether all sections have been found."""
+        return (
+            self.script is not None and self.meta is not None
+            and self.article is not None)
+
+    def document(self) -> str:
+        """Returns a minimal HTML document of the sections found."""
+        return (
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f"{self.meta or ''}{self.script or ''}</head>"
+            f"<body>{self.article or ''}</body></html>")
+
+    def feed(self, data: str) -> None:
+        if self.complete:
+            return
+        try:
+            super().feed(data)
+        except SectionsComplete:
+            pass
+
+    def handle_starttag(self, tag: str, attrs: list[tuple]) -> None:
+        markup = self.get_starttag_text()
+        self._capture(markup)
+        attributes = dict(attrs)
+        if tag == "article" and self._article_parts is not None:
+            self._article_depth += 1
+        elif tag == "article" and self.article is None:
+            self._article_depth = 1
+            self._article_parts = [markup]
+        elif (
+            tag == "script" and self.script is None
+            and attributes.get("data-js") == "main-json-schema"
+        ):
+            self._script_parts = [markup]
+        else:
+            self._check_meta(tag, attributes, markup)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple]) -> None:
+        markup = self.get_starttag_text()
+        self._capture(markup)
+        self._check_meta(tag, dict(attrs), markup)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._capture(f"</{tag}>")
+        if tag == "script" and self._script_parts is not None:
+            self.script = "".join(self._script_parts)
+            self._script_parts = None
+        elif tag == "article" and self._article_parts is not None:
+            self._article_depth -= 1
+            if not self._article_depth:
+                self.article = "".join(self._article_parts)
+                self._article_parts = None
+        self._check_complete()
+
+    def handle_data(self, data: str) -> None:
+        self._capture(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self._capture(f"&{name};")
+
+    def handle_charref(self, name: str) -> None:
+        self._capture(f"&#{name};")
+
+    def handle_comment(self, data: str) -> None:
+        self._capture(f"<!--{data}-->")
+
+    def handle_decl(self, decl: str) -> None:
+        self._capture(f"<!{decl}>")
+
+    def unknown_decl(self, data: str) -> None:
+        # Marked sections - conditional comments end with "]>", others
+        # (such as CDATA sections) with "]]>".
+        conditional = data.lower().startswith(("if", "else", "endif"))
+        self._capture(f"<![{data}{']>' if conditional else ']]>'}")
+
+    def handle_pi(self, data: str) -> None:
+        self._capture(f"<?{data}>")
+
+    def _capture(self, markup: str) -> None:
+        if self._script_parts is not None:
+            self._script_parts.append(markup)
+        if self._article_parts is not None:
+            self._article_parts.append(markup)
+
+    def _check_meta(self, tag: str, attributes: dict, markup: str) -> None:
+        if (
+            tag == "meta" and self.meta is None
+            and attributes.get("property") == "og:description"
+        ):
+            self.meta = markup
+            self._check_complete()
+
+    def _check_complete(self) -> None:
+        if self.complete:
+            raise SectionsComplete
+
+
+def extract_sections(chunks: Iterable[str]) -> str | None:
+    """
+    Scans the page text chunk by chunk, returning a minimal document of
+    the sections once all are found, without consuming further chunks.
+    None is returned if any section is missing or never ends (such as
+    an article element closed implicitly), in which case all chunks
+    have been consumed and the full page must be parsed instead.
+    """
+    scanner = SectionScanner()
+    for chunk in chunks:
+        scanner.feed(chunk)
+        if scanner.complete:
+            return scanner.document()
+    return None
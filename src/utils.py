@@ -1,12 +1,69 @@
-"""GUI utilities."""
+"""
+Program settings and shared utilities - the data folders, network,
+response cache, storage, metrics and parsing settings, GUI constants
+and fonts, URL normalisation and a size-bounded LRU cache.
+"""
+import importlib.util
+import pathlib
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
 
 
+DATA_FOLDER = pathlib.Path(__file__).parent.parent / "data"
+CACHE_FOLDER = DATA_FOLDER / "cache"
+# Maximum total size (bytes) of cached responses, and the number of seconds
+# cached responses are used before being revalidated.
+CACHE_MAX_SIZE = 512 * 1024 * 1024
+CACHE_TTL = 60 * 60
 RED = "red"
 DOMAIN = "telegraph.co.uk"
 REQUEST_TIMEOUT = 5
+# Size (bytes) of the chunks article pages are streamed in.
+STREAM_CHUNK_SIZE = 16 * 1024
+IMAGE_BASE_URL = f"https://{DOMAIN}"
+# Maximum number of images downloaded at once, and the timeout of each.
+IMAGE_FETCH_WORKERS = 8
+IMAGE_REQUEST_TIMEOUT = REQUEST_TIMEOUT
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"}
 WRAPLENGTH = 1150
 ARTICLE_TEXT_PARAMS = {"wraplength": WRAPLENGTH, "justify": "left"}
+# Quality (1-95) JPEG/WebP images are re-encoded at when saved, if that
+# saves space, or None to save images as downloaded.
+IMAGE_SAVE_QUALITY = None
+# Memory budget (bytes) of decoded images kept for quick redisplay.
+IMAGE_CACHE_BUDGET = 256 * 1024 * 1024
+# Memory budget (bytes) of built article views kept in the reader tabs.
+ARTICLE_VIEW_BUDGET = 256 * 1024 * 1024
+# Seconds between checks for free database pages to return to the
+# system, and between each step of returning them.
+MAINTENANCE_INTERVAL = 10 * 60
+VACUUM_STEP_DELAY = 0.05
+# Number of recent durations of each stage kept for statistics.
+METRICS_WINDOW = 100
+# Profiles of single loads, and the number of entries in their reports.
+PROFILE_FOLDER = DATA_FOLDER / "profiles"
+PROFILE_TOP_ENTRIES = 25
+# Tree builder articles are parsed with - lxml if installed, as it is
+# faster. The articles extracted under each installed tree builder are
+# checked to be identical (see benchmarks/extract.py).
+HTML_PARSER = (
+    "lxml" if importlib.util.find_spec("lxml") is not None
+    else "html.parser")
+
+
+def normalise_url(url: str) -> str:
+    """
+    Normalises an article URL, removing the protocol, www, query and
+    fragment if specified, so each article has a single URL.
+    """
+    url = url.strip().lower()
+    if url.startswith("http://"):
+        url = url.removeprefix("http://")
+    elif url.startswith("https://"):
+        url = url.removeprefix("https://")
+    if url.startswith("www."):
+        url = url.removeprefix("www.")
+    return url.split("#")[0].split("?")[0]
 
 
 def tnr(size: int, bold: bool = False, italic: bool = False) -> tuple:
@@ -17,3 +74,62 @@ def tnr(size: int, bold: bool = False, italic: bool = False) -> tuple:
     if italic:
         font += ("italic",)
     return font
+
+
+class LruCache:
+    """
+    Least recently used cache, evicting the least recently used
+    values once the total size of the values exceeds the budget.
+    The eviction function, if any, is called with each evicted
+    key and value.
+    """
+
+    def __init__(
+        self, budget: int, size_of: Callable[[Any], int],
+        on_evict: Callable[[Hashable, Any], None] = None
+    ) -> None:
+        self.budget = budget
+        self.size_of = size_of
+        self.on_evict = on_evict
+        self.size = 0
+        self._values = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._values
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value of a key, marking it as recently used."""
+        if key not in self._values:
+            return default
+        self._values.move_to_end(key)
+        return self._values[key][0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Adds or replaces a value, evicting values over budget."""
+        self.pop(key)
+        size = self.size_of(value)
+        self._values[key] = (value, size)
+        self.size += size
+        # Always keep the newest value, even if over budget alone.
+        while self.size > self.budget and len(self._values) > 1:
+            evicted_key, (evicted, evicted_size) = self._values.popitem(
+                last=False)
+            self.size -= evicted_size
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Removes a key, returning its value."""
+        if key not in self._values:
+            return default
+        value, size = self._values.pop(key)
+        self.size -= size
+        return value
+
+    def clear(self) -> None:
+        """Removes all values."""
+        self._values.clear()
+        self.size = 0
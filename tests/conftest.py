@@ -0,0 +1,23 @@
+"""
+Test setup - the program modules and the benchmark fixtures (generated
+pages, synthetic articles and the stand-in server) are imported directly.
+"""
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+# After the program modules, as some benchmarks share their names.
+sys.path.append(str(ROOT / "benchmarks"))
+
+
+@pytest.fixture
+def database(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """Points the program at an empty database, returning the module."""
+    import data
+
+    monkeypatch.setattr(data, "DATABASE", tmp_path / "articles.db")
+    yield data
+    data.close_connections()
@@ -0,0 +1,49 @@
+"""Response caching and revalidation against the local stand-in server."""
+import pathlib
+
+from cache import ResponseCache
+from metrics import metrics
+from network import create_session
+from server import StandInServer
+
+PAGE = b"<html><body>Page</body></html>"
+
+
+def test_serves_fresh_responses_from_disk(tmp_path: pathlib.Path) -> None:
+    cache = ResponseCache(tmp_path)
+    with StandInServer({"page": PAGE}) as server, create_session() as session:
+        url = server.page_url("page")
+        assert cache.fetch(session, url, 5) == (200, PAGE)
+        assert cache.fetch(session, url, 5) == (200, PAGE)
+    assert server.full_responses == 1
+    assert (cache.stats.misses, cache.stats.hits) == (1, 1)
+
+
+def test_revalidates_stale_responses(tmp_path: pathlib.Path) -> None:
+    metrics.reset()
+    # Every response is stale at once.
+    cache = ResponseCache(tmp_path, ttl=0)
+    with StandInServer({"page": PAGE}) as server, create_session() as session:
+        url = server.page_url("page")
+        assert cache.fetch(session, url, 5) == (200, PAGE)
+        assert cache.fetch(session, url, 5) == (200, PAGE)
+        # Changed, so downloaded in full again.
+        server.pages["page"] = PAGE.replace(b"Page", b"Changed")
+        assert cache.fetch(session, url, 5) == (
+            200, server.pages["page"])
+    assert (server.full_responses, server.not_modified_responses) == (2, 1)
+    assert (cache.stats.misses, cache.stats.revalidated) == (2, 1)
+    counters = metrics.snapshot()["counters"]
+    assert counters["cache.revalidated"] == 1
+    assert counters["cache.misses"] == 2
+    assert counters["cache.bytes_served"] == len(PAGE)
+
+
+def test_revalidates_evicted_body_in_full(tmp_path: pathlib.Path) -> None:
+    cache = ResponseCache(tmp_path, ttl=0)
+    with StandInServer({"page": PAGE}) as server, create_session() as session:
+        url = server.page_url("page")
+        cache.fetch(session, url, 5)
+        cache.path(url).unlink()
+        assert cache.fetch(session, url, 5) == (200, PAGE)
+    assert server.full_responses == 2
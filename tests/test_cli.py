@@ -0,0 +1,70 @@
+"""Importing folders of saved article pages."""
+import os
+import pathlib
+
+import pytest
+
+from cli import import_folder
+from fixtures import PAGE_SIZES, make_page
+
+CANONICAL_LINK = (
+    b'<link rel="canonical" '
+    b'href="https://www.telegraph.co.uk/news/2024/01/01/article/">')
+
+
+def write_page(path: pathlib.Path, page: bytes, modified_time: int) -> None:
+    path.write_bytes(page)
+    os.utime(path, (modified_time, modified_time))
+
+
+def summaries(data) -> list[tuple[int, str]]:
+    return [
+        (summary.id, summary.heading)
+        for summary in data.load_article_summaries()]
+
+
+@pytest.mark.parametrize("canonical", (False, True))
+def test_reimport_modified_file(
+    database, tmp_path: pathlib.Path, canonical: bool
+) -> None:
+    folder = tmp_path / "pages"
+    folder.mkdir()
+    small = make_page("small", PAGE_SIZES["small"])
+    if canonical:
+        small = small.replace(b"<head>", b"<head>" + CANONICAL_LINK)
+    write_page(folder / "medium.html", make_page(
+        "medium", PAGE_SIZES["medium"]), 1_700_000_000)
+    write_page(folder / "small.html", small, 1_700_000_000)
+    assert import_folder(folder, 1, 10, False) == 0
+    before = summaries(database)
+    assert len(before) == 2
+
+    # Unchanged files are skipped, and changed files replace their article.
+    write_page(folder / "small.html", small.replace(
+        b"Benchmark article: small", b"Corrected heading"), 1_700_000_100)
+    assert import_folder(folder, 1, 10, False) == 0
+    after = summaries(database)
+    assert len(after) == 2
+    small_id = next(
+        article_id for article_id, heading in before
+        if heading == "Benchmark article: small")
+    assert (small_id, "Corrected heading") in after
+    article = database.load_article_by_id(small_id)
+    if canonical:
+        assert article.url == "telegraph.co.uk/news/2024/01/01/article/"
+    else:
+        assert article.url is None
+
+
+def test_moved_file_with_canonical_url(
+    database, tmp_path: pathlib.Path
+) -> None:
+    folder = tmp_path / "pages"
+    folder.mkdir()
+    page = make_page("small", PAGE_SIZES["small"]).replace(
+        b"<head>", b"<head>" + CANONICAL_LINK)
+    write_page(folder / "old.html", page, 1_700_000_000)
+    import_folder(folder, 1, 10, False)
+    (folder / "old.html").rename(folder / "new.html")
+    import_folder(folder, 1, 10, False)
+    assert len(summaries(database)) == 1
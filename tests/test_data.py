@@ -0,0 +1,398 @@
+"""Saving, updating and deleting articles, and migrating old databases."""
+import datetime as dt
+import io
+import sqlite3
+
+import pytest
+from PIL import Image as PilImage
+
+from article import Article, Image, Text
+from storage import make_article
+
+OLD_SCHEMA = """
+CREATE TABLE articles(
+    article_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    heading TEXT, description TEXT, author_name TEXT,
+    published_timestamp INTEGER, fetched_timestamp INTEGER
+);
+CREATE TABLE texts(
+    text_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER, is_subheading INTEGER,
+    contents TEXT, position INTEGER,
+    FOREIGN KEY (article_id) REFERENCES articles(article_id)
+);
+CREATE TABLE images(
+    image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER, data BLOB, caption TEXT,
+    credits TEXT, position INTEGER,
+    FOREIGN KEY (article_id) REFERENCES articles(article_id)
+);
+CREATE TABLE keywords(
+    keyword_id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT
+);
+CREATE TABLE articles_keywords(
+    article_id INTEGER, keyword_id INTEGER,
+    PRIMARY KEY (article_id, keyword_id)
+);
+"""
+LONG_TEXT = "A paragraph long enough to be stored compressed. " * 5
+
+
+def make_old_database(data) -> None:
+    """
+    Writes a database of the original schema, with records left behind
+    by a deleted article (ID 3) and a duplicated keyword.
+    """
+    connection = sqlite3.connect(data.DATABASE)
+    connection.executescript(OLD_SCHEMA)
+    for article_id in (1, 2):
+        connection.execute(
+            "INSERT INTO articles VALUES(?, ?, 'Description', 'Author', "
+            "1704110400, 1717243200)", (article_id, f"Article {article_id}"))
+        connection.executemany(
+            "INSERT INTO texts VALUES(NULL, ?, ?, ?, ?)", (
+                (article_id, 1, "Subheading", 0),
+                (article_id, 0, LONG_TEXT, 1)))
+        # The first image is shared by both articles.
+        connection.executemany(
+            "INSERT INTO images VALUES(NULL, ?, ?, 'Caption', 'Credits', ?)",
+            ((article_id, b"shared", 2),
+                (article_id, b"own %d" % article_id, 3)))
+    connection.execute(
+        "INSERT INTO texts VALUES(NULL, 3, 0, 'Left behind', 0)")
+    connection.execute(
+        "INSERT INTO images VALUES(NULL, 3, ?, NULL, NULL, 1)",
+        (b"left behind",))
+    connection.executemany(
+        "INSERT INTO keywords VALUES(?, ?)",
+        ((1, "Politics"), (2, "Politics"), (3, "Unused")))
+    connection.executemany(
+        "INSERT INTO articles_keywords VALUES(?, ?)", ((1, 1), (2, 2)))
+    connection.commit()
+    connection.close()
+
+
+def ref_counts(data) -> dict[bytes, int]:
+    """Returns the reference count of each stored image, by its data."""
+    return dict(data.get_connection().execute(
+        "SELECT data, ref_count FROM image_blobs").fetchall())
+
+
+def check_migrated(database) -> None:
+    """Checks the database written by make_old_database was migrated."""
+    connection = database.get_connection()
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == (
+        database.SCHEMA_VERSION)
+    # Incremental auto-vacuum.
+    assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    article = database.load_article_by_id(1)
+    assert article.elements[:2] == [
+        Text("Subheading", True), Text(LONG_TEXT, False)]
+    assert [image.data for image in article.images] == [b"shared", b"own 1"]
+    assert article.keywords == ["Politics"]
+    # Records of the deleted article are gone, and duplicates merged.
+    assert ref_counts(database) == {b"shared": 2, b"own 1": 1, b"own 2": 1}
+    assert connection.execute(
+        "SELECT keyword FROM keywords").fetchall() == [("Politics",)]
+    assert connection.execute(
+        "SELECT COUNT(*) FROM texts WHERE article_id = 3").fetchone() == (0,)
+    # Long texts are compressed.
+    assert connection.execute(
+        "SELECT COUNT(*) FROM texts WHERE typeof(contents) = 'blob'"
+    ).fetchone() == (2,)
+    assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+def test_migrates_old_database(database) -> None:
+    make_old_database(database)
+    check_migrated(database)
+
+
+def test_interrupted_migration_resumes(database, monkeypatch) -> None:
+    make_old_database(database)
+    store_image = database.store_image
+    stored = []
+
+    def failing_store_image(*args) -> str:
+        if len(stored) == 2:
+            raise RuntimeError("Interrupted.")
+        stored.append(store_image(*args))
+        return stored[-1]
+
+    monkeypatch.setattr(database, "store_image", failing_store_image)
+    with pytest.raises(RuntimeError, match="Interrupted"):
+        database.get_connection()
+    # The image store migration is rolled back as a whole.
+    connection = sqlite3.connect(database.DATABASE)
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'image_blobs'"
+    ).fetchone() == (0,)
+    connection.close()
+    monkeypatch.setattr(database, "store_image", store_image)
+    check_migrated(database)
+
+
+def test_partly_migrated_database(database) -> None:
+    # Schema changes committed without the version being stamped.
+    make_old_database(database)
+    connection = sqlite3.connect(database.DATABASE)
+    connection.executescript(
+        """
+        CREATE INDEX texts_article_id ON texts(article_id, position);
+        CREATE TABLE image_blobs(
+            hash TEXT PRIMARY KEY, data BLOB, size INTEGER, ref_count INTEGER
+        );
+        ALTER TABLE images ADD COLUMN hash TEXT;
+        """)
+    connection.close()
+    check_migrated(database)
+
+
+def test_migration_skips_unreadable_images(database, monkeypatch) -> None:
+    make_old_database(database)
+    with io.BytesIO() as image_bytes:
+        PilImage.new("RGB", (300, 200)).save(image_bytes, "PNG")
+        data = image_bytes.getvalue()
+    connection = sqlite3.connect(database.DATABASE)
+    connection.execute(
+        "INSERT INTO images VALUES(NULL, 1, ?, NULL, NULL, 4)", (data,))
+    connection.commit()
+    connection.close()
+    # Read as a possible decompression bomb.
+    monkeypatch.setattr(PilImage, "MAX_IMAGE_PIXELS", 1000)
+    image = database.load_article_by_id(1).images[-1]
+    assert image.data == data
+    assert (image.width, image.height) == (None, None)
+
+
+def make_simple_article(
+    number: int, images: list[bytes], keywords: list[str]
+) -> Article:
+    """Returns an article of a paragraph then the given images."""
+    return Article(
+        f"Article {number}", dt.datetime(2024, 1, 1), dt.datetime(2024, 1, 2),
+        keywords, "Author", f"Description {number}", [
+            Text(f"Paragraph {number}", False),
+            *(Image(data, "Caption", "Credits") for data in images)])
+
+
+def test_delete_releases_images_and_keywords(database) -> None:
+    first_id = database.insert_article(make_simple_article(
+        1, [b"shared", b"own"], ["Shared keyword", "Own keyword"]))
+    second_id = database.insert_article(make_simple_article(
+        2, [b"shared"], ["Shared keyword"]))
+    assert ref_counts(database) == {b"shared": 2, b"own": 1}
+
+    database.delete_article_by_id(first_id)
+    assert ref_counts(database) == {b"shared": 1}
+    connection = database.get_connection()
+    assert connection.execute(
+        "SELECT keyword FROM keywords").fetchall() == [("Shared keyword",)]
+    assert database.search_articles("Own") == []
+
+    database.delete_article_by_id(second_id)
+    for table in (
+        "texts", "images", "image_blobs", "keywords", "articles_keywords",
+        "articles_search"
+    ):
+        assert connection.execute(
+            f"SELECT COUNT(*) FROM {table}").fetchone() == (0,), table
+
+
+def test_reclaims_free_pages(database) -> None:
+    article_ids = [
+        database.insert_article(make_article(number, 10, 3, 50000))
+        for number in range(10)]
+    for article_id in article_ids:
+        database.delete_article_by_id(article_id)
+    assert database.free_pages() > 0
+    while database.reclaim_free_pages():
+        pass
+    size, free = database.database_size()
+    assert free == 0
+    # Of 1.5 MB of images once saved.
+    assert size < 256 * 1024
+
+
+def test_upsert_by_url(database) -> None:
+    changes = []
+
+    def listener(*change) -> None:
+        changes.append(change)
+
+    database.add_listener(listener)
+    try:
+        article = make_article(1, 10, 3, 1000)
+        article.url = "telegraph.co.uk/news/article"
+        article_id = database.insert_article(article)
+        # Unchanged, so left as it is.
+        saved = database.load_article_by_id(article_id)
+        assert database.insert_article(saved) == article_id
+        # Changed text, images moved along and a new keyword.
+        text_position = next(
+            position for position, element in enumerate(article.elements)
+            if position and isinstance(element, Text))
+        article.elements[text_position] = Text("Rewritten", False)
+        article.elements.append(article.elements.pop(0))
+        article.keywords = ["New keyword"]
+        assert database.insert_article(article) == article_id
+    finally:
+        database.remove_listener(listener)
+    assert changes == [
+        (database.INSERTED, article_id), (database.UPDATED, article_id)]
+    loaded = database.load_article_by_id(article_id)
+    assert loaded.elements == article.elements
+    assert loaded.keywords == ["New keyword"]
+    assert loaded.url == article.url
+    # Images still referenced once each, with none left over.
+    assert sorted(ref_counts(database).values()) == [1] * len(article.images)
+    assert [summary.id for summary in database.load_article_summaries()] == [
+        article_id]
+
+
+def test_articles_without_url_are_not_replaced(database) -> None:
+    article = Article(
+        "Heading", dt.datetime(2024, 1, 1), dt.datetime(2024, 1, 2),
+        [], "Author", "Description", [Text("Text", False)])
+    first_id = database.insert_article(article)
+    assert database.insert_article(article) != first_id
+
+
+def make_text_article(
+    heading: str, paragraphs: list[str], url: str = None
+) -> Article:
+    """Returns an article of the given paragraphs, without images."""
+    return Article(
+        heading, dt.datetime(2024, 1, 1), dt.datetime(2024, 1, 2),
+        ["Keyword"], "Author", "Description",
+        [Text(paragraph, False) for paragraph in paragraphs], url=url)
+
+
+def search_ids(database, text: str) -> list[int]:
+    return [summary.id for summary, _ in database.search_articles(text)]
+
+
+def test_search_prefix(database) -> None:
+    article_id = database.insert_article(make_text_article(
+        "Parliament debates the budget", ["Ministers disagree."]))
+    for text in ("parl", "Parliament", "budget parl", "ministers disag"):
+        assert search_ids(database, text) == [article_id], text
+    # Only the last word may be incomplete, and only as a prefix.
+    for text in ("parl budget", "liament", "parliaments"):
+        assert search_ids(database, text) == [], text
+
+
+@pytest.mark.parametrize("text", (
+    'budget"', '"budget', "AND", "budget OR", "NOT budget", "NEAR(budget",
+    "budget*", "heading:budget", "-budget", "^budget", "(budget)"))
+def test_search_escapes_operators(database, text: str) -> None:
+    article_id = database.insert_article(make_text_article(
+        "Parliament and the budget", ["Or not, near the heading."]))
+    # Operators are searched for as words.
+    assert search_ids(database, text) == [article_id]
+
+
+@pytest.mark.parametrize("text", ("", " ", '"', "*", "()", "-"))
+def test_search_without_words(database, text: str) -> None:
+    database.insert_article(make_text_article("Heading", ["Text"]))
+    assert database.search_articles(text) == []
+
+
+def test_search_rank_and_snippet(database) -> None:
+    once_id = database.insert_article(make_text_article(
+        "Weather", [
+            "Rain is expected.", "Filler text. " * 50,
+            "The budget is unchanged."]))
+    often_id = database.insert_article(make_text_article(
+        "Budget",
+        ["The budget, the whole budget and nothing but the budget."]))
+    database.insert_article(make_text_article("Sport", ["A match."]))
+    results = database.search_articles("budget")
+    assert [summary.id for summary, _ in results] == [often_id, once_id]
+    # Snippets are of the matching text, on one line.
+    snippet = results[1][1]
+    assert "budget" in snippet
+    assert "\n" not in snippet
+    assert len(snippet.split()) <= database.SNIPPET_WORDS + 1
+
+
+def test_search_index_follows_changes(database) -> None:
+    article = make_text_article(
+        "Heading", ["Original wording."], "telegraph.co.uk/news/article")
+    article_id = database.insert_article(article)
+    assert search_ids(database, "original") == [article_id]
+    article.elements = [Text("Rewritten wording.", False)]
+    article.keywords = ["Politics"]
+    assert database.insert_article(article) == article_id
+    assert search_ids(database, "original") == []
+    assert search_ids(database, "rewritten") == [article_id]
+    assert search_ids(database, "politics") == [article_id]
+    database.delete_article_by_id(article_id)
+    assert search_ids(database, "rewritten") == []
+    connection = database.get_connection()
+    assert connection.execute(
+        "SELECT COUNT(*) FROM articles_search").fetchone() == (0,)
+
+
+def make_sorted_article(number: int) -> Article:
+    """
+    Returns an article whose heading, author and dates are shared with
+    other articles, so ties in each sort order are broken by ID.
+    """
+    return Article(
+        f"Heading {number % 5}", dt.datetime(2024, 1, 1 + number % 3),
+        dt.datetime(2024, 2, 1 + number % 2), [], f"Author {number % 4}",
+        "Description", [Text(f"Paragraph {number}", False)])
+
+
+def load_pages(
+    database, sort: str, descending: bool, limit: int, after: tuple = None
+) -> list[int]:
+    """Returns the IDs of the articles after the key, page by page."""
+    article_ids = []
+    while True:
+        page = database.load_summary_page(sort, descending, after, limit)
+        article_ids.extend(summary.id for summary in page)
+        if len(page) < limit:
+            return article_ids
+        after = database.summary_sort_key(page[-1], sort)
+
+
+def sorted_ids(database, sort: str, descending: bool) -> list[int]:
+    """Returns the IDs of all articles, sorted by their keys."""
+    return [
+        summary.id for summary in sorted(
+            database.load_article_summaries(), reverse=descending,
+            key=lambda summary: database.summary_sort_key(summary, sort))]
+
+
+@pytest.mark.parametrize("descending", (False, True))
+@pytest.mark.parametrize("limit", (1, 4, 23, 50))
+def test_summary_pages(database, descending: bool, limit: int) -> None:
+    for number in range(23):
+        database.insert_article(make_sorted_article(number))
+    for sort in database.SORT_COLUMNS:
+        # Every article once, in order.
+        assert load_pages(database, sort, descending, limit) == (
+            sorted_ids(database, sort, descending)), sort
+
+
+@pytest.mark.parametrize("descending", (False, True))
+def test_article_saved_between_pages(database, descending: bool) -> None:
+    for number in range(10):
+        database.insert_article(make_sorted_article(number))
+    # Headings 0 and 1 if ascending, otherwise 4 and 3.
+    first_page = database.load_summary_page("heading", descending, None, 4)
+    after = database.summary_sort_key(first_page[-1], "heading")
+    # Saved with headings before and after the end of the first page.
+    before_id, later_id = (
+        database.insert_article(make_sorted_article(number))
+        for number in ((9, 5) if descending else (5, 9)))
+    expected = sorted_ids(database, "heading", descending)
+    assert before_id in expected[:len(first_page) + 1]
+    # The article saved after the boundary is loaded with a later page in
+    # its place, the other being placed by its key by the table.
+    rest = load_pages(database, "heading", descending, 4, after)
+    assert rest == expected[len(first_page) + 1:]
+    assert later_id in rest
@@ -0,0 +1,114 @@
+"""Exporting articles to DOCX and PDF documents."""
+import datetime as dt
+import io
+import pathlib
+import re
+import sys
+
+import pytest
+from PIL import Image as PilImage
+
+from article import Article, Image, Text
+from export import export_docx, export_pdf
+
+
+def make_image(width: int, height: int) -> bytes:
+    with io.BytesIO() as image_bytes:
+        PilImage.new("RGB", (width, height), "navy").save(image_bytes, "PNG")
+        return image_bytes.getvalue()
+
+
+def make_article() -> Article:
+    return Article(
+        "Heading", dt.datetime(2024, 1, 1, 12), dt.datetime(2024, 1, 2),
+        ["Politics"], "Author", "Description", [
+            Text("Subheading", True),
+            Text("A paragraph. " * 200, False),
+            Image(make_image(3000, 2000), "Caption", "Credits"),
+            Text("Another paragraph.", False),
+            # Taller than a page, so scaled down to fit.
+            Image(make_image(400, 4000)),
+        ])
+
+
+def test_export_docx(tmp_path: pathlib.Path) -> None:
+    docx = pytest.importorskip("docx")
+    path = tmp_path / "article.docx"
+    progress = []
+    export_docx(
+        make_article(), path, 12,
+        lambda done, total: progress.append((done, total)))
+    document = docx.Document(path)
+    texts = [paragraph.text for paragraph in document.paragraphs]
+    assert texts[:2] == ["Heading", "Description"]
+    assert "Caption © Credits" in texts
+    assert len(document.inline_shapes) == 2
+    assert progress[-1] == (5, 5)
+
+
+def test_export_pdf(tmp_path: pathlib.Path) -> None:
+    pytest.importorskip("reportlab")
+    path = tmp_path / "article.pdf"
+    export_pdf(make_article(), path, 12)
+    pdf = path.read_bytes()
+    assert pdf.startswith(b"%PDF")
+    # The long paragraph and the tall image each start a new page.
+    assert len(re.findall(rb"/Type /Page\b", pdf)) >= 2
+    assert pdf.count(b"/Subtype /Image") == 2
+    pypdf = pytest.importorskip("pypdf")
+    reader = pypdf.PdfReader(path, strict=True)
+    assert len(reader.pages) >= 2
+    text = "".join(page.extract_text() for page in reader.pages)
+    assert "Heading" in text and "Caption © Credits" in text
+
+
+def test_repeated_images_written_once(tmp_path: pathlib.Path) -> None:
+    pytest.importorskip("reportlab")
+    article = make_article()
+    article.elements *= 3
+    path = tmp_path / "article.pdf"
+    export_pdf(article, path)
+    assert path.read_bytes().count(b"/Subtype /Image") == 2
+
+
+def test_missing_dependency(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Modules set to None cannot be imported.
+    for module in ("reportlab", "reportlab.lib", "reportlab.lib.utils"):
+        monkeypatch.setitem(sys.modules, module, None)
+    path = tmp_path / "article"
+    with pytest.raises(RuntimeError, match="must be installed"):
+        export_pdf(make_article(), path)
+    assert not path.exists()
+
+
+def test_docx_without_python_docx(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(sys.modules, "docx", None)
+    path = tmp_path / "article.docx"
+    export_docx(make_article(), path)
+    assert path.stat().st_size
+
+
+@pytest.mark.parametrize("export_function", (export_docx, export_pdf))
+def test_failed_export_removed(
+    export_function, tmp_path: pathlib.Path
+) -> None:
+    article = make_article()
+    article.elements.append(Image(b"Not an image"))
+    path = tmp_path / "article"
+    with pytest.raises(OSError):
+        export_function(article, path)
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("export_function", (export_docx, export_pdf))
+def test_pending_images(export_function, tmp_path: pathlib.Path) -> None:
+    article = make_article()
+    article.elements.append(Image(None, url="https://example.com/image"))
+    path = tmp_path / "article"
+    with pytest.raises(RuntimeError, match="not all been downloaded"):
+        export_function(article, path)
+    assert not path.exists()
@@ -0,0 +1,24 @@
+"""Extraction equivalence with the original descendant walk."""
+import pytest
+
+from extract import PARSERS, same_elements
+from fixtures import PAGE_SIZES, make_page
+from utils import HTML_PARSER
+
+
+def test_parser_checked() -> None:
+    assert HTML_PARSER in PARSERS
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", PAGE_SIZES)
+def test_same_elements_as_original(name: str, parser: str) -> None:
+    assert same_elements(make_page(name, PAGE_SIZES[name]), parser)
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_malformed_markup(parser: str) -> None:
+    # Paragraphs left unclosed, which tree builders repair differently.
+    page = make_page("small", PAGE_SIZES["small"]).replace(
+        b"</p></div>", b"</div>", 3)
+    assert same_elements(page, parser)
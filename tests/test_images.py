@@ -0,0 +1,34 @@
+"""Reading and re-encoding images."""
+import io
+
+import pytest
+from PIL import Image as PilImage
+
+from images import image_size, make_display_variant, recompress
+
+
+def make_image(width: int, height: int, format_: str = "JPEG") -> bytes:
+    with io.BytesIO() as image_bytes:
+        PilImage.new("RGB", (width, height), "navy").save(
+            image_bytes, format_)
+        return image_bytes.getvalue()
+
+
+def test_image_size() -> None:
+    assert image_size(make_image(300, 200)) == (300, 200)
+
+
+@pytest.mark.parametrize("data", (b"", b"not an image", b"\x89PNG\r\n"))
+def test_unreadable_images(data: bytes) -> None:
+    assert image_size(data) is None
+    assert make_display_variant(data) is None
+    assert recompress(data, 50) is None
+
+
+def test_decompression_bombs(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = make_image(3000, 2000)
+    # Images of over twice the maximum pixels are refused.
+    monkeypatch.setattr(PilImage, "MAX_IMAGE_PIXELS", 1000)
+    assert image_size(data) is None
+    assert make_display_variant(data, 100) is None
+    assert recompress(data, 50) is None
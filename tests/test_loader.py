@@ -0,0 +1,59 @@
+"""Loading articles on the background loader."""
+import pathlib
+
+import pytest
+
+import loader
+from cache import ResponseCache
+from fixtures import PAGE_SIZES, make_page
+from server import StandInServer
+from utils import normalise_url
+
+TIMEOUT = 10
+
+
+@pytest.fixture
+def article_loader(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> loader.ArticleLoader:
+    """Loader caching responses in a temporary folder."""
+    monkeypatch.setattr(
+        loader, "ResponseCache", lambda: ResponseCache(tmp_path / "cache"))
+    return loader.ArticleLoader()
+
+
+def run(
+    article_loader: loader.ArticleLoader, *args, **kwargs
+) -> list[loader.LoadEvent]:
+    """Submits a job, returning its events up to the final one."""
+    job = article_loader.submit(*args, **kwargs)
+    events = []
+    while not events or events[-1].stage not in loader.FINAL_STAGES:
+        event = article_loader.events.get(timeout=TIMEOUT)
+        if event.job is job:
+            events.append(event)
+    return events
+
+
+def test_saved_copy_without_images(database, article_loader) -> None:
+    pages = {"small": make_page("small", PAGE_SIZES["small"])}
+    with StandInServer(pages) as server:
+        url = server.page_url("small")
+        events = run(article_loader, url, False)
+        assert events[-1].stage == loader.DONE
+        article = events[-1].article
+        assert article.url == normalise_url(url)
+        assert not article.images
+        # Saved with an image, then loaded again without any request.
+        article.elements.append(loader.Image(b"image", "Caption"))
+        article_id = database.insert_article(article)
+        requests = server.full_responses
+        events = run(article_loader, url, False)
+        assert server.full_responses == requests
+        assert loader.FETCHING not in [event.stage for event in events]
+        saved = events[-1].article
+        assert saved.id == article_id
+        assert not saved.images
+        events = run(article_loader, url, True)
+        assert [image.data for image in events[-1].article.images] == [
+            b"image"]
@@ -0,0 +1,71 @@
+"""Concurrent image downloads against the local stand-in server."""
+import hashlib
+import itertools
+import time
+
+import pytest
+
+from article import Image
+from network import create_session, download_images
+from fixtures import IMAGE_SIZES
+from server import StandInServer
+
+LATENCY = 0.2
+
+
+def image_paths(number: int) -> list[str]:
+    """
+    Returns paths of the smallest images the server generates, to keep
+    the tests quick (the size is derived from the path).
+    """
+    paths = (f"content/dam/test/{index}.jpg" for index in itertools.count())
+    return list(itertools.islice((
+        path for path in paths
+        if hashlib.sha256(path.encode()).digest()[0] % len(IMAGE_SIZES) == 0
+    ), number))
+
+
+def make_images(server: StandInServer, number: int) -> list[Image]:
+    """Returns images to download, generated beforehand."""
+    images = []
+    for path in image_paths(number):
+        server.image(path)
+        images.append(Image(None, url=f"{server.url}/{path}"))
+    return images
+
+
+def test_downloads_in_order() -> None:
+    with StandInServer({}) as server, create_session() as session:
+        images = make_images(server, 10)
+        arrived = []
+        progress = []
+        download_images(
+            images, session, on_image=arrived.append,
+            progress=lambda done, total: progress.append((done, total)))
+    for path, image in zip(image_paths(10), images):
+        assert image.data == server.image(path)
+        assert (image.width, image.height) == IMAGE_SIZES[0]
+    assert sorted(map(id, arrived)) == sorted(map(id, images))
+    assert progress == [(done, 10) for done in range(1, 11)]
+
+
+def test_downloads_concurrently() -> None:
+    with (
+        StandInServer({}, LATENCY) as server,
+        create_session() as session
+    ):
+        images = make_images(server, 8)
+        start = time.perf_counter()
+        download_images(images, session, max_workers=8)
+        elapsed = time.perf_counter() - start
+    # One after another would take the latency of every image.
+    assert elapsed < LATENCY * len(images) / 2
+
+
+def test_failed_download_raises() -> None:
+    with StandInServer({}) as server, create_session() as session:
+        images = make_images(server, 3)
+        # Article page paths which do not exist are not found.
+        images.append(Image(None, url=f"{server.url}/news/missing"))
+        with pytest.raises(RuntimeError):
+            download_images(images, session)
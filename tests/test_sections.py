@@ -0,0 +1,118 @@
+"""Streaming extraction of the article sections of pages."""
+import pytest
+
+from article import make_soup, parse_article
+from fixtures import PAGE_SIZES, make_page
+from network import create_session, fetch_page, fetch_page_sections
+from sections import SectionScanner, extract_sections
+from server import StandInServer
+
+SCRIPT = (
+    '<script type="application/ld+json" data-js="main-json-schema">'
+    '{"headline": "Heading", "articleBody": "<p>Text</p>"}</script>')
+META = '<meta property="og:description" content="Description">'
+ARTICLE = "<article><p>First</p><p>Second</p></article>"
+
+
+def make_test_page(
+    head: str = META + SCRIPT, body: str = ARTICLE + "<footer></footer>"
+) -> str:
+    return (
+        f"<!DOCTYPE html><html><head>{head}</head>"
+        f"<body>{body}</body></html>")
+
+
+def scan(page: str, chunk_size: int = 7) -> SectionScanner:
+    """Feeds the page to a scanner in chunks, returning the scanner."""
+    scanner = SectionScanner()
+    for start in range(0, len(page), chunk_size):
+        scanner.feed(page[start:start + chunk_size])
+    return scanner
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 10000))
+def test_sections_found(chunk_size: int) -> None:
+    scanner = scan(make_test_page(), chunk_size)
+    assert (scanner.meta, scanner.script, scanner.article) == (
+        META, SCRIPT, ARTICLE)
+
+
+def test_json_schema_with_end_tags() -> None:
+    # End tags within the script are part of its text.
+    script = SCRIPT.replace("<p>Text</p>", "<p>Text</p></article></div>")
+    scanner = scan(make_test_page(META + script))
+    assert scanner.script == script
+    assert scanner.article == ARTICLE
+
+
+def test_nested_articles() -> None:
+    article = (
+        "<article><p>Outer</p><article><p>Inner</p></article>"
+        "<p>Outer again</p></article>")
+    scanner = scan(make_test_page(
+        body=f"{article}<article><p>Related</p></article>"))
+    assert scanner.article == article
+
+
+def test_sections_within_article() -> None:
+    article = f"<article>{META}<p>Text</p>{SCRIPT}</article>"
+    scanner = scan(make_test_page("", article))
+    assert (scanner.meta, scanner.script, scanner.article) == (
+        META, SCRIPT, article)
+
+
+def test_declarations_kept() -> None:
+    article = (
+        "<article><![CDATA[data]]><![if !IE]><p>IE</p><![endif]>"
+        "<?processing instruction?>"
+        "<!-- comment --><p>Caf&eacute; &#233;</p></article>")
+    assert scan(make_test_page(body=article)).article == article
+
+
+@pytest.mark.parametrize("page", (
+    # Closed implicitly, as the end of the body ends the article.
+    make_test_page(body="<article><p>First</p><p>Second</p>"),
+    make_test_page(body="<article><article><p>Text</p></article>"),
+    make_test_page(head=SCRIPT),
+    make_test_page(head=META),
+    make_test_page(body="<p>No article</p>"),
+))
+def test_missing_sections(page: str) -> None:
+    assert extract_sections([page]) is None
+
+
+def test_stops_once_complete() -> None:
+    page = make_test_page()
+    end = page.index("</article>") + len("</article>")
+    consumed = []
+
+    def chunks():
+        for chunk in (page[:end], "<article><p>Unread</p></article>"):
+            consumed.append(chunk)
+            yield chunk
+
+    document = extract_sections(chunks())
+    assert consumed == [page[:end]]
+    assert "Unread" not in document
+    # Text fed after the end of the sections is ignored.
+    scanner = SectionScanner()
+    scanner.feed(page[:end] + "<p>Also unread</p>")
+    assert "Also unread" not in scanner.document()
+
+
+def test_falls_back_to_full_page() -> None:
+    page = make_page("small", PAGE_SIZES["small"])
+    unclosed = page.replace(b"</article>", b"")
+    with (
+        StandInServer({"page": page, "unclosed": unclosed}) as server,
+        create_session() as session
+    ):
+        expected = parse_article(
+            make_soup(fetch_page(session, server.page_url("page"))), False)
+        sections = fetch_page_sections(session, server.page_url("page"))
+        assert len(sections) < len(page)
+        full_page = fetch_page_sections(session, server.page_url("unclosed"))
+        assert full_page == unclosed
+    for content in (sections, full_page):
+        article = parse_article(make_soup(content), False)
+        assert article.elements == expected.elements